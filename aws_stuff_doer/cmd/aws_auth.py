@@ -1,22 +1,41 @@
 import os
 import shutil
 import platform
-from typing import Optional, Dict
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 import subprocess
 from pathlib import Path
-import boto3
 import logging
-import configparser
-from botocore.exceptions import TokenRetrievalError
-from mypy_boto3_sts import STSClient
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-logging.getLogger("botocore").setLevel(logging.ERROR)
+from .catalog import load_catalog, normalize
+from .clients import get_pool, get_session
+from .console import ConsoleLinks, open_urls
+from .credentials import CredentialsStore
+from .profiles import load_profile_index
+from .sso_cache import cached_session_valid
+
+if TYPE_CHECKING:
+    from botocore.credentials import ReadOnlyCredentials
+    from mypy_boto3_sts import STSClient
+
+
+def export_credentials(
+    updates: Dict[str, "ReadOnlyCredentials"], credentials_path: Optional[Path] = None
+) -> bool:
+    """Write credentials to profiles in ~/.aws/credentials in a single update."""
+    try:
+        CredentialsStore(credentials_path).update(updates)
+    except Exception as err:
+        logging.error(f"Failed to export temporary AWS credentials: {err}")
+        return False
+    if len(updates) == 1:
+        logging.info(
+            f"Temporary AWS credentials written to the {next(iter(updates))} profile in ~/.aws/credentials"
+        )
+    else:
+        logging.info(
+            f"Temporary AWS credentials for {len(updates)} profiles written to ~/.aws/credentials"
+        )
+    return True
 
 
 class AWSAuthenticator:
@@ -26,28 +45,47 @@ class AWSAuthenticator:
         self.profile = profile
         self.config_path = Path.home() / ".aws" / "config"
         self.credentials_path = Path.home() / ".aws" / "credentials"
-        self.session = boto3.Session(profile_name=profile)
-        self.client: STSClient = self.session.client("sts")  # type: ignore
+        self.session = get_session(profile)
+
+    @property
+    def client(self) -> "STSClient":
+        """STS client, only created when a network check is actually needed"""
+        return get_pool().client("sts", self.profile)
+
+    def sso_credentials_exist(self, verify: bool = False) -> bool:
+        """Check whether the profile has a usable SSO session.
+
+        The SSO token and role credential caches are checked locally first;
+        STS is only called when that is inconclusive or verify is set.
+        """
+        from botocore.exceptions import TokenRetrievalError
+
+        if not verify:
+            index = load_profile_index(self.config_path)
+            valid = cached_session_valid(index, self.profile)
+            if valid is not None:
+                return valid
 
-    def sso_credentials_exist(self) -> bool:
         try:
             self.client.get_caller_identity()
             return True
         except (self.client.exceptions.ClientError, TokenRetrievalError):
             return False
 
-    def authenticate_sso(self) -> bool:
+    def authenticate_sso(
+        self, verify: bool = False, target_profile: str = "default"
+    ) -> bool:
         """Authenticate SSO for the given profile."""
-        if self.sso_credentials_exist():
+        if self.sso_credentials_exist(verify):
             logging.info(f"Already authenticated SSO for profile {self.profile}")
-            self.export_temporary_aws_credentials()
+            self.export_temporary_aws_credentials(target_profile)
             return True
 
         try:
             command = ["aws", "sso", "login", "--profile", self.profile]
             subprocess.run(command, check=True)
             logging.info(f"Successfully authenticated SSO for profile {self.profile}")
-            self.export_temporary_aws_credentials()
+            self.export_temporary_aws_credentials(target_profile)
             return True
         except subprocess.CalledProcessError as err:
             logging.error(f"SSO authentication error for profile {self.profile}: {err}")
@@ -130,79 +168,57 @@ class AWSAuthenticator:
 
     def get_sso_url_from_profile(self) -> Optional[str]:
         """Get the SSO start URL from the AWS profile configuration."""
-        config = configparser.ConfigParser()
         if self.config_path.exists():
-            config.read(self.config_path)
-            try:
-                sso_session = config.get(f"profile {self.profile}", "sso_session")
-                sso_start_url = config.get(
-                    f"sso-session {sso_session}", "sso_start_url"
-                )
-                return sso_start_url
-            except configparser.NoSectionError:
+            sso_start_url = load_profile_index(self.config_path).sso_start_url(
+                self.profile
+            )
+            if sso_start_url is None:
                 logging.error("Could not find the necessary SSO configuration.")
-                return None
+            return sso_start_url
         return None
 
     def get_account_url_from_profile(self) -> Optional[str]:
         """Get the account URL from the AWS profile configuration."""
-        config = configparser.ConfigParser()
         if self.config_path.exists():
-            config.read(self.config_path)
-            try:
-                profile_section = f"profile {self.profile}"
-                account_id = config.get(profile_section, "sso_account_id")
-                role_name = config.get(profile_section, "sso_role_name")
-                sso_start_url = self.get_sso_url_from_profile()
-                account_url = f"{sso_start_url}/#/console?account_id={account_id}&role_name={role_name}"
-                return account_url
-            except configparser.NoSectionError:
+            links = ConsoleLinks(load_profile_index(self.config_path))
+            account_url = links.portal_url(self.profile)
+            if account_url is None:
                 logging.error("Could not find the necessary account configuration.")
-                return None
+            return account_url
         return None
 
-    def export_temporary_aws_credentials(self) -> bool:
-        """Export temporary AWS credentials to the default profile in ~/.aws/credentials."""
-        try:
-            session = boto3.Session(profile_name=self.profile)
-            credentials = session.get_credentials().get_frozen_credentials()  # type: ignore
-
-            config = configparser.ConfigParser()
-            if self.credentials_path.exists():
-                config.read(self.credentials_path)
-            if "default" not in config.sections():
-                config.add_section("default")
+    def get_temporary_credentials(self) -> "ReadOnlyCredentials":
+        """Resolve the profile's role credentials through botocore."""
+        return self.session.get_credentials().get_frozen_credentials()  # type: ignore
 
-            config.set("default", "aws_access_key_id", credentials.access_key)
-            config.set("default", "aws_secret_access_key", credentials.secret_key)
-            config.set("default", "aws_session_token", credentials.token)
-
-            with open(self.credentials_path, "w") as f:
-                config.write(f)
-
-            logging.info(
-                "Temporary AWS credentials written to the default profile in ~/.aws/credentials"
-            )
-            return True
+    def export_temporary_aws_credentials(self, target_profile: str = "default") -> bool:
+        """Export temporary AWS credentials to a profile in ~/.aws/credentials."""
+        try:
+            credentials = self.get_temporary_credentials()
         except Exception as err:
             logging.error(f"Failed to export temporary AWS credentials: {err}")
             return False
+        return export_credentials({target_profile: credentials}, self.credentials_path)
 
     def open_aws_sso_console(self) -> None:
         """Open the AWS Management Console in the default web browser."""
         try:
             sso_start_url = self.get_sso_url_from_profile()
             if sso_start_url:
-                subprocess.run(["open", sso_start_url])
+                open_urls([sso_start_url])
         except Exception as err:
             logging.error(f"Failed to open the AWS Management Console: {err}")
 
-    def open_aws_account_console(self) -> None:
+    def open_aws_account_console(self, federated: bool = False) -> None:
         """Open the AWS Management Console in the default web browser."""
         try:
+            if federated:
+                links = ConsoleLinks(load_profile_index(self.config_path))
+                open_urls([links.url(self.profile, federated=True)])
+                return
             account_url = self.get_account_url_from_profile()
             if account_url:
-                subprocess.run(["open", account_url])
+                open_urls([account_url])
         except Exception as err:
             logging.error(f"Failed to open the AWS Management Console: {err}")
 
@@ -224,55 +240,50 @@ class AWSAuthenticator:
         "sagemaker": "sagemaker",
     }
 
-    def get_valid_service_name(self, service: str) -> Optional[str]:
+    @classmethod
+    def get_valid_service_name(cls, service: str) -> Optional[str]:
         """Convert service name to valid AWS service identifier."""
-        service = service.lower().strip().replace(" ", "-")
+        service = normalize(service)
 
         # Check if it's in our console paths mapping
-        if service in self.CONSOLE_PATHS:
+        if service in cls.CONSOLE_PATHS:
             return service
 
-        # Get list of valid services from boto3
-        valid_services = boto3.Session().get_available_services()
-
-        # Return service name if valid
-        if service in valid_services:
-            return service
-
-        logging.error(f"Invalid service name: {service}")
-        return None
-
-    def open_aws_service_console(self, service: str) -> None:
-        """Open a specific AWS service console in the default web browser."""
+        # Match names, aliases and typos against the precomputed catalog
+        resolved = load_catalog().resolve(service)
+        if resolved is None:
+            logging.error(f"Invalid service name: {service}")
+        elif resolved != service:
+            logging.info(f"Using service {resolved} for {service}")
+        return resolved
+
+    def open_aws_service_console(
+        self, services: Union[str, List[str]], federated: bool = False
+    ) -> None:
+        """Open AWS service consoles in the profile's account and region."""
+        if isinstance(services, str):
+            services = [services]
         try:
-            # Get validated service name
-            valid_service = self.get_valid_service_name(service)
-            if not valid_service:
+            # Get validated service names
+            valid_services = [
+                name
+                for name in (self.get_valid_service_name(s) for s in services)
+                if name
+            ]
+            if not valid_services:
                 return
 
-            # Get the console path for the service
-            console_path = self.CONSOLE_PATHS.get(valid_service, valid_service)
-
-            # Use direct AWS console URL format
-            service_url = f"https://us-east-1.console.aws.amazon.com/{console_path}"
-
-            subprocess.run(["open", service_url])
-            logging.info(f"Opening console for service: {valid_service}")
+            links = ConsoleLinks(load_profile_index(self.config_path))
+            urls = links.urls([self.profile], valid_services, federated)
+            open_urls(urls)
+            logging.info(f"Opening console for services: {', '.join(valid_services)}")
         except Exception as err:
             logging.error(
-                f"Failed to open the AWS service console for {service}: {err}"
+                f"Failed to open the AWS service console for {', '.join(services)}: {err}"
             )
 
     @classmethod
     def list_profiles(cls) -> list[str]:
         """List all AWS profiles in the ~/.aws/config file."""
         config_path = Path.home() / ".aws" / "config"
-        config = configparser.ConfigParser()
-        config.read(config_path)
-
-        profiles = [
-            section.replace("profile ", "")
-            for section in config.sections()
-            if section.startswith("profile ")
-        ]
-        return profiles
+        return load_profile_index(config_path).profile_names()
@@ -0,0 +1,134 @@
+"""Authenticate many AWS SSO profiles in one run"""
+import logging
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from .aws_auth import AWSAuthenticator, export_credentials
+from .profiles import ProfileIndex, load_profile_index
+from .sso_cache import sso_token_valid
+
+if TYPE_CHECKING:
+    from botocore.credentials import ReadOnlyCredentials
+
+DEFAULT_WORKERS = 8
+# Credentials file section each profile is exported to; {profile} is its name.
+DEFAULT_TARGET = "{profile}"
+
+
+class AuthResult(NamedTuple):
+    profile: str
+    ok: bool
+    seconds: float
+    error: Optional[str] = None
+
+
+def group_by_session(index: ProfileIndex, profiles: List[str]) -> Dict[str, List[str]]:
+    """Group profiles by the SSO login they share.
+
+    Profiles are keyed by sso_session, falling back to the legacy start URL,
+    so each browser login happens once per group.
+    """
+    groups: Dict[str, List[str]] = {}
+    for profile in profiles:
+        settings = index.profile(profile) or {}
+        key = settings.get("sso_session") or index.sso_start_url(profile) or profile
+        groups.setdefault(key, []).append(profile)
+    return groups
+
+
+def login_group(index: ProfileIndex, profiles: List[str], verify: bool = False) -> bool:
+    """Run `aws sso login` once for a group unless its session is still valid.
+
+    The cached token is trusted unless verify is set, in which case the
+    session is checked with STS like `asd auth --verify` does.
+    """
+    first = profiles[0]
+    if index.sso_start_url(first) is None:
+        # Not an SSO profile, credentials are resolved as-is.
+        return True
+    if verify:
+        if AWSAuthenticator(first).sso_credentials_exist(verify=True):
+            return True
+    elif sso_token_valid(index, first):
+        return True
+
+    session_name = (index.profile(first) or {}).get("sso_session")
+    if session_name:
+        command = ["aws", "sso", "login", "--sso-session", session_name]
+    else:
+        command = ["aws", "sso", "login", "--profile", first]
+    try:
+        subprocess.run(command, check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError) as err:
+        logging.error(f"SSO login failed for {', '.join(profiles)}: {err}")
+        return False
+
+
+def fetch_credentials(
+    profile: str,
+) -> Tuple[AuthResult, Optional["ReadOnlyCredentials"]]:
+    """Resolve one profile's role credentials, timing the call."""
+    start = time.perf_counter()
+    try:
+        credentials = AWSAuthenticator(profile).get_temporary_credentials()
+        return AuthResult(profile, True, time.perf_counter() - start), credentials
+    except Exception as err:
+        return AuthResult(profile, False, time.perf_counter() - start, str(err)), None
+
+
+def target_profile(target: str, profile: str) -> str:
+    """Credentials file section for a profile, from a {profile} template"""
+    return target.replace("{profile}", profile)
+
+
+def authenticate_profiles(
+    profiles: List[str],
+    max_workers: int = DEFAULT_WORKERS,
+    verify: bool = False,
+    target: str = DEFAULT_TARGET,
+) -> List[AuthResult]:
+    """Log in once per SSO session, then fetch all role credentials concurrently.
+
+    Each profile's credentials are exported to the section target names,
+    all in a single update once every profile has been resolved.
+    """
+    index = load_profile_index()
+    results: List[AuthResult] = []
+    ready: List[str] = []
+    for group in group_by_session(index, profiles).values():
+        if login_group(index, group, verify):
+            ready.extend(group)
+        else:
+            results.extend(AuthResult(p, False, 0.0, "SSO login failed") for p in group)
+
+    updates: Dict[str, "ReadOnlyCredentials"] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for result, credentials in pool.map(fetch_credentials, ready):
+            if credentials is not None:
+                updates[target_profile(target, result.profile)] = credentials
+            results.append(result)
+
+    if updates and not export_credentials(updates):
+        results = [
+            result._replace(ok=False, error="Could not write ~/.aws/credentials")
+            if result.ok
+            else result
+            for result in results
+        ]
+    order = {profile: position for position, profile in enumerate(profiles)}
+    return sorted(results, key=lambda result: order[result.profile])
+
+
+def print_results(results: List[AuthResult]) -> None:
+    """Print a per-profile status and latency table."""
+    width = max([len("PROFILE")] + [len(result.profile) for result in results])
+    print(f"{'PROFILE':<{width}}  STATUS  LATENCY")
+    for result in results:
+        status = "ok" if result.ok else "failed"
+        line = f"{result.profile:<{width}}  {status:<6}  {result.seconds * 1000:7.0f}ms"
+        if result.error:
+            line += f"  {result.error}"
+        print(line)
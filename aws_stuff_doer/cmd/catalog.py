@@ -0,0 +1,230 @@
+"""Precomputed catalog of AWS service names, aliases and console paths.
+
+Listing services through botocore scans its data directory, and resolving
+aliases needs every service model. Both are done ahead of time and shipped
+as service_catalog.json. When the installed botocore differs from the one the
+catalog was built with, a refreshed copy is written to the asd cache dir.
+
+Regenerate the shipped file with `python -m aws_stuff_doer.cmd.catalog`.
+"""
+import difflib
+import importlib.util
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .credentials import atomic_write
+from .profiles import cache_dir
+
+CATALOG_FORMAT = 1
+SHIPPED_CATALOG = Path(__file__).with_name("service_catalog.json")
+FUZZY_CUTOFF = 0.8
+# Shorter names are too ambiguous to guess at, e.g. "ec".
+MIN_FUZZY_LENGTH = 4
+
+# Console paths for services whose console does not live at /<service name>,
+# on top of AWSAuthenticator.CONSOLE_PATHS.
+EXTRA_CONSOLE_PATHS: Dict[str, str] = {
+    "apigatewayv2": "apigateway",
+    "cloudfront": "cloudfront/v4",
+    "codebuild": "codesuite/codebuild",
+    "codecommit": "codesuite/codecommit",
+    "codedeploy": "codesuite/codedeploy",
+    "codepipeline": "codesuite/codepipeline",
+    "cognito-idp": "cognito/v2",
+    "dynamodb": "dynamodbv2",
+    "elbv2": "ec2",
+    "logs": "cloudwatch",
+    "route53": "route53/v2",
+    "sesv2": "ses",
+    "ssm": "systems-manager",
+}
+
+
+def _slug(name: str) -> str:
+    name = re.sub(r"^(aws|amazon)\s*", "", name.strip(), flags=re.IGNORECASE)
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def normalize(service: str) -> str:
+    return service.lower().strip().replace(" ", "-")
+
+
+class ServiceCatalog:
+    """Service names with their full name, console path and aliases"""
+
+    def __init__(
+        self,
+        botocore_version: Optional[str],
+        services: Dict[str, List[str]],
+        aliases: Dict[str, str],
+    ):
+        self.botocore_version = botocore_version
+        # name -> [console path, full name]
+        self.services = services
+        self.aliases = aliases
+
+    @classmethod
+    def from_file(cls, path: Path) -> Optional["ServiceCatalog"]:
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("format") != CATALOG_FORMAT:
+            return None
+        return cls(data.get("botocore"), data["services"], data["aliases"])
+
+    def save(self, path: Path, mode: Optional[int] = None) -> None:
+        data = {
+            "format": CATALOG_FORMAT,
+            "botocore": self.botocore_version,
+            "services": self.services,
+            "aliases": self.aliases,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = json.dumps(data, separators=(",", ":"), sort_keys=True)
+        atomic_write(path, text, mode)
+
+    def names(self) -> List[str]:
+        return sorted(self.services)
+
+    def full_name(self, service: str) -> str:
+        return self.services.get(service, ["", service])[1] or service
+
+    def console_path(self, service: str) -> str:
+        return self.services.get(service, [service])[0] or service
+
+    def resolve(self, service: str) -> Optional[str]:
+        """Match a service name, alias, unique prefix or near miss like "lamda"."""
+        name = normalize(service)
+        if name in self.services:
+            return name
+        if name in self.aliases:
+            return self.aliases[name]
+
+        candidates = list(self.services) + list(self.aliases)
+        prefixed = {
+            self.aliases.get(candidate, candidate)
+            for candidate in candidates
+            if candidate.startswith(name)
+        }
+        if len(prefixed) == 1:
+            return prefixed.pop()
+        if len(name) < MIN_FUZZY_LENGTH:
+            return None
+        close = difflib.get_close_matches(name, candidates, n=1, cutoff=FUZZY_CUTOFF)
+        if close:
+            return self.aliases.get(close[0], close[0])
+        return None
+
+
+def installed_botocore_version() -> Optional[str]:
+    """Read botocore's __version__ from its source instead of importing it"""
+    spec = importlib.util.find_spec("botocore")
+    if spec is None or spec.origin is None:
+        return None
+    try:
+        source = Path(spec.origin).read_text()
+    except OSError:
+        return None
+    match = re.search(r"^__version__ = ['\"]([^'\"]+)['\"]", source, re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def build_catalog(
+    previous: Optional[ServiceCatalog] = None, load_models: bool = True
+) -> ServiceCatalog:
+    """Build a catalog from the installed botocore.
+
+    With load_models, aliases and full names come from every service model,
+    which takes several seconds. Without it only the service list is read and
+    details are carried over from previous, which is fast enough to run
+    whenever botocore is upgraded.
+    """
+    import botocore.session
+
+    from .aws_auth import AWSAuthenticator
+
+    session = botocore.session.get_session()
+    loader = session.get_component("data_loader")
+    console_paths = {**EXTRA_CONSOLE_PATHS, **AWSAuthenticator.CONSOLE_PATHS}
+    names = sorted(session.get_available_services())
+    services: Dict[str, List[str]] = {}
+    aliases: Dict[str, str] = {}
+
+    for name in names:
+        if load_models:
+            model = loader.load_service_model(name, "service-2")["metadata"]
+            full_name = model.get("serviceFullName", name)
+            alternatives = [
+                model.get("serviceId", ""),
+                model.get("endpointPrefix", ""),
+                model.get("serviceAbbreviation", ""),
+                full_name,
+            ]
+        else:
+            details = previous.services.get(name) if previous else None
+            full_name = details[1] if details else name
+            alternatives = []
+        services[name] = [console_paths.get(name, ""), full_name]
+        for alternative in alternatives:
+            alias = _slug(alternative)
+            if alias and alias != name:
+                aliases.setdefault(alias, name)
+
+    if previous is not None:
+        for alias, name in previous.aliases.items():
+            if name in services:
+                aliases.setdefault(alias, name)
+    for alias, path in console_paths.items():
+        # Console-only names such as "states" point at their botocore service.
+        if alias not in services:
+            target = next(
+                (n for n, p in console_paths.items() if p == path and n in services),
+                None,
+            )
+            if target is not None:
+                aliases.setdefault(alias, target)
+    for name in services:
+        aliases.pop(name, None)
+    return ServiceCatalog(installed_botocore_version(), services, aliases)
+
+
+_catalog: Optional[ServiceCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def load_catalog() -> ServiceCatalog:
+    """Load the catalog once per process, refreshing it for a new botocore."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None:
+            return _catalog
+
+        version = installed_botocore_version()
+        shipped = ServiceCatalog.from_file(SHIPPED_CATALOG)
+        if shipped is not None and shipped.botocore_version == version:
+            _catalog = shipped
+            return _catalog
+
+        cached_path = cache_dir() / "service-catalog.json"
+        cached = ServiceCatalog.from_file(cached_path)
+        if cached is not None and cached.botocore_version == version:
+            _catalog = cached
+            return _catalog
+
+        logging.debug(f"Refreshing service catalog for botocore {version}")
+        _catalog = build_catalog(shipped, load_models=False)
+        try:
+            _catalog.save(cached_path)
+        except OSError as err:
+            logging.debug(f"Could not write service catalog {cached_path}: {err}")
+        return _catalog
+
+
+if __name__ == "__main__":
+    # Package data, so readable by everyone unlike the per-user caches.
+    build_catalog().save(SHIPPED_CATALOG, mode=0o644)
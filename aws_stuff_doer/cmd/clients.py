@@ -0,0 +1,127 @@
+"""Process-wide pool of boto3 sessions and clients"""
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from .instrumentation import get_metrics
+from .sso_cache import role_credentials_cache_dir
+
+if TYPE_CHECKING:
+    import boto3
+
+# botocore keeps 10 connections per client by default, fewer than the S3
+# worker pools use at once; extra requests would open throwaway connections.
+MAX_POOL_CONNECTIONS = 50
+
+ClientKey = Tuple[Optional[str], Optional[str], str]
+
+
+class ClientPool:
+    """Sessions keyed by profile and clients keyed by (profile, region, service).
+
+    Everything is created lazily on first use and shared afterwards. Creating
+    a session loads botocore's data files and creating a client resolves its
+    endpoint, so both are done once per key rather than per call. boto3
+    sessions are not thread-safe, so creation happens under a lock; the
+    clients themselves can be shared between threads.
+    """
+
+    def __init__(self, max_pool_connections: int = MAX_POOL_CONNECTIONS):
+        self.max_pool_connections = max_pool_connections
+        self.stats: Counter = Counter()
+        self._sessions: Dict[Optional[str], "boto3.Session"] = {}
+        self._clients: Dict[ClientKey, Any] = {}
+        self._loader: Any = None
+        self._lock = threading.RLock()
+
+    def session(self, profile: Optional[str] = None) -> "boto3.Session":
+        """Session for a profile, or the default credential chain when None"""
+        with self._lock:
+            session = self._sessions.get(profile)
+            if session is None:
+                import boto3
+
+                session = boto3.Session(profile_name=profile)
+                self._share_loader(session)
+                use_cli_credential_cache(session)
+                metrics = get_metrics()
+                if metrics is not None:
+                    metrics.attach(session)
+                self._sessions[profile] = session
+                self.stats["sessions_created"] += 1
+            else:
+                self.stats["sessions_reused"] += 1
+            return session
+
+    def _share_loader(self, session: "boto3.Session") -> None:
+        """Give every session the same botocore data loader.
+
+        The loader caches the service models and endpoint data it parses, which
+        is most of the cost of a first client. Sharing it means that is paid
+        once per process instead of once per profile.
+        """
+        botocore_session = session._session  # type: ignore
+        if self._loader is None:
+            self._loader = botocore_session.get_component("data_loader")
+        else:
+            botocore_session.register_component("data_loader", self._loader)
+
+    def client(
+        self, service: str, profile: Optional[str] = None, region: Optional[str] = None
+    ) -> Any:
+        """Client for a service, in the profile's own region when region is None"""
+        key = (profile, region, service)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                from botocore.config import Config
+
+                client = self.session(profile).client(
+                    service,  # type: ignore
+                    region_name=region,
+                    config=Config(max_pool_connections=self.max_pool_connections),
+                )
+                self._clients[key] = client
+                self.stats["clients_created"] += 1
+            else:
+                self.stats["clients_reused"] += 1
+            return client
+
+    def discard(self, profile: Optional[str]) -> None:
+        """Forget a profile's session and clients, e.g. after its login changed"""
+        with self._lock:
+            self._sessions.pop(profile, None)
+            for key in [key for key in self._clients if key[0] == profile]:
+                del self._clients[key]
+
+
+def use_cli_credential_cache(session: "boto3.Session") -> None:
+    """Share the AWS CLI's on-disk role credential cache with boto3."""
+    from botocore.utils import JSONFileCache
+
+    resolver = session._session.get_component("credential_provider")  # type: ignore
+    provider = resolver.get_provider("sso")
+    if provider is not None:
+        provider.cache = JSONFileCache(str(role_credentials_cache_dir()))
+
+
+_pool: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ClientPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClientPool()
+        return _pool
+
+
+def get_session(profile: Optional[str] = None) -> "boto3.Session":
+    return get_pool().session(profile)
+
+
+def get_client(
+    service: str, profile: Optional[str] = None, region: Optional[str] = None
+) -> Any:
+    return get_pool().client(service, profile, region)
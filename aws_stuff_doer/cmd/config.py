@@ -1,25 +1,32 @@
-import configparser
+import difflib
+import json
+import sys
 from pathlib import Path
-import boto3
-from mypy_boto3_sts import STSClient
+from typing import Dict, Optional
 import logging
 
-# open config with vim or other prefered text editor if no flag is passed
-
-client: STSClient = boto3.client("sts")  # type: ignore
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
+from .config_file import (
+    ConfigDocument,
+    ConfigEditor,
+    format_config,
+    sections_from_json,
 )
-logging.getLogger("botocore").setLevel(logging.ERROR)
+from .credentials import atomic_write, file_lock
+
+# open config with vim or other prefered text editor if no flag is passed
 
 
 class AWSConfigManager:
     def __init__(self):
-        self.config = configparser.ConfigParser()
         self.config_path = Path.home() / ".aws" / "config"
+        self.editor = ConfigEditor(self.config_path)
+        self.lock_path = self.editor.lock_path
+
+    def _upsert(self, name: str, values: Dict[str, str]) -> None:
+        if self.editor.upsert({name: values}):
+            logging.info(f"Updated [{name}] in {self.config_path}")
+        else:
+            logging.info(f"[{name}] is already up to date")
 
     def configure_sso(self):
         sso_profile = input("Enter SSO profile name: ")
@@ -29,16 +36,16 @@ class AWSConfigManager:
         region = input("Enter region: ")
         output = input("Enter output format: ")
 
-        self.config[f"profile {sso_profile}"] = {
-            "sso_session": sso_session,
-            "sso_account_id": sso_account_id,
-            "sso_role_name": sso_role_name,
-            "region": region,
-            "output": output,
-        }
-
-        with open(self.config_path, "a") as configfile:
-            self.config.write(configfile)
+        self._upsert(
+            f"profile {sso_profile}",
+            {
+                "sso_session": sso_session,
+                "sso_account_id": sso_account_id,
+                "sso_role_name": sso_role_name,
+                "region": region,
+                "output": output,
+            },
+        )
 
         logging.info("AWS SSO profile configured successfully")
 
@@ -51,40 +58,98 @@ class AWSConfigManager:
             or "sso:account:access"
         )
 
-        self.config[f"sso-session {sso_session}"] = {
-            "sso_start_url": sso_start_url,
-            "sso_region": sso_region,
-            "sso_registration_scopes": sso_registration_scopes,
-        }
-
-        with open(self.config_path, "a") as configfile:
-            self.config.write(configfile)
+        self._upsert(
+            f"sso-session {sso_session}",
+            {
+                "sso_start_url": sso_start_url,
+                "sso_region": sso_region,
+                "sso_registration_scopes": sso_registration_scopes,
+            },
+        )
 
         logging.info("AWS SSO session configured successfully")
 
-    def fmt(self):
-        """Reformat the config file"""
-        self.config.read(self.config_path)
-        for section in self.config.sections():
-            if section.startswith("profile "):
-                if "sso_start_url" in self.config[section]:
-                    self.config.remove_option(section, "sso_start_url")
-                if "sso_region" in self.config[section]:
-                    self.config.remove_option(section, "sso_region")
-                if "sso_registration_scopes" in self.config[section]:
-                    self.config.remove_option(section, "sso_registration_scopes")
-            if section.startswith("sso-session "):
-                if "sso_account_id" in self.config[section]:
-                    self.config.remove_option(section, "sso_account_id")
-                if "sso_role_name" in self.config[section]:
-                    self.config.remove_option(section, "sso_role_name")
-                if "region" in self.config[section]:
-                    self.config.remove_option(section, "region")
-                if "output" in self.config[section]:
-                    self.config.remove_option(section, "output")
-        with open(self.config_path, "w") as configfile:
-            self.config.write(configfile)
+    def fmt(self, check: bool = False) -> bool:
+        """Reformat the config file, or with check only print a diff of the changes.
+
+        Session keys left on profiles that use a session, and profile keys
+        on sessions, are reported in both modes. Unlike earlier releases,
+        formatting no longer removes them. Returns True when the file was
+        already formatted.
+        """
+        if not self.config_path.exists():
+            logging.error(f"Config file {self.config_path} not found")
+            return False
+        with file_lock(self.lock_path):
+            original = self.config_path.read_text()
+            for name, key in ConfigDocument.parse(original).misplaced_keys():
+                logging.warning(
+                    f"[{name}] sets {key}, misplaced in this section; "
+                    "remove it by hand if it is stale"
+                )
+            formatted = format_config(original)
+            if formatted == original:
+                logging.info("Config file is already formatted")
+                return True
+            if check:
+                sys.stdout.writelines(
+                    difflib.unified_diff(
+                        original.splitlines(keepends=True),
+                        formatted.splitlines(keepends=True),
+                        str(self.config_path),
+                        f"{self.config_path} (formatted)",
+                    )
+                )
+                return False
+            atomic_write(self.config_path, formatted)
         logging.info("Config file formatted successfully")
+        return True
+
+    def apply_json(self, source: str, replace: bool = False) -> bool:
+        """Add or update every section of a JSON batch in a single write.
+
+        source is a file path, or "-" to read the batch from stdin.
+        """
+        try:
+            if source == "-":
+                data = json.load(sys.stdin)
+            else:
+                data = json.loads(Path(source).read_text())
+            sections = sections_from_json(data)
+        except (OSError, ValueError) as err:
+            logging.error(f"Could not read config batch {source}: {err}")
+            return False
+        changed = self.editor.upsert(sections, replace=replace)
+        logging.info(f"{len(changed)} of {len(sections)} sections added or updated")
+        return True
+
+    def generate_profiles(
+        self,
+        session: str,
+        template: Optional[str] = None,
+        region: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> bool:
+        """Write a profile for every account and role of an SSO session"""
+        from . import sso_profiles
+        from .profiles import load_profile_index
+
+        try:
+            changed = sso_profiles.generate_profiles(
+                load_profile_index(self.config_path),
+                session,
+                template or sso_profiles.DEFAULT_TEMPLATE,
+                region,
+                max_workers or sso_profiles.DEFAULT_WORKERS,
+                self.config_path,
+            )
+        except Exception as err:
+            logging.error(f"Could not generate profiles for {session}: {err}")
+            return False
+        for name in changed:
+            logging.info(f"Updated [{name}]")
+        logging.info(f"{len(changed)} profiles added or updated")
+        return True
 
     def open_config_file(self, editor: str):
         """Open the config file with the specified editor"""
@@ -0,0 +1,398 @@
+"""Line-based reading and formatting of ~/.aws/config.
+
+configparser drops comments and cannot read files with duplicate sections or
+keys, which botocore rejects as well. This module parses the file line by line
+instead, so it can keep every comment, merge duplicates and rewrite the file
+in a canonical layout.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .credentials import atomic_write, file_lock
+from .profiles import PROFILE_PREFIX, SESSION_PREFIX, default_config_path
+
+COMMENT_PREFIXES = ("#", ";")
+CONTINUATION_INDENT = "  "
+
+# Keys that belong to the other kind of section. Profiles that use an
+# sso_session take these from the session, so copies left on the profile are
+# stale at best.
+SESSION_ONLY_KEYS = frozenset(
+    ("sso_start_url", "sso_region", "sso_registration_scopes")
+)
+PROFILE_ONLY_KEYS = frozenset(("sso_account_id", "sso_role_name", "region", "output"))
+
+# Shared by every key without comments, which is most of them; comment lists
+# are only ever replaced, never changed in place.
+NO_COMMENTS: List[str] = []
+
+
+def normalize_header(header: str) -> str:
+    """Section name with the whitespace inside the brackets collapsed"""
+    return " ".join(header.split())
+
+
+def section_order(name: str) -> Tuple[int, str]:
+    """Sort key putting [default] first, then profiles, sessions and the rest"""
+    if name == "default":
+        return 0, ""
+    if name.startswith(PROFILE_PREFIX):
+        return 1, name[len(PROFILE_PREFIX) :]
+    if name.startswith(SESSION_PREFIX):
+        return 2, name[len(SESSION_PREFIX) :]
+    return 3, name
+
+
+def _format_assignment(line: str) -> Tuple[str, str]:
+    """Split a `key = value` line into a normalized key and the value"""
+    equals = line.find("=")
+    colon = line.find(":")
+    if equals == -1 or (colon != -1 and colon < equals):
+        equals = colon
+    if equals == -1:
+        return line.strip(), ""
+    return line[:equals].strip(), line[equals + 1 :].strip()
+
+
+class Entry:
+    """A key, its value and nested lines, and the comments above it"""
+
+    __slots__ = ("key", "value", "nested", "comments")
+
+    def __init__(self, key: str, value: str, comments: List[str]):
+        self.key = key
+        self.value = value
+        self.nested: List[str] = []
+        self.comments = comments
+
+    def lines(self) -> List[str]:
+        lines = self.comments + [f"{self.key} = {self.value}".rstrip()]
+        for line in self.nested:
+            if line[0] not in COMMENT_PREFIXES and ("=" in line or ":" in line):
+                key, value = _format_assignment(line)
+                line = f"{key} = {value}".rstrip()
+            lines.append(CONTINUATION_INDENT + line)
+        return lines
+
+
+class Section:
+    """A section with its entries keyed by lowercased name, in file order"""
+
+    __slots__ = ("name", "comments", "entries", "trailing")
+
+    def __init__(self, name: str, comments: List[str]):
+        self.name = name
+        self.comments = comments
+        self.entries: Dict[str, Entry] = {}
+        self.trailing: List[str] = []
+
+    def set(self, entry: Entry) -> Entry:
+        """Add an entry; a repeated key keeps its place and takes the new value"""
+        option = entry.key.lower()
+        existing = self.entries.get(option)
+        if existing is None:
+            self.entries[option] = entry
+            return entry
+        existing.value = entry.value
+        existing.nested = entry.nested
+        existing.comments = existing.comments + entry.comments
+        return existing
+
+    def merge(self, other: "Section") -> None:
+        self.comments = self.comments + other.comments
+        for entry in other.entries.values():
+            self.set(entry)
+        self.trailing = self.trailing + other.trailing
+
+    def get(self, option: str) -> Optional[str]:
+        entry = self.entries.get(option)
+        return entry.value if entry is not None else None
+
+    def lines(self) -> List[str]:
+        lines = self.comments + [f"[{self.name}]"]
+        for entry in self.entries.values():
+            lines.extend(entry.lines())
+        return lines + self.trailing
+
+
+class ConfigDocument:
+    """Comments before the first section and the sections, in file order.
+
+    Sections may repeat until merge_duplicates() is called.
+    """
+
+    def __init__(self, preamble: List[str], sections: List[Section]):
+        self.preamble = preamble
+        self.sections = sections
+
+    @classmethod
+    def parse(cls, text: str) -> "ConfigDocument":
+        """Parse config text in a single pass over its lines.
+
+        A block of comments directly above a header or key belongs to it.
+        Comments followed by a blank line stay with the section they are in,
+        or with the preamble before the first section.
+        """
+        preamble: List[str] = []
+        sections: List[Section] = []
+        section: Optional[Section] = None
+        entry: Optional[Entry] = None
+        comments: List[str] = []
+
+        for raw in text.splitlines():
+            line = raw.strip()
+            if not line:
+                if comments:
+                    if section is None:
+                        preamble.extend(comments)
+                    else:
+                        section.trailing.extend(comments)
+                    comments = []
+                entry = None
+            elif line[0] in COMMENT_PREFIXES:
+                comments.append(line)
+            elif raw[0] in " \t" and entry is not None:
+                entry.nested.extend(comments)
+                comments = []
+                entry.nested.append(line)
+            elif line[0] == "[" and line[-1] == "]":
+                section = Section(normalize_header(line[1:-1]), comments or NO_COMMENTS)
+                sections.append(section)
+                comments = []
+                entry = None
+            elif section is None:
+                # Not valid before the first header; kept as-is.
+                preamble.extend(comments)
+                preamble.append(line)
+                comments = []
+            else:
+                if section.trailing:
+                    comments = section.trailing + comments
+                    section.trailing = []
+                key, value = _format_assignment(line)
+                if comments:
+                    entry = section.set(Entry(key, value, comments))
+                    comments = []
+                else:
+                    entry = section.set(Entry(key, value, NO_COMMENTS))
+
+        if section is None:
+            preamble.extend(comments)
+        else:
+            section.trailing.extend(comments)
+        return cls(preamble, sections)
+
+    def merge_duplicates(self) -> None:
+        """Fold repeated sections into their first occurrence, later keys winning"""
+        merged: Dict[str, Section] = {}
+        for section in self.sections:
+            first = merged.get(section.name)
+            if first is None:
+                merged[section.name] = section
+            else:
+                first.merge(section)
+        self.sections = list(merged.values())
+
+    def misplaced_keys(self) -> List[Tuple[str, str]]:
+        """Session keys on profiles that use a session, and vice versa"""
+        found = []
+        for section in self.sections:
+            if section.name.startswith(SESSION_PREFIX):
+                misplaced = PROFILE_ONLY_KEYS
+            elif section.get("sso_session") is not None:
+                misplaced = SESSION_ONLY_KEYS
+            else:
+                continue
+            found.extend(
+                (section.name, key) for key in section.entries if key in misplaced
+            )
+        return found
+
+    def render(self) -> str:
+        blocks = ["\n".join(self.preamble)] if self.preamble else []
+        blocks.extend("\n".join(section.lines()) for section in self.sections)
+        return "\n\n".join(blocks) + "\n" if blocks else ""
+
+
+def format_config(text: str) -> str:
+    """Canonical form of config text: duplicates merged, sections sorted.
+
+    Keys keep their order within a section and are written as `key = value`.
+    Comments are kept next to the header or key they describe. No key is
+    dropped, including ones ConfigDocument.misplaced_keys reports.
+    """
+    document = ConfigDocument.parse(text)
+    document.merge_duplicates()
+    document.sections.sort(key=lambda section: section_order(section.name))
+    return document.render()
+
+
+SECTION_HEADER = re.compile(rb"^\[([^\]\r\n]+)\][ \t]*\r?$", re.MULTILINE)
+
+
+class SectionSpan(NamedTuple):
+    """Byte offsets of a section, from its header to the next header"""
+
+    name: str
+    start: int
+    end: int
+
+
+def index_sections(data: bytes) -> List[SectionSpan]:
+    """Find every section header and the bytes each section spans"""
+    headers = [
+        (normalize_header(match.group(1).decode()), match.start())
+        for match in SECTION_HEADER.finditer(data)
+    ]
+    ends = [start for _, start in headers[1:]] + [len(data)]
+    return [SectionSpan(name, start, end) for (name, start), end in zip(headers, ends)]
+
+
+def render_section(name: str, values: Dict[str, str]) -> str:
+    lines = [f"[{name}]"] + [f"{key} = {value}" for key, value in values.items()]
+    return "\n".join(lines) + "\n"
+
+
+def _end_of_keys(lines: List[str]) -> int:
+    """Index just past the last key or nested line, before trailing comments"""
+    end = 1
+    for i, raw in enumerate(lines[1:], 1):
+        line = raw.strip()
+        if line and line[0] not in COMMENT_PREFIXES:
+            end = i + 1
+    return end
+
+
+def update_section(block: str, values: Dict[str, str]) -> str:
+    """Set keys in the text of one section, leaving every other line alone.
+
+    Keys that already have the value are not rewritten, so a section that
+    needs no change comes back identical. New keys go after the last key.
+    """
+    lines = block.splitlines(keepends=True)
+    pending = {key.lower(): (key, value) for key, value in values.items()}
+    result = lines[:1]
+    replacing = False
+    for raw in lines[1:]:
+        line = raw.strip()
+        if line and raw[0] in " \t":
+            # Nested lines go with their key, and are dropped if it is replaced.
+            if not replacing:
+                result.append(raw)
+            continue
+        replacing = False
+        if line and line[0] not in COMMENT_PREFIXES:
+            key, value = _format_assignment(line)
+            update = pending.pop(key.lower(), None)
+            if update is not None and update[1] != value:
+                raw = f"{key} = {update[1]}\n"
+                replacing = True
+        result.append(raw)
+
+    if not pending:
+        return "".join(result)
+    end = _end_of_keys(result)
+    if not result[end - 1].endswith("\n"):
+        result[end - 1] += "\n"
+    added = [f"{key} = {value}\n" for key, value in pending.values()]
+    return "".join(result[:end] + added + result[end:])
+
+
+def replace_section(block: str, name: str, values: Dict[str, str]) -> str:
+    """Swap the keys of one section for values, keeping comments after them"""
+    lines = block.splitlines(keepends=True)
+    return render_section(name, values) + "".join(lines[_end_of_keys(lines) :])
+
+
+class ConfigEditor:
+    """Updates sections of a config file in place, in one atomic write.
+
+    Sections are located by the byte offsets of their headers. Only the text
+    of sections that actually change is decoded and rewritten; everything
+    else, comments and layout included, is copied through byte for byte.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or default_config_path()
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+
+    def upsert(
+        self, sections: Dict[str, Dict[str, str]], replace: bool = False
+    ) -> List[str]:
+        """Set keys in each named section, adding sections that are missing.
+
+        With replace, an existing section keeps only the given keys. When a
+        section appears more than once, its last occurrence is the one
+        updated, as that is where later keys win. Returns the names of the
+        sections that changed; the file is only written if there are any.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            data = self.path.read_bytes() if self.path.exists() else b""
+            spans = {span.name: span for span in index_sections(data)}
+            edits: List[Tuple[int, int, bytes]] = []
+            added: List[str] = []
+            changed: List[str] = []
+            for name, values in sections.items():
+                span = spans.get(name)
+                if span is None:
+                    added.append(render_section(name, values))
+                    changed.append(name)
+                    continue
+                block = data[span.start : span.end].decode()
+                if replace:
+                    updated = replace_section(block, name, values)
+                else:
+                    updated = update_section(block, values)
+                if updated != block:
+                    edits.append((span.start, span.end, updated.encode()))
+                    changed.append(name)
+            if not changed:
+                return []
+
+            parts: List[bytes] = []
+            offset = 0
+            for start, end, updated in sorted(edits):
+                parts.append(data[offset:start])
+                parts.append(updated)
+                offset = end
+            parts.append(data[offset:])
+            if added:
+                head = b"".join(parts)
+                parts = [head]
+                if head and not head.endswith(b"\n\n"):
+                    parts.append(b"\n" if head.endswith(b"\n") else b"\n\n")
+                parts.append("\n".join(added).encode())
+            atomic_write(self.path, b"".join(parts))
+        return changed
+
+
+def sections_from_json(data: object) -> Dict[str, Dict[str, str]]:
+    """Config sections from a batch of profiles and sessions.
+
+    The batch is an object with "profiles" and "sso-sessions" keys, each
+    mapping names to their settings, e.g.
+    {"profiles": {"dev": {"sso_session": "corp", "sso_account_id": "1234"}}}.
+    Any other key is taken as a section name as-is, e.g. "default".
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    sections: Dict[str, Dict[str, str]] = {}
+    for group, entries in data.items():
+        if group in ("profiles", "sso-sessions"):
+            if not isinstance(entries, dict):
+                raise ValueError(f"Expected an object of {group}")
+            prefix = PROFILE_PREFIX if group == "profiles" else SESSION_PREFIX
+            named = {f"{prefix}{name}": values for name, values in entries.items()}
+        else:
+            named = {group: entries}
+        for name, values in named.items():
+            if not isinstance(values, dict):
+                raise ValueError(f"Expected an object of settings for [{name}]")
+            sections[normalize_header(name)] = {
+                key: value if isinstance(value, str) else json.dumps(value)
+                for key, value in values.items()
+            }
+    return sections
@@ -0,0 +1,172 @@
+"""AWS console URLs that open in the profile's account, role and region"""
+import json
+import logging
+import platform
+import subprocess
+import threading
+import urllib.parse
+import urllib.request
+import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from .catalog import load_catalog
+from .profiles import ProfileIndex, load_profile_index
+from .sso_cache import is_expired, load_role_credentials, parse_expiry
+
+DEFAULT_REGION = "us-east-1"
+FEDERATION_URL = "https://signin.aws.amazon.com/federation"
+FEDERATION_ISSUER = "asd"
+FEDERATION_TIMEOUT = 10.0
+
+
+def service_url(service: Optional[str], region: str) -> str:
+    """Console URL for a service, or the console home page when None"""
+    host = f"https://{region}.console.aws.amazon.com"
+    if service is None:
+        return f"{host}/console/home?region={region}"
+    from .aws_auth import AWSAuthenticator
+
+    path = AWSAuthenticator.CONSOLE_PATHS.get(service)
+    if path is None:
+        path = load_catalog().console_path(service)
+    return f"{host}/{path}/home?region={region}"
+
+
+def open_urls(urls: List[str]) -> None:
+    """Open URLs as browser tabs, in a single `open` call on macOS"""
+    if not urls:
+        return
+    if platform.system() == "Darwin":
+        subprocess.run(["open", *urls])
+        return
+    for url in urls:
+        webbrowser.open_new_tab(url)
+
+
+class ConsoleLinks:
+    """Builds console URLs from the profile index and cached credentials.
+
+    SSO profiles go through the access portal's shortcut link, which signs
+    in to the profile's account and role and then redirects to the service.
+    Federated links instead exchange the profile's role credentials for a
+    console sign-in token, so no portal or browser SSO session is needed.
+    """
+
+    def __init__(self, index: Optional[ProfileIndex] = None):
+        self.index = index or load_profile_index()
+        self._credentials: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def region(self, profile: str) -> str:
+        return self.index.region(profile) or DEFAULT_REGION
+
+    def portal_url(
+        self, profile: str, destination: Optional[str] = None
+    ) -> Optional[str]:
+        """Access portal shortcut into the profile's account and role"""
+        start_url = self.index.sso_start_url(profile)
+        account_id = self.index.account_id(profile)
+        role_name = self.index.role_name(profile)
+        if start_url is None or account_id is None or role_name is None:
+            return None
+        url = f"{start_url}/#/console?account_id={account_id}&role_name={role_name}"
+        if destination is not None:
+            url += f"&destination={urllib.parse.quote(destination, safe='')}"
+        return url
+
+    def _session_credentials(self, profile: str) -> Dict[str, str]:
+        with self._lock:
+            credentials = self._credentials.get(profile)
+        if credentials is None:
+            credentials = self._resolve_credentials(profile)
+            with self._lock:
+                credentials = self._credentials.setdefault(profile, credentials)
+        return credentials
+
+    def _resolve_credentials(self, profile: str) -> Dict[str, str]:
+        """Role credentials from the CLI cache, or resolved through botocore"""
+        cached = (load_role_credentials(self.index, profile) or {}).get(
+            "Credentials", {}
+        )
+        expiry = parse_expiry(cached.get("Expiration"))
+        if expiry is not None and not is_expired(expiry) and cached.get("SessionToken"):
+            return {
+                "sessionId": cached["AccessKeyId"],
+                "sessionKey": cached["SecretAccessKey"],
+                "sessionToken": cached["SessionToken"],
+            }
+
+        from .clients import get_session
+
+        credentials = get_session(profile).get_credentials()
+        if credentials is None:
+            raise RuntimeError(f"No credentials found for profile {profile}")
+        frozen = credentials.get_frozen_credentials()
+        if not frozen.token:
+            raise RuntimeError(
+                f"Profile {profile} has long-term credentials, federated sign-in "
+                "needs temporary ones"
+            )
+        return {
+            "sessionId": frozen.access_key,
+            "sessionKey": frozen.secret_key,
+            "sessionToken": frozen.token,
+        }
+
+    def federated_url(self, profile: str, destination: str) -> str:
+        """Console sign-in URL minted from the profile's role credentials"""
+        session = json.dumps(self._session_credentials(profile))
+        query = urllib.parse.urlencode({"Action": "getSigninToken", "Session": session})
+        with urllib.request.urlopen(
+            f"{FEDERATION_URL}?{query}", timeout=FEDERATION_TIMEOUT
+        ) as response:
+            token = json.loads(response.read())["SigninToken"]
+        login = urllib.parse.urlencode(
+            {
+                "Action": "login",
+                "Issuer": FEDERATION_ISSUER,
+                "Destination": destination,
+                "SigninToken": token,
+            }
+        )
+        return f"{FEDERATION_URL}?{login}"
+
+    def url(
+        self, profile: str, service: Optional[str] = None, federated: bool = False
+    ) -> str:
+        """Console URL for a profile, opening a service in its region if given"""
+        destination = service_url(service, self.region(profile))
+        if federated:
+            return self.federated_url(profile, destination)
+        if service is None:
+            return self.portal_url(profile) or destination
+        return self.portal_url(profile, destination) or destination
+
+    def urls(
+        self,
+        profiles: Iterable[str],
+        services: Iterable[Optional[str]] = (None,),
+        federated: bool = False,
+        max_workers: int = 8,
+    ) -> List[str]:
+        """URLs for every profile and service pair, in order.
+
+        Credentials are read once per profile and sign-in tokens are fetched
+        concurrently, so a batch of tabs costs one round trip, not one login
+        per tab.
+        """
+        pairs = [(profile, service) for profile in profiles for service in services]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(self.url, profile, service, federated)
+                for profile, service in pairs
+            ]
+            urls = []
+            for (profile, service), future in zip(pairs, futures):
+                try:
+                    urls.append(future.result())
+                except Exception as err:
+                    target = f"{service} for {profile}" if service else profile
+                    logging.error(f"Could not build console URL for {target}: {err}")
+        return urls
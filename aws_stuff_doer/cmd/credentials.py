@@ -0,0 +1,93 @@
+"""Locked, atomic updates of the ~/.aws/credentials file"""
+import configparser
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Union
+
+if TYPE_CHECKING:
+    from botocore.credentials import ReadOnlyCredentials
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+    import msvcrt
+
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on lock_path for the duration of the block."""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)  # type: ignore
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)  # type: ignore
+
+
+def atomic_write(
+    path: Path, content: Union[str, bytes], mode: Optional[int] = None
+) -> None:
+    """Write content to a temp file next to path, then rename it into place."""
+    if mode is None:
+        mode = path.stat().st_mode & 0o777 if path.exists() else 0o600
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(content, bytes) else "w") as tmp_file:
+            tmp_file.write(content)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class CredentialsStore:
+    """Applies batches of profile credential updates to a credentials file.
+
+    Each batch is a single read-modify-write under an advisory lock, and the
+    new file is renamed into place so readers never see a partial write.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or Path.home() / ".aws" / "credentials"
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+
+    def update(self, updates: Dict[str, "ReadOnlyCredentials"]) -> None:
+        """Write credentials for several profiles in one atomic operation."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            config = configparser.ConfigParser(interpolation=None)
+            if self.path.exists():
+                config.read(self.path)
+
+            for section, credentials in updates.items():
+                if not config.has_section(section):
+                    config.add_section(section)
+                config.set(section, "aws_access_key_id", credentials.access_key)
+                config.set(section, "aws_secret_access_key", credentials.secret_key)
+                if credentials.token:
+                    config.set(section, "aws_session_token", credentials.token)
+                else:
+                    config.remove_option(section, "aws_session_token")
+
+            buffer = io.StringIO()
+            config.write(buffer)
+            atomic_write(self.path, buffer.getvalue())
@@ -0,0 +1,221 @@
+"""Credential daemon serving refreshed role credentials over a Unix socket.
+
+A separate profile in ~/.aws/config can point at a daemon-managed one with
+
+    [profile NAME-cached]
+    credential_process = asd credential-process --profile NAME
+
+so each credential lookup is a socket round trip instead of an SSO check.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+
+from .profiles import cache_dir, load_profile_index
+from .sso_cache import is_expired, load_role_credentials, parse_expiry
+
+if TYPE_CHECKING:
+    from botocore.credentials import Credentials
+
+    from .aws_auth import AWSAuthenticator
+
+# botocore's own advisory refresh window; refreshing earlier gains nothing
+# because cached role credentials are reused until then.
+REFRESH_WINDOW = timedelta(minutes=15)
+CHECK_INTERVAL = 30.0
+
+
+def default_socket_path() -> Path:
+    return cache_dir() / "daemon.sock"
+
+
+def _refreshable(credentials: Optional["Credentials"]) -> bool:
+    from botocore.credentials import RefreshableCredentials
+
+    return isinstance(credentials, RefreshableCredentials)
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"Error": message}).encode() + b"\n"
+
+
+class _CachedProfile:
+    def __init__(self, authenticator: "AWSAuthenticator"):
+        self.authenticator = authenticator
+        self.credentials: Optional["Credentials"] = None
+        self.response: Optional[bytes] = None
+        self.expiry: Optional[datetime] = None
+
+
+class CredentialDaemon:
+    """Keeps credentials for a set of profiles fresh and serves them from memory"""
+
+    def __init__(
+        self,
+        profiles: Iterable[str] = (),
+        socket_path: Optional[Path] = None,
+        refresh_window: timedelta = REFRESH_WINDOW,
+        check_interval: float = CHECK_INTERVAL,
+    ):
+        self.socket_path = socket_path or default_socket_path()
+        self.refresh_window = refresh_window
+        self.check_interval = check_interval
+        self._profiles: Dict[str, _CachedProfile] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        for profile in profiles:
+            try:
+                self._load(profile)
+            except Exception as err:
+                logging.error(f"Failed to load credentials for {profile}: {err}")
+
+    def _load(self, profile: str) -> _CachedProfile:
+        from .aws_auth import AWSAuthenticator
+
+        with self._lock:
+            cached = self._profiles.get(profile)
+            if cached is None:
+                cached = _CachedProfile(AWSAuthenticator(profile))
+                self._profiles[profile] = cached
+        if cached.response is None:
+            self.refresh(profile)
+        return cached
+
+    def refresh(self, profile: str) -> None:
+        """Resolve credentials for a profile and cache the serialized response."""
+        cached = self._profiles[profile]
+        if cached.credentials is None:
+            cached.credentials = cached.authenticator.session.get_credentials()
+        if cached.credentials is None:
+            raise RuntimeError(f"No credentials found for profile {profile}")
+
+        # Refreshable credentials renew themselves inside botocore's advisory
+        # window when frozen, so this is where the STS/SSO call happens.
+        frozen = cached.credentials.get_frozen_credentials()
+        expiry = self._expiration(cached, frozen.access_key)
+        payload: Dict[str, Any] = {
+            "Version": 1,
+            "AccessKeyId": frozen.access_key,
+            "SecretAccessKey": frozen.secret_key,
+        }
+        if frozen.token:
+            payload["SessionToken"] = frozen.token
+        if expiry is not None:
+            payload["Expiration"] = expiry.isoformat()
+        cached.response = json.dumps(payload).encode() + b"\n"
+        cached.expiry = expiry
+
+    @staticmethod
+    def _expiration(cached: _CachedProfile, access_key: str) -> Optional[datetime]:
+        """Expiration of the SSO role credentials botocore cached for the profile.
+
+        Only trusted when the cached response holds the same access key.
+        Credentials from any other source are served without an expiry.
+        """
+        authenticator = cached.authenticator
+        index = load_profile_index(authenticator.config_path)
+        response = load_role_credentials(index, authenticator.profile) or {}
+        credentials = response.get("Credentials", {})
+        if credentials.get("AccessKeyId") != access_key:
+            return None
+        return parse_expiry(credentials.get("Expiration"))
+
+    def refresh_due(self) -> None:
+        """Refresh every profile whose credentials expire within the refresh window."""
+        deadline = datetime.now(timezone.utc) + self.refresh_window
+        with self._lock:
+            due = [
+                profile
+                for profile, cached in self._profiles.items()
+                if cached.expiry is not None and cached.expiry <= deadline
+            ]
+        for profile in due:
+            try:
+                self.refresh(profile)
+                logging.info(f"Refreshed credentials for profile {profile}")
+            except Exception as err:
+                logging.error(f"Failed to refresh credentials for {profile}: {err}")
+
+    def _scheduler(self) -> None:
+        while not self._stopped.wait(self.check_interval):
+            self.refresh_due()
+
+    def handle_request(self, profile: str) -> bytes:
+        """Return the credential_process JSON for a profile, loading it on first use.
+
+        A response whose credentials have expired, because scheduled
+        refreshes kept failing, is refreshed once more and otherwise
+        answered with an error rather than served stale.
+        """
+        cached = self._profiles.get(profile)
+        try:
+            if cached is None or cached.response is None:
+                cached = self._load(profile)
+            elif cached.expiry is None and _refreshable(cached.credentials):
+                # Without an expiry to schedule on, botocore decides per request.
+                self.refresh(profile)
+            elif cached.expiry is not None and is_expired(cached.expiry):
+                self.refresh(profile)
+        except Exception as err:
+            return _error(str(err))
+        if cached.expiry is not None and is_expired(cached.expiry):
+            return _error(
+                f"Credentials for {profile} expired at {cached.expiry.isoformat()}"
+            )
+        return cached.response or b"{}\n"
+
+    def serve_forever(self) -> None:
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                profile = self.rfile.readline().decode().strip()
+                self.wfile.write(daemon.handle_request(profile))
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+        old_umask = os.umask(0o077)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                str(self.socket_path), Handler
+            )
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+        scheduler = threading.Thread(target=self._scheduler, daemon=True)
+        scheduler.start()
+        logging.info(f"Serving credentials on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stopped.set()
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def request_credentials(
+    profile: str, socket_path: Optional[Path] = None, timeout: float = 5.0
+) -> Dict[str, Any]:
+    """Fetch a profile's credential_process JSON from a running daemon."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path or default_socket_path()))
+        client.sendall(profile.encode() + b"\n")
+        with client.makefile("rb") as response:
+            return json.loads(response.readline())
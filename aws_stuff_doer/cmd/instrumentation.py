@@ -0,0 +1,320 @@
+"""Per-operation latency, retry, throttle and byte counts for AWS API calls.
+
+Handlers on botocore's event system time every call from before-call to
+after-call, so retries and backoff are part of a call's latency. Sessions
+created by the client pool are instrumented once metrics are enabled.
+"""
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, TextIO, Tuple
+
+if TYPE_CHECKING:
+    import boto3
+
+# Upper bounds in seconds of the latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Error codes botocore's standard retry mode treats as throttling.
+THROTTLE_CODES = frozenset(
+    (
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "RequestThrottledException",
+        "TooManyRequestsException",
+        "ProvisionedThroughputExceededException",
+        "TransactionInProgressException",
+        "RequestLimitExceeded",
+        "BandwidthLimitExceeded",
+        "LimitExceededException",
+        "RequestThrottled",
+        "SlowDown",
+        "PriorRequestNotComplete",
+        "EC2ThrottledException",
+    )
+)
+
+STARTED = "asd_call_started"
+
+OperationKey = Tuple[str, str]
+
+
+def _operation(event_name: str) -> OperationKey:
+    """(service, operation) from an event name like after-call.s3.ListObjectsV2"""
+    _, service, operation = event_name.split(".", 2)
+    return service, operation
+
+
+def _content_length(headers: Any) -> int:
+    try:
+        return int(headers.get("Content-Length") or 0)
+    except (AttributeError, ValueError):
+        return 0
+
+
+class OperationStats:
+    """Counters and a latency histogram for one API operation"""
+
+    __slots__ = (
+        "calls",
+        "errors",
+        "retries",
+        "throttles",
+        "bytes_sent",
+        "bytes_received",
+        "seconds",
+        "max_seconds",
+        "buckets",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # One count per bucket in LATENCY_BUCKETS, then one for slower calls.
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, capped at the max"""
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+
+class CallMetrics:
+    """Collects OperationStats for every instrumented session"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._stats: Dict[OperationKey, OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, session: "boto3.Session") -> None:
+        """Register the metric handlers before the session creates any clients"""
+        events = session.events
+        events.register("before-call", self._before_call)
+        events.register("before-send", self._before_send)
+        events.register_first("needs-retry", self._needs_retry)
+        events.register("after-call", self._after_call)
+        events.register("after-call-error", self._after_call_error)
+
+    def _get(self, key: OperationKey) -> OperationStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats.setdefault(key, OperationStats())
+        return stats
+
+    def _before_call(self, context: Dict[str, Any], **kwargs: Any) -> None:
+        context[STARTED] = time.perf_counter()
+
+    def _before_send(self, request: Any, event_name: str, **kwargs: Any) -> None:
+        sent = _content_length(request.headers)
+        if sent:
+            with self._lock:
+                self._get(_operation(event_name)).bytes_sent += sent
+
+    def _needs_retry(
+        self,
+        response: Optional[Tuple[Any, Dict[str, Any]]],
+        event_name: str,
+        **kwargs: Any,
+    ) -> None:
+        """Count throttled attempts, including ones a retry later recovered from"""
+        if response is None:
+            return
+        code = response[1].get("Error", {}).get("Code")
+        if code in THROTTLE_CODES:
+            with self._lock:
+                self._get(_operation(event_name)).throttles += 1
+
+    def _finish(
+        self,
+        event_name: str,
+        context: Dict[str, Any],
+        error: bool,
+        retries: int,
+        received: int,
+    ) -> None:
+        started = context.pop(STARTED, None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        with self._lock:
+            stats = self._get(_operation(event_name))
+            stats.observe(seconds)
+            stats.errors += error
+            stats.retries += retries
+            stats.bytes_received += received
+
+    def _after_call(
+        self,
+        http_response: Any,
+        parsed: Dict[str, Any],
+        context: Dict[str, Any],
+        event_name: str,
+        **kwargs: Any,
+    ) -> None:
+        retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        self._finish(
+            event_name,
+            context,
+            http_response.status_code >= 300,
+            retries,
+            _content_length(http_response.headers),
+        )
+
+    def _after_call_error(
+        self, context: Dict[str, Any], event_name: str, **kwargs: Any
+    ) -> None:
+        attempts = context.get("retries", {}).get("attempt", 1)
+        self._finish(event_name, context, True, attempts - 1, 0)
+
+    def snapshot(self) -> List[Tuple[OperationKey, OperationStats]]:
+        """Operations sorted by the total time spent in them, slowest first"""
+        with self._lock:
+            items = list(self._stats.items())
+        return sorted(items, key=lambda item: item[1].seconds, reverse=True)
+
+    def print_summary(self, out: Optional[TextIO] = None) -> None:
+        """Print a per-operation table of calls, errors, retries and latency."""
+        from .s3stuff.metadata import format_bytes
+
+        out = out or sys.stderr
+        rows = self.snapshot()
+        if not rows:
+            print("No AWS API calls were made", file=out)
+            return
+        names = [f"{service}.{operation}" for (service, operation), _ in rows]
+        width = max([len("OPERATION")] + [len(name) for name in names])
+        print(
+            f"{'OPERATION':<{width}}  CALLS  ERRORS  RETRIES  THROTTLED"
+            "      P50      P95      MAX     TOTAL       SENT   RECEIVED",
+            file=out,
+        )
+        for name, (_, stats) in zip(names, rows):
+            print(
+                f"{name:<{width}}  {stats.calls:5}  {stats.errors:6}  "
+                f"{stats.retries:7}  {stats.throttles:9}  "
+                f"{stats.quantile(0.5) * 1000:5.0f}ms  "
+                f"{stats.quantile(0.95) * 1000:5.0f}ms  "
+                f"{stats.max_seconds * 1000:5.0f}ms  {stats.seconds:7.2f}s  "
+                f"{format_bytes(stats.bytes_sent):>9}  "
+                f"{format_bytes(stats.bytes_received):>9}",
+                file=out,
+            )
+        total = sum(stats.calls for _, stats in rows)
+        elapsed = time.perf_counter() - self.started
+        print(f"{total} calls in {elapsed:.2f}s", file=out)
+
+    def to_json(self) -> Dict[str, Any]:
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        return {
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "operations": [
+                {
+                    "service": service,
+                    "operation": operation,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "throttles": stats.throttles,
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                    "seconds_sum": stats.seconds,
+                    "seconds_max": stats.max_seconds,
+                    "p50": stats.quantile(0.5),
+                    "p95": stats.quantile(0.95),
+                    "buckets": dict(zip(bounds, stats.buckets)),
+                }
+                for (service, operation), stats in self.snapshot()
+            ],
+        }
+
+    def to_openmetrics(self) -> str:
+        """The metrics in the OpenMetrics text format"""
+        rows = self.snapshot()
+        lines = [
+            "# TYPE asd_aws_call_seconds histogram",
+            "# UNIT asd_aws_call_seconds seconds",
+            "# HELP asd_aws_call_seconds Latency of AWS API calls, retries included.",
+        ]
+        for (service, operation), stats in rows:
+            labels = f'service="{service}",operation="{operation}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(
+                    f'asd_aws_call_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'asd_aws_call_seconds_bucket{{{labels},le="+Inf"}} {stats.calls}'
+            )
+            lines.append(f"asd_aws_call_seconds_count{{{labels}}} {stats.calls}")
+            lines.append(f"asd_aws_call_seconds_sum{{{labels}}} {stats.seconds}")
+
+        counters = [
+            ("asd_aws_call_errors", None, "Failed AWS API calls.", "errors"),
+            ("asd_aws_call_retries", None, "Retried AWS API attempts.", "retries"),
+            ("asd_aws_call_throttles", None, "Throttled attempts.", "throttles"),
+            ("asd_aws_sent_bytes", "bytes", "Request bytes sent.", "bytes_sent"),
+            (
+                "asd_aws_received_bytes",
+                "bytes",
+                "Response bytes received.",
+                "bytes_received",
+            ),
+        ]
+        for name, unit, help_text, attribute in counters:
+            lines.append(f"# TYPE {name} counter")
+            if unit:
+                lines.append(f"# UNIT {name} {unit}")
+            lines.append(f"# HELP {name} {help_text}")
+            for (service, operation), stats in rows:
+                labels = f'service="{service}",operation="{operation}"'
+                lines.append(f"{name}_total{{{labels}}} {getattr(stats, attribute)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path) -> None:
+        """Write the metrics as JSON for a .json path, OpenMetrics text otherwise"""
+        if path.suffix == ".json":
+            path.write_text(json.dumps(self.to_json(), indent=2) + "\n")
+        else:
+            path.write_text(self.to_openmetrics())
+
+
+_metrics: Optional[CallMetrics] = None
+
+
+def enable_metrics() -> CallMetrics:
+    """Start collecting metrics for sessions the client pool creates from now on"""
+    global _metrics
+    if _metrics is None:
+        _metrics = CallMetrics()
+    return _metrics
+
+
+def get_metrics() -> Optional[CallMetrics]:
+    return _metrics
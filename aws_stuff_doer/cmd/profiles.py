@@ -0,0 +1,201 @@
+"""Shared, cached index of the profiles and sso-sessions in ~/.aws/config."""
+import configparser
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .credentials import atomic_write
+
+PROFILE_PREFIX = "profile "
+SESSION_PREFIX = "sso-session "
+INDEX_FORMAT_VERSION = 1
+
+
+def default_config_path() -> Path:
+    return Path.home() / ".aws" / "config"
+
+
+def cache_dir() -> Path:
+    """Directory for asd's on-disk caches (~/.cache/asd unless XDG says otherwise)."""
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "asd"
+
+
+class ProfileIndex:
+    """Parsed view of an AWS config file with O(1) profile lookups"""
+
+    def __init__(
+        self,
+        profiles: Dict[str, Dict[str, str]],
+        sessions: Dict[str, Dict[str, str]],
+    ):
+        self.profiles = profiles
+        self.sessions = sessions
+
+    @classmethod
+    def from_file(cls, config_path: Path) -> "ProfileIndex":
+        """Parse the config file once and index its profile and session sections."""
+        try:
+            data = config_path.read_bytes()
+        except OSError:
+            return cls({}, {})
+        return cls.from_text(data.decode())
+
+    @classmethod
+    def from_text(cls, text: str) -> "ProfileIndex":
+        """Index the profile and session sections of config file contents."""
+        config = configparser.ConfigParser(interpolation=None)
+        config.read_string(text)
+
+        profiles: Dict[str, Dict[str, str]] = {}
+        sessions: Dict[str, Dict[str, str]] = {}
+        for section in config.sections():
+            if section.startswith(PROFILE_PREFIX):
+                profiles[section[len(PROFILE_PREFIX) :]] = dict(config[section])
+            elif section.startswith(SESSION_PREFIX):
+                sessions[section[len(SESSION_PREFIX) :]] = dict(config[section])
+        return cls(profiles, sessions)
+
+    def profile_names(self) -> List[str]:
+        return list(self.profiles)
+
+    def search(self, prefix: str = "", account_prefix: str = "") -> List[str]:
+        """Profile names starting with prefix whose account ID starts with account_prefix."""
+        return [
+            name
+            for name, profile in self.profiles.items()
+            if name.startswith(prefix)
+            and profile.get("sso_account_id", "").startswith(account_prefix)
+        ]
+
+    def profile(self, name: str) -> Optional[Dict[str, str]]:
+        return self.profiles.get(name)
+
+    def session_for(self, name: str) -> Optional[Dict[str, str]]:
+        """Return the sso-session section referenced by a profile."""
+        profile = self.profiles.get(name)
+        if profile is None or "sso_session" not in profile:
+            return None
+        return self.sessions.get(profile["sso_session"])
+
+    def sso_start_url(self, name: str) -> Optional[str]:
+        """Resolve profile -> sso-session -> start URL.
+
+        Legacy profiles that carry sso_start_url directly are also supported.
+        """
+        session = self.session_for(name)
+        if session is not None and "sso_start_url" in session:
+            return session["sso_start_url"]
+        profile = self.profiles.get(name)
+        return profile.get("sso_start_url") if profile else None
+
+    def account_id(self, name: str) -> Optional[str]:
+        profile = self.profiles.get(name)
+        return profile.get("sso_account_id") if profile else None
+
+    def role_name(self, name: str) -> Optional[str]:
+        profile = self.profiles.get(name)
+        return profile.get("sso_role_name") if profile else None
+
+    def region(self, name: str) -> Optional[str]:
+        profile = self.profiles.get(name)
+        return profile.get("region") if profile else None
+
+
+def _index_cache_path(config_path: Path) -> Path:
+    key = hashlib.sha1(str(config_path.resolve()).encode()).hexdigest()[:12]
+    return cache_dir() / f"profiles-{key}.json"
+
+
+def _read_persisted_index(
+    config_path: Path, stamp: Tuple[int, int]
+) -> Optional[ProfileIndex]:
+    """Load the on-disk index if it still matches the config file.
+
+    A matching mtime and size is trusted as-is. Otherwise the config's hash is
+    compared, so a touched but unchanged file does not trigger a re-parse.
+    """
+    cache_path = _index_cache_path(config_path)
+    try:
+        data = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != INDEX_FORMAT_VERSION:
+        return None
+
+    if [data.get("mtime_ns"), data.get("size")] != list(stamp):
+        try:
+            digest = hashlib.sha256(config_path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+        if data.get("sha256") != digest:
+            return None
+        data["mtime_ns"], data["size"] = stamp
+        _write_persisted_index(cache_path, data)
+
+    return ProfileIndex(data["profiles"], data["sessions"])
+
+
+def _write_persisted_index(cache_path: Path, data: Dict[str, object]) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(cache_path, json.dumps(data, separators=(",", ":")))
+    except OSError as err:
+        logging.debug(f"Could not write profile index cache {cache_path}: {err}")
+
+
+def _persist_index(
+    config_path: Path, stamp: Tuple[int, int], digest: str, index: ProfileIndex
+) -> None:
+    """Store the index with the hash of the very bytes it was parsed from."""
+    _write_persisted_index(
+        _index_cache_path(config_path),
+        {
+            "version": INDEX_FORMAT_VERSION,
+            "mtime_ns": stamp[0],
+            "size": stamp[1],
+            "sha256": digest,
+            "profiles": index.profiles,
+            "sessions": index.sessions,
+        },
+    )
+
+
+_cache: Dict[Path, Tuple[Tuple[int, int], ProfileIndex]] = {}
+_cache_lock = threading.Lock()
+
+
+def load_profile_index(config_path: Optional[Path] = None) -> ProfileIndex:
+    """Return the index for a config file, re-parsing only when it changes.
+
+    The parsed index is kept for the life of the process and invalidated when
+    the file's mtime or size differs from the last parse. Across processes a
+    serialized copy under ~/.cache/asd is reused until the config changes.
+    """
+    path = config_path or default_config_path()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return ProfileIndex({}, {})
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+    index = _read_persisted_index(path, stamp)
+    if index is None:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return ProfileIndex({}, {})
+        index = ProfileIndex.from_text(data.decode())
+        _persist_index(path, stamp, hashlib.sha256(data).hexdigest(), index)
+    with _cache_lock:
+        _cache[path] = (stamp, index)
+    return index
@@ -0,0 +1,323 @@
+"""Per-prefix age and size index of a bucket's object versions.
+
+One pass over the version listing folds every version and delete marker into
+a PrefixAggregate: parallel arrays with one slot per top-level prefix, so a
+bucket with millions of versions is summarised in a few kilobytes. Analyses
+are kept in a local index and shown in the S3 TUI next to each bucket.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional
+
+from ..credentials import atomic_write
+from ..profiles import cache_dir
+from .metadata import format_bytes
+from .operations import DEFAULT_WORKERS
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+
+INDEX_FORMAT_VERSION = 1
+# Versions per ListObjectVersions page, the most S3 returns.
+PAGE_SIZE = 1000
+
+
+class PrefixSummary(NamedTuple):
+    """Totals of one prefix; timestamps are epoch seconds, None when empty"""
+
+    prefix: str
+    objects: int
+    bytes: int
+    noncurrent_bytes: int
+    newest: Optional[float]
+    oldest: Optional[float]
+    new_versions: int
+
+
+class PrefixAggregate:
+    """Version totals per prefix, kept in parallel arrays indexed by slot.
+
+    objects and bytes count current versions only; older versions add to
+    noncurrent_bytes. newest also moves for delete markers, since deleting
+    is a write too. new_versions counts versions and delete markers newer
+    than the watermark of the previous analysis.
+    """
+
+    def __init__(self) -> None:
+        self.prefixes: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self.objects = array("q")
+        self.bytes = array("q")
+        self.noncurrent_bytes = array("q")
+        self.new_versions = array("q")
+        self.newest = array("d")
+        self.oldest = array("d")
+
+    def slot(self, prefix: str) -> int:
+        slot = self._slots.get(prefix)
+        if slot is None:
+            slot = self._slots[prefix] = len(self.prefixes)
+            self.prefixes.append(prefix)
+            for counts in (
+                self.objects,
+                self.bytes,
+                self.noncurrent_bytes,
+                self.new_versions,
+            ):
+                counts.append(0)
+            self.newest.append(-math.inf)
+            self.oldest.append(math.inf)
+        return slot
+
+    def add_page(self, slot: int, page: Dict[str, Any], since: float) -> None:
+        """Fold one ListObjectVersions page into a prefix's slot"""
+        for version in page.get("Versions", []):
+            modified = version["LastModified"].timestamp()
+            size = version.get("Size", 0)
+            if version.get("IsLatest"):
+                self.objects[slot] += 1
+                self.bytes[slot] += size
+            else:
+                self.noncurrent_bytes[slot] += size
+            if modified > self.newest[slot]:
+                self.newest[slot] = modified
+            if modified < self.oldest[slot]:
+                self.oldest[slot] = modified
+            if modified > since:
+                self.new_versions[slot] += 1
+        for marker in page.get("DeleteMarkers", []):
+            modified = marker["LastModified"].timestamp()
+            if modified > self.newest[slot]:
+                self.newest[slot] = modified
+            if modified > since:
+                self.new_versions[slot] += 1
+
+    def summary(self, slot: int) -> PrefixSummary:
+        newest, oldest = self.newest[slot], self.oldest[slot]
+        return PrefixSummary(
+            self.prefixes[slot],
+            self.objects[slot],
+            self.bytes[slot],
+            self.noncurrent_bytes[slot],
+            newest if newest != -math.inf else None,
+            oldest if oldest != math.inf else None,
+            self.new_versions[slot],
+        )
+
+    def rows(self) -> Iterator[PrefixSummary]:
+        """Summaries of prefixes holding any version, in key order"""
+        for slot in sorted(range(len(self.prefixes)), key=self.prefixes.__getitem__):
+            if self.newest[slot] != -math.inf:
+                yield self.summary(slot)
+
+    def total(self, prefix: str = "") -> PrefixSummary:
+        newest = max(self.newest, default=-math.inf)
+        oldest = min(self.oldest, default=math.inf)
+        return PrefixSummary(
+            prefix,
+            sum(self.objects),
+            sum(self.bytes),
+            sum(self.noncurrent_bytes),
+            newest if newest != -math.inf else None,
+            oldest if oldest != math.inf else None,
+            sum(self.new_versions),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "prefixes": self.prefixes,
+            "objects": self.objects.tolist(),
+            "bytes": self.bytes.tolist(),
+            "noncurrent_bytes": self.noncurrent_bytes.tolist(),
+            "new_versions": self.new_versions.tolist(),
+            # Unset timestamps are stored as null rather than Infinity.
+            "newest": [None if math.isinf(t) else t for t in self.newest],
+            "oldest": [None if math.isinf(t) else t for t in self.oldest],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "PrefixAggregate":
+        aggregate = cls()
+        aggregate.prefixes = list(data["prefixes"])
+        aggregate._slots = {prefix: i for i, prefix in enumerate(aggregate.prefixes)}
+        for name in ("objects", "bytes", "noncurrent_bytes", "new_versions"):
+            setattr(aggregate, name, array("q", data[name]))
+        for name, unset in (("newest", -math.inf), ("oldest", math.inf)):
+            timestamps = (unset if t is None else t for t in data[name])
+            setattr(aggregate, name, array("d", timestamps))
+        return aggregate
+
+
+class BucketAnalysis(NamedTuple):
+    bucket: str
+    analyzed_at: float
+    seconds: float
+    aggregate: PrefixAggregate
+    # When the analysis the new_versions counts are relative to was taken.
+    previous_at: Optional[float] = None
+
+    @property
+    def newest(self) -> Optional[float]:
+        return self.aggregate.total().newest
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "analyzed_at": self.analyzed_at,
+            "seconds": self.seconds,
+            "previous_at": self.previous_at,
+            **self.aggregate.to_json(),
+        }
+
+    @classmethod
+    def from_json(cls, bucket: str, data: Dict[str, Any]) -> "BucketAnalysis":
+        return cls(
+            bucket,
+            data["analyzed_at"],
+            data["seconds"],
+            PrefixAggregate.from_json(data),
+            data.get("previous_at"),
+        )
+
+
+def _list_prefix(
+    client: "S3Client",
+    bucket_name: str,
+    prefix: str,
+    aggregate: PrefixAggregate,
+    slot: int,
+    since: float,
+) -> None:
+    paginator = client.get_paginator("list_object_versions")
+    for page in paginator.paginate(
+        Bucket=bucket_name, Prefix=prefix, PaginationConfig={"PageSize": PAGE_SIZE}
+    ):
+        aggregate.add_page(slot, page, since)
+
+
+def analyze_bucket(
+    client: "S3Client",
+    bucket_name: str,
+    previous: Optional[BucketAnalysis] = None,
+    max_workers: int = DEFAULT_WORKERS,
+) -> BucketAnalysis:
+    """Stream every version of a bucket once into a per-prefix aggregate.
+
+    A delimited listing of the bucket root folds the versions stored there
+    and names the top-level prefixes. Each prefix is then listed on its own
+    worker, and only that worker writes the prefix's slot. S3 cannot list
+    versions modified after a given time, so a refresh lists everything
+    again; the newest timestamp of the previous analysis is the watermark
+    new_versions is counted against.
+    """
+    started = time.perf_counter()
+    since = math.inf
+    if previous is not None and previous.newest is not None:
+        since = previous.newest
+    aggregate = PrefixAggregate()
+    root = aggregate.slot("")
+    prefixes: List[str] = []
+    paginator = client.get_paginator("list_object_versions")
+    for page in paginator.paginate(
+        Bucket=bucket_name, Delimiter="/", PaginationConfig={"PageSize": PAGE_SIZE}
+    ):
+        aggregate.add_page(root, page, since)
+        prefixes.extend(common["Prefix"] for common in page.get("CommonPrefixes", []))
+    # Slots are created up front so workers never grow the arrays.
+    slots = [aggregate.slot(prefix) for prefix in prefixes]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(
+                _list_prefix, client, bucket_name, prefix, aggregate, slot, since
+            )
+            for prefix, slot in zip(prefixes, slots)
+        ]
+        for future in futures:
+            future.result()
+
+    return BucketAnalysis(
+        bucket_name,
+        time.time(),
+        time.perf_counter() - started,
+        aggregate,
+        previous.analyzed_at if previous is not None else None,
+    )
+
+
+def _age(timestamp: float) -> str:
+    seconds = max(time.time() - timestamp, 0)
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds / size:.0f}{unit} ago"
+    return "just now"
+
+
+def format_time(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def describe(analysis: BucketAnalysis) -> str:
+    """One-line summary of a bucket analysis for the bucket list"""
+    total = analysis.aggregate.total()
+    if total.newest is None:
+        return f"no versions | analyzed {_age(analysis.analyzed_at)}"
+    text = f"last write {_age(total.newest)}"
+    if analysis.previous_at is not None:
+        text += f" ({total.new_versions:,} new since previous analysis)"
+    return (
+        f"{text} | {total.objects:,} objects | {format_bytes(total.bytes)} "
+        f"+ {format_bytes(total.noncurrent_bytes)} noncurrent | "
+        f"analyzed {_age(analysis.analyzed_at)}"
+    )
+
+
+class AnalysisIndex:
+    """JSON file of the latest analysis of each bucket"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or cache_dir() / "s3-analysis.json"
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            data = json.loads(self.path.read_text())
+            if data.get("version") == INDEX_FORMAT_VERSION:
+                self._entries = data["buckets"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, bucket_name: str) -> Optional[BucketAnalysis]:
+        entry = self._entries.get(bucket_name)
+        if entry is None:
+            return None
+        try:
+            return BucketAnalysis.from_json(bucket_name, entry)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def put(self, analysis: BucketAnalysis) -> None:
+        with self._lock:
+            self._entries[analysis.bucket] = analysis.to_json()
+
+    def discard(self, bucket_name: str) -> None:
+        with self._lock:
+            self._entries.pop(bucket_name, None)
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(
+                {"version": INDEX_FORMAT_VERSION, "buckets": self._entries}
+            )
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, data)
+        except OSError as err:
+            logging.error(f"Could not write bucket analysis index {self.path}: {err}")
@@ -0,0 +1,226 @@
+"""Streaming object browser for a single S3 bucket"""
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Optional
+
+from rich.segment import Segment
+from rich.style import Style
+from textual import work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.geometry import Region, Size
+from textual.reactive import reactive
+from textual.screen import Screen
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widgets import Footer, Header, Label
+
+from .threaded import ThreadedS3
+from .operations import ObjectEntry, ObjectPage
+
+# Pages kept in memory at once; older ones are re-fetched by token on demand.
+MAX_CACHED_PAGES = 20
+# Start fetching the next page when the viewport is this close to the end.
+PREFETCH_ROWS = 200
+
+
+class ObjectPages:
+    """Row-addressable window over list_objects_v2 pages.
+
+    Only the continuation token and row offset of each page seen so far are
+    kept permanently; page contents live in a small LRU cache, so memory stays
+    flat no matter how far the user scrolls.
+    """
+
+    def __init__(self, max_cached_pages: int = MAX_CACHED_PAGES):
+        self.tokens: List[Optional[str]] = [None]
+        self.offsets: List[int] = [0]
+        self.complete = False
+        self.max_cached_pages = max_cached_pages
+        self._cache: "OrderedDict[int, List[ObjectEntry]]" = OrderedDict()
+
+    @property
+    def known_rows(self) -> int:
+        return self.offsets[-1]
+
+    @property
+    def next_page(self) -> Optional[int]:
+        """Index of the first page never fetched, or None if listing is done"""
+        return None if self.complete else len(self.offsets) - 1
+
+    def page_of(self, row: int) -> int:
+        return bisect_right(self.offsets, row) - 1
+
+    def row(self, row: int) -> Optional[ObjectEntry]:
+        page = self._cache.get(self.page_of(row))
+        if page is None:
+            return None
+        return page[row - self.offsets[self.page_of(row)]]
+
+    def store(self, index: int, page: ObjectPage) -> None:
+        """Add a fetched page, recording its offset and successor token if new"""
+        if index == len(self.offsets) - 1:
+            self.offsets.append(self.offsets[-1] + len(page.entries))
+            if page.next_token is None:
+                self.complete = True
+            else:
+                self.tokens.append(page.next_token)
+        self._cache[index] = page.entries
+        self._cache.move_to_end(index)
+        while len(self._cache) > self.max_cached_pages:
+            self._cache.popitem(last=False)
+
+
+class ObjectList(ScrollView, can_focus=True):
+    """Line-API list that renders only visible rows and fetches pages on demand"""
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+        Binding("enter", "open", "Open Prefix"),
+        Binding("backspace", "parent", "Parent Prefix"),
+    ]
+
+    cursor = reactive(0)
+
+    def __init__(self, s3: ThreadedS3, bucket_name: str, prefix: str = ""):
+        super().__init__()
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.pages = ObjectPages()
+        self._loading: set[int] = set()
+
+    def on_mount(self) -> None:
+        self.browse(self.prefix)
+
+    def browse(self, prefix: str) -> None:
+        """Start listing a new prefix from its first page"""
+        self.prefix = prefix
+        self.pages = ObjectPages()
+        self._loading.clear()
+        self.workers.cancel_group(self, "fetch")
+        self.cursor = 0
+        self.scroll_to(0, 0, animate=False)
+        self.virtual_size = Size(self.size.width, 0)
+        self.screen.sub_title = f"s3://{self.bucket_name}/{prefix}"
+        self.request_page(0)
+
+    def request_page(self, index: int) -> None:
+        if index in self._loading or index >= len(self.pages.tokens):
+            return
+        self._loading.add(index)
+        self.fetch_page(self.pages, self.prefix, index, self.pages.tokens[index])
+
+    @work(group="fetch")
+    async def fetch_page(
+        self, pages: ObjectPages, prefix: str, index: int, token: Optional[str]
+    ) -> None:
+        try:
+            page = await self.s3.list_object_page(self.bucket_name, prefix, "/", token)
+        except Exception as err:
+            self.page_failed(pages, index, err)
+            return
+        self.page_loaded(pages, index, page)
+
+    def page_failed(self, pages: ObjectPages, index: int, err: Exception) -> None:
+        if pages is self.pages:
+            self._loading.discard(index)
+        self.notify(f"Error listing objects: {err}", severity="error")
+
+    def page_loaded(self, pages: ObjectPages, index: int, page: ObjectPage) -> None:
+        if pages is not self.pages:
+            return  # Arrived after the user moved to another prefix
+        self._loading.discard(index)
+        pages.store(index, page)
+        self.virtual_size = Size(self.size.width, pages.known_rows)
+        self.refresh()
+        self._prefetch()
+
+    def _prefetch(self) -> None:
+        next_page = self.pages.next_page
+        bottom = self.scroll_offset.y + self.size.height
+        if next_page is not None and bottom + PREFETCH_ROWS >= self.pages.known_rows:
+            self.request_page(next_page)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self._prefetch()
+
+    def watch_cursor(self, old_value: int, new_value: int) -> None:
+        self.scroll_to_region(Region(0, new_value, 1, 1), animate=False)
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row_index = scroll_y + y
+        if row_index >= self.pages.known_rows:
+            return Strip.blank(self.size.width)
+
+        entry = self.pages.row(row_index)
+        if entry is None:
+            self.request_page(self.pages.page_of(row_index))
+            text = "..."
+        elif entry.is_prefix:
+            text = f"[DIR] {entry.key[len(self.prefix):]}"
+        else:
+            modified = (
+                entry.last_modified.strftime("%Y-%m-%d %H:%M")
+                if entry.last_modified
+                else ""
+            )
+            text = (
+                f"      {entry.key[len(self.prefix):]:<60} {entry.size:>14,} {modified}"
+            )
+
+        style = Style(reverse=True) if row_index == self.cursor else Style()
+        strip = Strip([Segment(text.ljust(self.size.width + scroll_x), style)])
+        return strip.crop(scroll_x, scroll_x + self.size.width)
+
+    def action_cursor_up(self) -> None:
+        self.cursor = max(self.cursor - 1, 0)
+
+    def action_cursor_down(self) -> None:
+        self.cursor = min(self.cursor + 1, max(self.pages.known_rows - 1, 0))
+
+    def action_page_up(self) -> None:
+        self.cursor = max(self.cursor - self.size.height, 0)
+
+    def action_page_down(self) -> None:
+        self.cursor = min(
+            self.cursor + self.size.height, max(self.pages.known_rows - 1, 0)
+        )
+
+    def action_open(self) -> None:
+        entry = self.pages.row(self.cursor)
+        if entry is not None and entry.is_prefix:
+            self.browse(entry.key)
+
+    def action_parent(self) -> None:
+        if self.prefix:
+            parent = self.prefix.rstrip("/").rpartition("/")[0]
+            self.browse(f"{parent}/" if parent else "")
+
+
+class ObjectBrowser(Screen):  # type: ignore
+    """Drill-down view of the objects in one bucket"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back to buckets"),
+    ]
+
+    def __init__(self, s3: ThreadedS3, bucket_name: str):
+        super().__init__()
+        self.s3 = s3
+        self.bucket_name = bucket_name
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True, time_format="%H:%M:%S")
+        yield Label(f"Objects in {self.bucket_name}")
+        yield ObjectList(self.s3, self.bucket_name)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.set_focus(self.query_one(ObjectList))
@@ -0,0 +1,71 @@
+"""Progress of unfinished bucket teardowns kept in a local state file.
+
+Deleted versions no longer appear in a listing, so a resumed teardown lists
+the bucket from the top and only ever sees what is left. The state file
+carries the totals of earlier runs so progress is reported for the whole
+teardown, and an entry is only cleared once a listing found the bucket empty.
+Progress arrives once per DeleteObjects batch, so the file is rewritten at
+most once per SAVE_INTERVAL; callers flush when a teardown stops.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from ..credentials import atomic_write
+from ..profiles import cache_dir
+
+# Seconds between checkpoint writes while a teardown is running.
+SAVE_INTERVAL = 1.0
+
+
+class TeardownCheckpoints:
+    """Objects deleted so far per bucket by teardowns that have not finished"""
+
+    def __init__(self, path: Optional[Path] = None, interval: float = SAVE_INTERVAL):
+        self.path = path or cache_dir() / "s3-teardown.json"
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._written_at = -math.inf
+        self._dirty = False
+        try:
+            self._state: Dict[str, Dict[str, object]] = json.loads(
+                self.path.read_text()
+            )
+        except (OSError, ValueError):
+            self._state = {}
+
+    def deleted(self, bucket_name: str) -> int:
+        """Objects deleted by earlier, interrupted runs"""
+        return int(self._state.get(bucket_name, {}).get("deleted", 0))  # type: ignore
+
+    def save(self, bucket_name: str, deleted: int) -> None:
+        """Record progress, writing the file if the last write is old enough"""
+        with self._lock:
+            self._state[bucket_name] = {"deleted": deleted, "updated_at": time.time()}
+            self._dirty = True
+            if time.monotonic() - self._written_at >= self.interval:
+                self._write()
+
+    def flush(self) -> None:
+        """Write progress recorded since the last write"""
+        with self._lock:
+            if self._dirty:
+                self._write()
+
+    def clear(self, bucket_name: str) -> None:
+        with self._lock:
+            if self._state.pop(bucket_name, None) is not None:
+                self._write()
+
+    def _write(self) -> None:
+        self._written_at = time.monotonic()
+        self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, json.dumps(self._state))
+        except OSError as err:
+            logging.error(f"Could not write teardown checkpoint {self.path}: {err}")
@@ -0,0 +1,363 @@
+"""Non-interactive S3 commands that stream JSON lines for scripts and CI"""
+import json
+import logging
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, TextIO, Tuple
+
+from botocore.exceptions import ClientError
+
+from ..clients import get_client
+from . import inventory as account_inventory
+from . import listing, operations
+from .analysis import AnalysisIndex, PrefixSummary, analyze_bucket, format_time
+from .checkpoints import TeardownCheckpoints
+from .metadata import format_bytes
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+
+# Seconds between progress records while a bucket is being emptied.
+PROGRESS_INTERVAL = 1.0
+
+
+def emit(record: Dict[str, Any], out: Optional[TextIO] = None) -> None:
+    """Write one JSON record per line to stdout and flush it right away"""
+    out = out or sys.stdout
+    out.write(json.dumps(record, default=str) + "\n")
+    out.flush()
+
+
+def s3_client(profile: Optional[str] = None) -> "S3Client":
+    return get_client("s3", profile)
+
+
+def ls(
+    client: "S3Client",
+    bucket_name: Optional[str] = None,
+    prefix: str = "",
+    recursive: bool = False,
+    concurrency: int = operations.DEFAULT_WORKERS,
+) -> None:
+    """List buckets, or the objects and prefixes under a bucket prefix.
+
+    Recursive listings are sharded over concurrency parallel listers and
+    still come out in key order.
+    """
+    if bucket_name is None:
+        for bucket in account_inventory.list_all_buckets(client):
+            emit({"bucket": bucket["Name"], "created": bucket.get("CreationDate")})
+        return
+
+    if recursive:
+        entries = listing.iter_objects_parallel(
+            client, bucket_name, prefix, concurrency
+        )
+    else:
+        entries = operations.iter_objects(client, bucket_name, prefix, "/")
+    for entry in entries:
+        if entry.is_prefix:
+            emit({"bucket": bucket_name, "prefix": entry.key})
+        else:
+            emit(
+                {
+                    "bucket": bucket_name,
+                    "key": entry.key,
+                    "size": entry.size,
+                    "last_modified": entry.last_modified,
+                }
+            )
+
+
+def du(
+    client: "S3Client",
+    bucket_name: str,
+    prefix: str = "",
+    concurrency: int = operations.DEFAULT_WORKERS,
+) -> None:
+    """Sum object counts and sizes per prefix, then for the whole prefix"""
+    objects = size = 0
+    for usage in listing.prefix_usage(client, bucket_name, prefix, concurrency):
+        objects += usage.objects
+        size += usage.bytes
+        emit(
+            {
+                "bucket": bucket_name,
+                "prefix": usage.prefix,
+                "objects": usage.objects,
+                "bytes": usage.bytes,
+            }
+        )
+    emit(
+        {
+            "bucket": bucket_name,
+            "prefix": prefix,
+            "objects": objects,
+            "bytes": size,
+            "total": True,
+        }
+    )
+
+
+def empty(
+    client: "S3Client",
+    bucket_name: str,
+    concurrency: int = operations.DEFAULT_WORKERS,
+    dry_run: bool = False,
+    checkpoints: Optional[TeardownCheckpoints] = None,
+) -> bool:
+    """Delete every version in a bucket, continuing an interrupted teardown.
+
+    Returns True once a listing found the bucket empty. The checkpoint of
+    the bucket is only cleared then, so the totals of a teardown that left
+    versions behind carry over to the next attempt.
+    """
+    checkpoints = checkpoints or TeardownCheckpoints()
+    if dry_run:
+        versions = sum(
+            len(batch) for batch in operations.iter_version_batches(client, bucket_name)
+        )
+        emit({"bucket": bucket_name, "versions": versions, "dry_run": True})
+        return True
+
+    previously_deleted = checkpoints.deleted(bucket_name)
+    if previously_deleted:
+        logging.info(
+            f"Resuming {bucket_name} ({previously_deleted} objects already deleted)"
+        )
+    last_report = 0.0
+
+    def report(deleted: int, listed: int, elapsed: float) -> None:
+        nonlocal last_report
+        checkpoints.save(bucket_name, previously_deleted + deleted)
+        if elapsed - last_report >= PROGRESS_INTERVAL:
+            last_report = elapsed
+            emit(
+                {
+                    "bucket": bucket_name,
+                    "deleted": deleted,
+                    "listed": listed,
+                    "elapsed": round(elapsed, 3),
+                }
+            )
+
+    try:
+        result = operations.empty_bucket(
+            client,
+            bucket_name,
+            max_workers=concurrency,
+            on_progress=report,
+        )
+    finally:
+        checkpoints.flush()
+    if result.empty:
+        checkpoints.clear(bucket_name)
+    else:
+        logging.error(f"{bucket_name} still holds versions that could not be deleted")
+    emit(
+        {
+            "bucket": bucket_name,
+            "deleted": result.deleted,
+            "failed": result.failed,
+            "seconds": round(result.seconds, 3),
+            "rate": round(result.rate, 1),
+            "empty": result.empty,
+            "done": True,
+        }
+    )
+    return result.empty
+
+
+def rm(
+    client: "S3Client",
+    bucket_names: List[str],
+    concurrency: int = operations.DEFAULT_WORKERS,
+    dry_run: bool = False,
+) -> bool:
+    """Empty and delete buckets one after another.
+
+    Returns True when every bucket was deleted.
+    """
+    checkpoints = TeardownCheckpoints()
+    ok = True
+    for bucket_name in bucket_names:
+        try:
+            if not empty(client, bucket_name, concurrency, dry_run, checkpoints):
+                ok = False
+                continue
+            if not dry_run:
+                client.delete_bucket(Bucket=bucket_name)
+            emit({"bucket": bucket_name, "removed": not dry_run, "dry_run": dry_run})
+        except ClientError as err:
+            logging.error(f"Error deleting bucket {bucket_name}: {err}")
+            emit({"bucket": bucket_name, "removed": False, "error": str(err)})
+            ok = False
+    return ok
+
+
+def print_inventory(
+    results: List[account_inventory.AccountInventory], out: Optional[TextIO] = None
+) -> None:
+    """Print every bucket once, then a per-account count and latency table."""
+    out = out or sys.stdout
+    owners: Dict[str, Tuple[str, str]] = {}
+    for result in sorted(results, key=lambda result: result.profile):
+        for bucket in result.buckets:
+            owners.setdefault(
+                bucket["Name"], (result.profile, result.account_id or "?")
+            )
+    rows = sorted(
+        (profile, account_id, name) for name, (profile, account_id) in owners.items()
+    )
+    profile_width = max([len("PROFILE")] + [len(result.profile) for result in results])
+    print(f"{'PROFILE':<{profile_width}}  {'ACCOUNT':<12}  BUCKET", file=out)
+    for profile, account_id, bucket_name in rows:
+        print(f"{profile:<{profile_width}}  {account_id:<12}  {bucket_name}", file=out)
+    print(file=out)
+    print(f"{'PROFILE':<{profile_width}}  {'ACCOUNT':<12}  BUCKETS  LATENCY", file=out)
+    for result in sorted(results, key=lambda result: result.profile):
+        line = (
+            f"{result.profile:<{profile_width}}  {result.account_id or '?':<12}  "
+            f"{len(result.buckets):7}  {result.seconds * 1000:7.0f}ms"
+        )
+        if result.error:
+            line += f"  {result.error}"
+        print(line, file=out)
+
+
+def inventory(
+    profiles: List[str],
+    concurrency: int = account_inventory.DEFAULT_WORKERS,
+    table: bool = False,
+    output: Optional[TextIO] = None,
+) -> bool:
+    """List the buckets of many accounts at once.
+
+    Buckets are streamed as JSON lines as each account finishes, followed by
+    a timing record for that account, or printed as one table at the end.
+    Returns True when every account could be listed.
+    """
+    start = time.perf_counter()
+    results = []
+    seen = set()
+    for result in account_inventory.iter_inventory(profiles, concurrency):
+        results.append(result)
+        if result.error:
+            logging.error(
+                f"Could not list buckets for {result.profile}: {result.error}"
+            )
+        if table:
+            continue
+        for bucket in result.buckets:
+            if bucket["Name"] in seen:
+                continue
+            seen.add(bucket["Name"])
+            emit(
+                {
+                    "profile": result.profile,
+                    "account": result.account_id,
+                    "bucket": bucket["Name"],
+                    "region": bucket.get("BucketRegion"),
+                    "created": bucket.get("CreationDate"),
+                },
+                output,
+            )
+        emit(
+            {
+                "profile": result.profile,
+                "account": result.account_id,
+                "buckets": len(result.buckets),
+                "seconds": round(result.seconds, 3),
+                "error": result.error,
+            },
+            output,
+        )
+
+    if table:
+        print_inventory(results, output)
+    else:
+        emit(
+            {
+                "accounts": len(results),
+                "buckets": len(seen),
+                "seconds": round(time.perf_counter() - start, 3),
+                "total": True,
+            },
+            output,
+        )
+    return not any(result.error for result in results)
+
+
+def summary_record(bucket_name: str, summary: PrefixSummary) -> Dict[str, Any]:
+    return {
+        "bucket": bucket_name,
+        "prefix": summary.prefix,
+        "objects": summary.objects,
+        "bytes": summary.bytes,
+        "noncurrent_bytes": summary.noncurrent_bytes,
+        "newest": format_time(summary.newest),
+        "oldest": format_time(summary.oldest),
+        "new_versions": summary.new_versions,
+    }
+
+
+def print_analysis(rows: List[PrefixSummary], total: PrefixSummary) -> None:
+    """Print one row per prefix and a total row, newest write first."""
+    width = max([len("PREFIX")] + [len(row.prefix) for row in rows])
+    print(
+        f"{'PREFIX':<{width}}  {'OBJECTS':>9}  {'SIZE':>10}  {'NONCURRENT':>10}  "
+        f"{'NEWEST':<16}  {'OLDEST':<16}  NEW"
+    )
+    for row in sorted(rows, key=lambda row: row.newest or 0, reverse=True) + [total]:
+        newest = (format_time(row.newest) or "-")[:16].replace("T", " ")
+        oldest = (format_time(row.oldest) or "-")[:16].replace("T", " ")
+        print(
+            f"{row.prefix or '/':<{width}}  {row.objects:9,}  "
+            f"{format_bytes(row.bytes):>10}  {format_bytes(row.noncurrent_bytes):>10}  "
+            f"{newest:<16}  {oldest:<16}  {row.new_versions:,}"
+        )
+
+
+def analyze(
+    client: "S3Client",
+    bucket_name: str,
+    concurrency: int = operations.DEFAULT_WORKERS,
+    table: bool = False,
+    refresh: bool = True,
+) -> bool:
+    """Summarise a bucket's versions per top-level prefix and save the index.
+
+    A refresh lists every version again, however little has changed, and
+    new_versions counts those written since the bucket's previous analysis.
+    Without refresh the stored analysis is printed and nothing is listed.
+    Returns False when there is no stored analysis to print.
+    """
+    index = AnalysisIndex()
+    if refresh:
+        analysis = analyze_bucket(
+            client, bucket_name, index.get(bucket_name), concurrency
+        )
+        index.put(analysis)
+        index.save()
+    else:
+        stored = index.get(bucket_name)
+        if stored is None:
+            logging.error(f"{bucket_name} has not been analyzed yet")
+            return False
+        analysis = stored
+    rows = list(analysis.aggregate.rows())
+    total = analysis.aggregate.total("TOTAL" if table else "")
+    if table:
+        print_analysis(rows, total)
+        return True
+    for row in rows:
+        emit(summary_record(bucket_name, row))
+    emit(
+        dict(
+            summary_record(bucket_name, total),
+            previous_analysis=format_time(analysis.previous_at),
+            seconds=round(analysis.seconds, 3),
+            total=True,
+        )
+    )
+    return True
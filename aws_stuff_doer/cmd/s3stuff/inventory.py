@@ -0,0 +1,76 @@
+"""Bucket inventory across many profiles, listing every account concurrently"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional
+
+from ..clients import get_client
+from ..profiles import ProfileIndex, load_profile_index
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+
+DEFAULT_WORKERS = 16
+
+
+class AccountInventory(NamedTuple):
+    profile: str
+    account_id: Optional[str]
+    buckets: List[Dict[str, Any]]
+    seconds: float
+    error: Optional[str] = None
+
+
+def list_all_buckets(client: "S3Client") -> List[Dict[str, Any]]:
+    """Every bucket of the account, following ListBuckets pages when it has them"""
+    if not client.can_paginate("list_buckets"):
+        return client.list_buckets().get("Buckets", [])
+    paginator = client.get_paginator("list_buckets")
+    return [bucket for page in paginator.paginate() for bucket in page["Buckets"]]
+
+
+def list_account_buckets(
+    profile: str, account_id: Optional[str] = None
+) -> AccountInventory:
+    """List one profile's buckets with its own pooled client, timing the calls"""
+    start = time.perf_counter()
+    try:
+        if account_id is None:
+            identity = get_client("sts", profile).get_caller_identity()
+            account_id = identity["Account"]
+        buckets = list_all_buckets(get_client("s3", profile))
+    except Exception as err:
+        return AccountInventory(
+            profile, account_id, [], time.perf_counter() - start, str(err)
+        )
+    return AccountInventory(profile, account_id, buckets, time.perf_counter() - start)
+
+
+def iter_inventory(
+    profiles: List[str],
+    max_workers: int = DEFAULT_WORKERS,
+    index: Optional[ProfileIndex] = None,
+) -> Iterator[AccountInventory]:
+    """List the buckets of each account concurrently, as accounts finish.
+
+    Buckets belong to an account, not a role, so only the first of several
+    profiles for the same account is listed. Accounts are known from the
+    profile index where possible, and from STS otherwise.
+    """
+    index = index or load_profile_index()
+    accounts = set()
+    targets = []
+    for profile in profiles:
+        account_id = index.account_id(profile)
+        if account_id is not None:
+            if account_id in accounts:
+                continue
+            accounts.add(account_id)
+        targets.append((profile, account_id))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(list_account_buckets, profile, account_id)
+            for profile, account_id in targets
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,388 @@
+"""Parallel, prefix-sharded object listing for huge buckets.
+
+A single list_objects_v2 paginator returns 1,000 keys per round trip, one
+round trip at a time. ShardedLister first discovers the prefix structure
+under a prefix, then lists disjoint shards of it concurrently and merges the
+pages back into a single stream of ObjectEntry rows. A shard that turns out
+to be large splits the rest of its key range into smaller shards, using its
+first page as a sample of how the keys are named.
+"""
+import os
+import queue
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .operations import DEFAULT_WORKERS, ObjectEntry, list_object_page
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+
+MAX_DISCOVERY_DEPTH = 3
+# Large shards keep splitting until this many shards per worker are pending.
+SHARDS_PER_WORKER = 4
+# Characters keys are split on after the listed prefix.
+SPLIT_CHARACTERS = "".join(
+    sorted("!-./0123456789=ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz")
+)
+# Trailing characters of a shared key prefix that key ranges are split on.
+SPLIT_DEPTH = 3
+# Pages buffered for the consumer of an unordered listing, per worker.
+MAX_BUFFERED_PAGES = 4
+# Pages an ordered listing buffers per shard before the shard pauses.
+MAX_SHARD_PAGES = 4
+
+
+class Shard(NamedTuple):
+    """Keys under prefix that sort after start_after, up to last_key inclusive"""
+
+    prefix: str
+    start_after: Optional[str] = None
+    last_key: Optional[str] = None
+
+    @property
+    def lower_bound(self) -> str:
+        return self.start_after or self.prefix
+
+
+class OrderedPages(queue.Queue):
+    """Page queue of one shard in an ordered listing.
+
+    A shard that splits hands its key range to new shards queued behind
+    everything already submitted, so a worker must never block on a consumer
+    that is waiting for one of those new shards. Instead, once MAX_SHARD_PAGES
+    pages are waiting, the worker parks where the shard left off and frees
+    its thread, and the consumer resumes the shard when it has read half of
+    them.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._parked: Optional[Tuple[Shard, str]] = None
+        self._park_lock = threading.Lock()
+
+    def park(self, shard: Shard, token: str) -> bool:
+        """Keep where a shard left off instead of listing more, if full"""
+        with self._park_lock:
+            if self.qsize() < MAX_SHARD_PAGES:
+                return False
+            self._parked = (shard, token)
+            return True
+
+    def unpark(self) -> Optional[Tuple[Shard, str]]:
+        """Where a parked shard left off, once its pages have been read down"""
+        with self._park_lock:
+            if self._parked is None or self.qsize() > MAX_SHARD_PAGES // 2:
+                return None
+            parked, self._parked = self._parked, None
+            return parked
+
+
+def _split_characters(char: str) -> str:
+    """Characters likely to follow a stem whose sampled keys continue with char"""
+    for alphabet in (string.digits, string.ascii_lowercase, string.ascii_uppercase):
+        if char in alphabet:
+            return alphabet
+    return SPLIT_CHARACTERS
+
+
+def key_range_boundaries(prefix: str, sample: List[str]) -> List[str]:
+    """Split points for the keys under prefix that sort after the sample.
+
+    Keys are split on the character following prefix, and on the last few
+    characters of the prefix the sampled keys share, so densely packed names
+    like numbered log keys still spread over several shards. Those deeper
+    splits only use characters of the same kind the sample has there.
+    """
+    common = os.path.commonprefix(sample) if sample else prefix
+    last = sample[-1] if sample else ""
+    shortest = max(len(prefix) + 1, len(common) - SPLIT_DEPTH)
+    splits = {prefix: SPLIT_CHARACTERS}
+    for size in range(shortest, len(common) + 1):
+        following = last[size] if size < len(last) else ""
+        splits[common[:size]] = _split_characters(following)
+    return sorted(
+        {
+            stem + char
+            for stem, characters in splits.items()
+            for char in characters
+            if stem + char > last
+        }
+    )
+
+
+PlanItem = Union[ObjectEntry, Shard]
+
+
+class ShardedLister:
+    """Lists every object under a prefix with concurrent, disjoint shards"""
+
+    def __init__(
+        self,
+        client: "S3Client",
+        bucket_name: str,
+        prefix: str = "",
+        max_workers: int = DEFAULT_WORKERS,
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.max_workers = max_workers
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _expand(self, prefix: str) -> Tuple[List[PlanItem], List[str]]:
+        """List one level of prefix, returning plan items and child prefixes.
+
+        A level with more than one page of entries is not walked any further
+        and becomes a single shard, which splits itself once it is listed.
+        """
+        page = list_object_page(self.client, self.bucket_name, prefix, "/")
+        if page.next_token is not None:
+            return [Shard(prefix)], []
+        objects: List[PlanItem] = [e for e in page.entries if not e.is_prefix]
+        return objects, [e.key for e in page.entries if e.is_prefix]
+
+    def plan(self) -> List[PlanItem]:
+        """Discover shards breadth-first, sorted by the keys they cover.
+
+        Prefixes are expanded one level at a time until there is at least one
+        shard per worker. Objects found on the way are returned as-is so they
+        are not listed twice.
+        """
+        items: List[PlanItem] = []
+        frontier = [self.prefix]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for _ in range(MAX_DISCOVERY_DEPTH):
+                children: List[str] = []
+                for level_items, level_children in pool.map(self._expand, frontier):
+                    items.extend(level_items)
+                    children.extend(level_children)
+                frontier = children
+                shards = sum(isinstance(item, Shard) for item in items)
+                if not frontier or shards + len(frontier) >= self.max_workers:
+                    break
+        items.extend(Shard(prefix) for prefix in frontier)
+        return sorted(
+            items, key=lambda i: i.key if isinstance(i, ObjectEntry) else i.lower_bound
+        )
+
+    def _split(self, shard: Shard, sample: List[str]) -> List[Shard]:
+        """Split the keys of shard that sort after sample into smaller shards"""
+        with self._lock:
+            if self._pending >= self.max_workers * SHARDS_PER_WORKER:
+                return []
+        bounds = [
+            bound
+            for bound in key_range_boundaries(shard.prefix, sample)
+            if shard.last_key is None or bound < shard.last_key
+        ]
+        if not bounds:
+            return []
+        starts = [sample[-1]] + bounds
+        return [
+            Shard(shard.prefix, start_after, last_key)
+            for start_after, last_key in zip(starts, bounds + [shard.last_key])
+        ]
+
+    def _submit(
+        self,
+        pool: ThreadPoolExecutor,
+        shard: Shard,
+        pages: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        with self._lock:
+            self._pending += 1
+        pool.submit(self._list_shard, pool, shard, pages, stop)
+
+    def _list_shard(
+        self,
+        pool: ThreadPoolExecutor,
+        shard: Shard,
+        pages: queue.Queue,
+        stop: threading.Event,
+        token: Optional[str] = None,
+    ) -> None:
+        """List one shard onto pages, ending with None.
+
+        Pages are lists of entries. When the shard splits, an ordered listing
+        gets the queue of each new shard in its place, and an unordered one
+        gets the number of new shards still to finish. A shard of an ordered
+        listing returns without the None when it parks, and is resumed from
+        token once the consumer has caught up.
+        """
+        parked = False
+        try:
+            while not stop.is_set():
+                page = list_object_page(
+                    self.client,
+                    self.bucket_name,
+                    shard.prefix,
+                    "",
+                    token,
+                    start_after=shard.start_after,
+                )
+                entries = page.entries
+                done = page.next_token is None
+                if shard.last_key is not None:
+                    within = [e for e in entries if e.key <= shard.last_key]
+                    done = done or len(within) < len(entries)
+                    entries = within
+                self._put(pages, entries, stop)
+                if done:
+                    break
+                children = self._split(shard, [e.key for e in entries])
+                if children:
+                    ordered = isinstance(pages, OrderedPages)
+                    if not ordered:
+                        self._put(pages, len(children), stop)
+                    for child in children:
+                        child_pages = OrderedPages() if ordered else pages
+                        if ordered:
+                            self._put(pages, child_pages, stop)
+                        self._submit(pool, child, child_pages, stop)
+                    break
+                token = page.next_token
+                if isinstance(pages, OrderedPages) and pages.park(shard, token):
+                    parked = True
+                    break
+        except Exception as err:
+            self._put(pages, err, stop)
+        finally:
+            # A parked shard still counts as pending, which keeps shards
+            # from splitting without bound while the consumer lags.
+            if not parked:
+                with self._lock:
+                    self._pending -= 1
+        if not parked:
+            self._put(pages, None, stop)
+
+    @staticmethod
+    def _put(pages: queue.Queue, item: object, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _drain_ordered(
+        self, pool: ThreadPoolExecutor, pages: OrderedPages, stop: threading.Event
+    ) -> Iterator[ObjectEntry]:
+        while True:
+            item = pages.get()
+            parked = pages.unpark()
+            if parked is not None:
+                shard, token = parked
+                pool.submit(self._list_shard, pool, shard, pages, stop, token)
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            if isinstance(item, OrderedPages):
+                yield from self._drain_ordered(pool, item, stop)
+            else:
+                yield from item
+
+    @staticmethod
+    def _drain_unordered(pages: queue.Queue, shards: int) -> Iterator[ObjectEntry]:
+        while shards:
+            item = pages.get()
+            if item is None:
+                shards -= 1
+            elif isinstance(item, Exception):
+                raise item
+            elif isinstance(item, int):
+                shards += item
+            else:
+                yield from item
+
+    def iter_objects(self, ordered: bool = True) -> Iterator[ObjectEntry]:
+        """Stream every object under the prefix.
+
+        With ordered set, entries come out in key order: shards are listed
+        concurrently and up to MAX_SHARD_PAGES pages of each are buffered
+        until the consumer reaches them. Otherwise pages are yielded as soon
+        as any shard returns them, and only a few pages per worker are
+        buffered.
+        """
+        plan = self.plan()
+        shards = [item for item in plan if isinstance(item, Shard)]
+        stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            if ordered:
+                queues: Dict[Shard, OrderedPages] = {}
+                for shard in shards:
+                    queues[shard] = OrderedPages()
+                    self._submit(pool, shard, queues[shard], stop)
+                for item in plan:
+                    if isinstance(item, Shard):
+                        yield from self._drain_ordered(pool, queues[item], stop)
+                    else:
+                        yield item
+            else:
+                yield from (item for item in plan if isinstance(item, ObjectEntry))
+                shared: queue.Queue = queue.Queue(
+                    maxsize=MAX_BUFFERED_PAGES * self.max_workers
+                )
+                for shard in shards:
+                    self._submit(pool, shard, shared, stop)
+                yield from self._drain_unordered(shared, len(shards))
+        finally:
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_objects_parallel(
+    client: "S3Client",
+    bucket_name: str,
+    prefix: str = "",
+    max_workers: int = DEFAULT_WORKERS,
+    ordered: bool = True,
+) -> Iterator[ObjectEntry]:
+    """Stream every object under prefix using concurrent shard listings."""
+    return ShardedLister(client, bucket_name, prefix, max_workers).iter_objects(ordered)
+
+
+class PrefixUsage(NamedTuple):
+    prefix: str
+    objects: int
+    bytes: int
+
+
+def prefix_usage(
+    client: "S3Client",
+    bucket_name: str,
+    prefix: str = "",
+    max_workers: int = DEFAULT_WORKERS,
+) -> List[PrefixUsage]:
+    """Total object count and size under each first-level prefix, in key order.
+
+    Objects sitting directly under prefix are counted as a usage for prefix
+    itself.
+    """
+    totals: Dict[str, List[int]] = {}
+    for entry in iter_objects_parallel(
+        client, bucket_name, prefix, max_workers, ordered=False
+    ):
+        head, separator, _ = entry.key[len(prefix) :].partition("/")
+        group = f"{prefix}{head}/" if separator else prefix
+        total = totals.setdefault(group, [0, 0])
+        total[0] += 1
+        total[1] += entry.size
+    return [
+        PrefixUsage(group, objects, size)
+        for group, (objects, size) in sorted(totals.items())
+    ]
@@ -0,0 +1,233 @@
+"""Bucket metadata enrichment with a concurrent fan-out and an on-disk TTL cache"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from ..clients import get_client
+from ..credentials import atomic_write
+from ..profiles import cache_dir
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+
+DEFAULT_TTL = 3600.0
+DEFAULT_WORKERS = 16
+
+BucketMetadata = Dict[str, Any]
+
+
+def format_bytes(size: Optional[float]) -> str:
+    if size is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if size < 1024 or unit == "TiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} PiB"
+
+
+def describe(metadata: BucketMetadata) -> str:
+    """One-line summary of a bucket's metadata for the bucket list"""
+    objects = metadata.get("objects")
+    count = f"{objects:,.0f} objects" if objects is not None else "? objects"
+    return (
+        f"{metadata.get('region', '?')} | "
+        f"versioning {metadata.get('versioning', '?')} | "
+        f"{count} | {format_bytes(metadata.get('bytes'))}"
+    )
+
+
+class MetadataCache:
+    """JSON file of bucket metadata entries that expire after ttl seconds"""
+
+    def __init__(self, path: Optional[Path] = None, ttl: float = DEFAULT_TTL):
+        self.path = path or cache_dir() / "s3-buckets.json"
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        try:
+            self._entries: Dict[str, BucketMetadata] = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, bucket_name: str) -> Optional[BucketMetadata]:
+        entry = self._entries.get(bucket_name)
+        if entry is None or time.time() - entry.get("fetched_at", 0) > self.ttl:
+            return None
+        return entry
+
+    def put(self, bucket_name: str, metadata: BucketMetadata) -> None:
+        with self._lock:
+            self._entries[bucket_name] = dict(metadata, fetched_at=time.time())
+
+    def discard(self, bucket_name: str) -> None:
+        with self._lock:
+            self._entries.pop(bucket_name, None)
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._entries, default=str)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, data)
+        except OSError as err:
+            logging.debug(f"Could not write bucket metadata cache {self.path}: {err}")
+
+
+class BucketMetadataFetcher:
+    """Looks up region, versioning, object count and size for buckets.
+
+    Object count and size come from the daily S3 storage metrics in
+    CloudWatch, which is two cheap calls per bucket instead of a full listing.
+    """
+
+    def __init__(self, client: "S3Client", profile: Optional[str] = None):
+        self.client = client
+        self.profile = profile
+        self._warned: Set[str] = set()
+        self._warned_lock = threading.Lock()
+
+    def _cloudwatch_client(self, region: str) -> Any:
+        return get_client("cloudwatch", self.profile, region)
+
+    def _warn_once(self, kind: str, message: str) -> None:
+        """Log the first failure of a kind as a warning, repeats at debug level"""
+        with self._warned_lock:
+            first = kind not in self._warned
+            self._warned.add(kind)
+        if first:
+            logging.warning(message)
+        else:
+            logging.debug(message)
+
+    def _storage_metrics(
+        self, bucket_name: str, region: str
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """Latest object count and size summed over every storage class.
+
+        S3 reports BucketSizeBytes once per storage class, so the classes
+        the bucket holds are listed first and fetched with the object count
+        in a single GetMetricData request.
+        """
+        cloudwatch = self._cloudwatch_client(region)
+        bucket = {"Name": "BucketName", "Value": bucket_name}
+        # Each class once, in the order listed.
+        storage_types = dict.fromkeys(
+            dimension["Value"]
+            for page in cloudwatch.get_paginator("list_metrics").paginate(
+                Namespace="AWS/S3", MetricName="BucketSizeBytes", Dimensions=[bucket]
+            )
+            for metric in page["Metrics"]
+            for dimension in metric["Dimensions"]
+            if dimension["Name"] == "StorageType"
+        )
+        metrics = [("NumberOfObjects", "AllStorageTypes")] + [
+            ("BucketSizeBytes", storage_type) for storage_type in storage_types
+        ]
+        now = datetime.now(timezone.utc)
+        latest: Dict[str, float] = {}
+        for page in cloudwatch.get_paginator("get_metric_data").paginate(
+            MetricDataQueries=[
+                {
+                    "Id": f"m{i}",
+                    "MetricStat": {
+                        "Metric": {
+                            "Namespace": "AWS/S3",
+                            "MetricName": name,
+                            "Dimensions": [
+                                bucket,
+                                {"Name": "StorageType", "Value": storage_type},
+                            ],
+                        },
+                        "Period": 86400,
+                        "Stat": "Average",
+                    },
+                }
+                for i, (name, storage_type) in enumerate(metrics)
+            ],
+            StartTime=now - timedelta(days=3),
+            EndTime=now,
+            ScanBy="TimestampDescending",
+        ):
+            for result in page["MetricDataResults"]:
+                if result["Values"]:
+                    latest.setdefault(result["Id"], result["Values"][0])
+        sizes = [latest[f"m{i}"] for i in range(1, len(metrics)) if f"m{i}" in latest]
+        return latest.get("m0"), sum(sizes) if sizes else None
+
+    def fetch(self, bucket_name: str) -> BucketMetadata:
+        location = self.client.get_bucket_location(Bucket=bucket_name)
+        # us-east-1 buckets report a null LocationConstraint.
+        region = location.get("LocationConstraint") or "us-east-1"
+        versioning = self.client.get_bucket_versioning(Bucket=bucket_name)
+        metadata: BucketMetadata = {
+            "region": region,
+            "versioning": versioning.get("Status", "Disabled"),
+            "objects": None,
+            "bytes": None,
+        }
+        try:
+            metadata["objects"], metadata["bytes"] = self._storage_metrics(
+                bucket_name, region
+            )
+        except Exception as err:
+            self._warn_once(
+                "metrics", f"No CloudWatch storage metrics for {bucket_name}: {err}"
+            )
+        return metadata
+
+    def fetch_all(
+        self,
+        bucket_names: Iterable[str],
+        on_result: Callable[[str, BucketMetadata], None],
+        cache: Optional[MetadataCache] = None,
+        max_workers: int = DEFAULT_WORKERS,
+        should_cancel: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        """Fetch metadata for many buckets concurrently.
+
+        Fresh cache entries are reported immediately; the rest are fetched on
+        a bounded pool and reported as each one completes.
+        """
+        pending = []
+        for bucket_name in bucket_names:
+            cached = cache.get(bucket_name) if cache is not None else None
+            if cached is not None:
+                on_result(bucket_name, cached)
+            else:
+                pending.append(bucket_name)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.fetch, name): name for name in pending}
+            for future in as_completed(futures):
+                if should_cancel is not None and should_cancel():
+                    for other in futures:
+                        other.cancel()
+                    break
+                bucket_name = futures[future]
+                try:
+                    metadata = future.result()
+                except Exception as err:
+                    self._warn_once(
+                        "metadata", f"Could not fetch metadata for {bucket_name}: {err}"
+                    )
+                    continue
+                if cache is not None:
+                    cache.put(bucket_name, metadata)
+                on_result(bucket_name, metadata)
+
+        if cache is not None:
+            cache.save()
@@ -0,0 +1,272 @@
+"""S3 bucket operations shared by the S3 TUI and command line"""
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+)
+
+from botocore.exceptions import ClientError
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import ObjectIdentifierTypeDef
+
+# DeleteObjects accepts at most 1,000 keys per request.
+MAX_DELETE_BATCH = 1000
+DEFAULT_WORKERS = 8
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+THROTTLE_CODES = {
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "ServiceUnavailable",
+    "InternalError",
+    "503",
+}
+
+
+class EmptyResult(NamedTuple):
+    deleted: int
+    failed: int
+    seconds: float
+    cancelled: bool = False
+    # Set once a listing found no versions left in the bucket.
+    empty: bool = False
+
+    @property
+    def rate(self) -> float:
+        return self.deleted / self.seconds if self.seconds else 0.0
+
+
+class ObjectEntry(NamedTuple):
+    """An object, or a common prefix when is_prefix is set"""
+
+    key: str
+    is_prefix: bool = False
+    size: int = 0
+    last_modified: Optional[datetime] = None
+
+
+class ObjectPage(NamedTuple):
+    entries: List[ObjectEntry]
+    next_token: Optional[str]
+
+
+def list_object_page(
+    client: "S3Client",
+    bucket_name: str,
+    prefix: str = "",
+    delimiter: str = "/",
+    token: Optional[str] = None,
+    max_keys: int = 1000,
+    start_after: Optional[str] = None,
+) -> ObjectPage:
+    """Fetch one list_objects_v2 page, folding CommonPrefixes in as folder entries."""
+    kwargs = {
+        "Bucket": bucket_name,
+        "Prefix": prefix,
+        "Delimiter": delimiter,
+        "MaxKeys": max_keys,
+    }
+    if token:
+        kwargs["ContinuationToken"] = token
+    elif start_after:
+        kwargs["StartAfter"] = start_after
+    response = client.list_objects_v2(**kwargs)  # type: ignore
+    entries = [
+        ObjectEntry(common["Prefix"], is_prefix=True)
+        for common in response.get("CommonPrefixes", [])
+    ]
+    entries.extend(
+        ObjectEntry(obj["Key"], False, obj.get("Size", 0), obj.get("LastModified"))
+        for obj in response.get("Contents", [])
+    )
+    entries.sort(key=lambda entry: entry.key)
+    next_token = (
+        response.get("NextContinuationToken") if response.get("IsTruncated") else None
+    )
+    return ObjectPage(entries, next_token)
+
+
+def iter_objects(
+    client: "S3Client", bucket_name: str, prefix: str = "", delimiter: str = ""
+) -> Iterator[ObjectEntry]:
+    """Stream every object (and prefix, when a delimiter is given) page by page."""
+    token: Optional[str] = None
+    while True:
+        page = list_object_page(client, bucket_name, prefix, delimiter, token)
+        yield from page.entries
+        if page.next_token is None:
+            return
+        token = page.next_token
+
+
+def _backoff(attempt: int) -> None:
+    delay = min(BACKOFF_BASE * 2**attempt, BACKOFF_MAX)
+    time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def iter_version_batches(
+    client: "S3Client", bucket_name: str, batch_size: int = MAX_DELETE_BATCH
+) -> Iterator[List["ObjectIdentifierTypeDef"]]:
+    """Yield each page of versions and delete markers as a DeleteObjects batch.
+
+    Pages hold at most batch_size entries, so each one fits a single
+    DeleteObjects call.
+    """
+    kwargs = {"Bucket": bucket_name, "MaxKeys": batch_size}
+    while True:
+        page = client.list_object_versions(**kwargs)  # type: ignore
+        versions = page.get("Versions", []) + page.get("DeleteMarkers", [])  # type: ignore
+        batch: List["ObjectIdentifierTypeDef"] = [
+            {"Key": version["Key"], "VersionId": version["VersionId"]}
+            for version in versions
+        ]
+        if batch:
+            yield batch
+        if not page.get("IsTruncated"):
+            return
+        kwargs["KeyMarker"] = page["NextKeyMarker"]
+        if page.get("NextVersionIdMarker"):
+            kwargs["VersionIdMarker"] = page["NextVersionIdMarker"]
+        else:
+            kwargs.pop("VersionIdMarker", None)
+
+
+def delete_batch(
+    client: "S3Client",
+    bucket_name: str,
+    objects: List["ObjectIdentifierTypeDef"],
+    max_attempts: int = MAX_ATTEMPTS,
+) -> tuple[int, int]:
+    """Delete one batch of versions, retrying throttled keys with backoff.
+
+    Returns the number of deleted and failed objects.
+    """
+    deleted = 0
+    pending = objects
+    for attempt in range(max_attempts):
+        try:
+            response = client.delete_objects(
+                Bucket=bucket_name, Delete={"Objects": pending, "Quiet": True}
+            )
+        except ClientError as err:
+            if err.response["Error"]["Code"] not in THROTTLE_CODES:
+                raise
+            _backoff(attempt)
+            continue
+
+        errors = response.get("Errors", [])
+        throttled = {
+            (error.get("Key"), error.get("VersionId"))
+            for error in errors
+            if error.get("Code") in THROTTLE_CODES
+        }
+        for error in errors:
+            if error.get("Code") not in THROTTLE_CODES:
+                logging.error(
+                    f"Failed to delete {error.get('Key')} ({error.get('VersionId')}): "
+                    f"{error.get('Message')}"
+                )
+        deleted += len(pending) - len(errors)
+        if not throttled:
+            return deleted, len(errors)
+        pending = [
+            obj for obj in pending if (obj["Key"], obj.get("VersionId")) in throttled
+        ]
+        _backoff(attempt)
+    return deleted, len(objects) - deleted
+
+
+class BatchProgress:
+    """Running totals of delete batches that finish out of order"""
+
+    def __init__(self, on_progress: Optional[Callable[[int, int, float], None]] = None):
+        self.started = time.perf_counter()
+        self.deleted = self.failed = self.listed = 0
+        self.on_progress = on_progress
+
+    def submit(self, size: int) -> None:
+        self.listed += size
+
+    def finish(self, results: Iterable[tuple[int, int]]) -> None:
+        """Record the (deleted, failed) counts of batches that completed"""
+        reported = False
+        for batch_deleted, batch_failed in results:
+            self.deleted += batch_deleted
+            self.failed += batch_failed
+            reported = True
+        if reported and self.on_progress is not None:
+            self.on_progress(self.deleted, self.listed, self.elapsed)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def result(self, cancelled: bool = False, empty: bool = False) -> EmptyResult:
+        return EmptyResult(self.deleted, self.failed, self.elapsed, cancelled, empty)
+
+
+def empty_bucket(
+    client: "S3Client",
+    bucket_name: str,
+    max_workers: int = DEFAULT_WORKERS,
+    on_progress: Optional[Callable[[int, int, float], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+) -> EmptyResult:
+    """Delete every version and delete marker in a bucket.
+
+    Listing runs in the calling thread while batches are deleted on a bounded
+    worker pool, so listing and deleting overlap. At most two batches per
+    worker are queued at once to keep memory flat on huge buckets.
+    on_progress is called from the calling thread with (deleted, listed,
+    elapsed). When should_cancel returns True, listing stops and the batches
+    already submitted are allowed to finish.
+
+    Deleted versions drop out of the listing, so every pass lists from the
+    top and a restarted teardown never sees what an earlier run deleted. A
+    page marker can point at a version deleted meanwhile and end a pass
+    early, so passes repeat until one lists nothing, which sets empty on the
+    result. A pass that deletes nothing at all ends the run as well.
+    """
+    progress = BatchProgress(on_progress)
+    cancelled = empty = False
+    in_flight: Set["Future[tuple[int, int]]"] = set()
+
+    def collect(done: Set["Future[tuple[int, int]]"]) -> None:
+        progress.finish(future.result() for future in done)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while not cancelled:
+            listed, deleted = progress.listed, progress.deleted
+            for batch in iter_version_batches(client, bucket_name):
+                if should_cancel is not None and should_cancel():
+                    cancelled = True
+                    break
+                progress.submit(len(batch))
+                if len(in_flight) >= max_workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(pool.submit(delete_batch, client, bucket_name, batch))
+            done, in_flight = wait(in_flight)
+            collect(done)
+            if progress.listed == listed:
+                empty = not cancelled
+                break
+            if progress.deleted == deleted:
+                break
+
+    return progress.result(cancelled, empty)
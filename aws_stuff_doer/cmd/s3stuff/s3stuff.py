@@ -1,51 +1,79 @@
 """A Textual app to handle s3 bucket operations"""
-import boto3
-import logging
+import asyncio
+from typing import Optional
+from botocore.exceptions import BotoCoreError, ClientError
 from mypy_boto3_s3 import S3Client
-from mypy_boto3_s3.type_defs import ListObjectsV2OutputTypeDef
 
 # from textual import on
+from textual import work
 from textual.app import App, ComposeResult
 from textual.binding import Binding
-from textual.widgets import Header, Footer, ListItem, ListView, Label, Input, RichLog
+from textual.containers import Horizontal
+from textual.suggester import SuggestFromList
+from textual.widgets import Header, Footer, ListItem, ListView, Label, Input, RichLog, ProgressBar
+from textual.worker import get_current_worker
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+from ..clients import get_client
+from ..profiles import load_profile_index
+from . import analysis
+from .browser import ObjectBrowser
+from .checkpoints import TeardownCheckpoints
+from .threaded import ThreadedS3
+from .metadata import BucketMetadataFetcher, MetadataCache, describe
 
-logging.getLogger("botocore").setLevel(logging.ERROR)
-
-client: S3Client = boto3.client("s3")  # type: ignore
+# Bucket teardowns that run at the same time; the rest wait in the queue.
+MAX_PARALLEL_TEARDOWNS = 3
 
 class RichLogger:
     def __init__(self, rich_log: RichLog):
         self.rich_log = rich_log
 
+    def write(self, message: str):
+        """Write to the RichLog from the app thread or from a worker thread"""
+        try:
+            self.rich_log.app.call_from_thread(self.rich_log.write, message)
+        except RuntimeError:
+            self.rich_log.write(message)
+
     def info(self, message: str):
-        self.rich_log.write(f"[INFO] {message}")
+        self.write(f"[INFO] {message}")
 
     def error(self, message: str):
-        self.rich_log.write(f"[ERROR] {message}")
+        self.write(f"[ERROR] {message}")
 
     def warning(self, message: str):
-        self.rich_log.write(f"[WARNING] {message}")
+        self.write(f"[WARNING] {message}")
 
 class S3App(App): # type: ignore
     """Textual App to handle S3 Bucket Operations"""
     CSS_PATH = "s3app.css"
 
-    def __init__(self):
+    def __init__(self, profile: Optional[str] = None):
         super().__init__()
-        self.selected_bucket = None
+        self.profile = profile
+        self.client: S3Client = get_client("s3", profile)
+        self.s3 = ThreadedS3(self.client)
+        self.selected_buckets: list[str] = []
+        self.marked_buckets: set[str] = set()
+        self.active_deletes: dict[str, tuple[Horizontal, ProgressBar]] = {}
+        self.teardown_slots = asyncio.Semaphore(MAX_PARALLEL_TEARDOWNS)
+        self.checkpoints = TeardownCheckpoints()
+        self.metadata_cache = MetadataCache()
+        self.analyses = analysis.AnalysisIndex()
+        self.bucket_labels: dict[str, tuple[Label, str]] = {}
+        # Several teardowns can finish at once; refresh the list one at a time.
+        self.bucket_list_lock = asyncio.Lock()
 
     BINDINGS = [
         Binding("enter", "select_cursor", "Select", show=False),
         Binding("up", "cursor_up", "Cursor Up", show=False),
         Binding("down", "cursor_down", "Cursor Down", show=False),
         Binding("Q", "quit", "Quit"),
+        Binding("space", "mark_bucket", "Mark Bucket"),
         Binding("D", "delete_bucket", "Delete Bucket"),
+        Binding("C", "cancel_delete", "Cancel Deletes"),
+        Binding("P", "switch_profile", "Switch Profile"),
+        Binding("A", "analyze_bucket", "Analyze Bucket"),
     ]
 
     def compose(self) -> ComposeResult:
@@ -58,99 +86,322 @@ class S3App(App): # type: ignore
     def on_mount(self) -> None:
         """Event handler called when the app is mounted"""
         self.rich_logger = RichLogger(self.query_one(RichLog))
+        self.sub_title = self.profile or "default credentials"
         self.list_buckets()
         self.query_one(RichLog).visible = True  # Ensure RichLog is visible
         self.set_focus(self.query_one(ListView))  # Set initial focus to
 
-    def list_buckets(self):
+    @work(exclusive=True, group="list_buckets")
+    async def list_buckets(self):
         """List all S3 buckets"""
         try:
-            response = client.list_buckets()
-            list_view = self.query_one(ListView)
-            list_view.clear()  # Clear the list view first
-            buckets = response.get("Buckets", [])
-            for bucket in buckets:
-                bucket_name = bucket.get("Name", "")
-                bucket_date = bucket.get("CreationDate", "")
-                list_item = ListItem( Label(f"{bucket_name} ({bucket_date})"), classes="bucket-item")
-                list_view.append(list_item)
-        except client.exceptions.ClientError as err:
+            # Creating a profile's first client loads botocore data; keep it off the loop.
+            self.client = await asyncio.to_thread(get_client, "s3", self.profile)
+            self.s3 = ThreadedS3(self.client)
+            buckets = await self.s3.list_buckets()
+        except (BotoCoreError, ClientError) as err:
             self.rich_logger.error(f"Error listing buckets: {err}")
+            return
+        await self.show_buckets(buckets)
+        self.enrich_buckets([bucket.get("Name", "") for bucket in buckets])
+
+    async def show_buckets(self, buckets):
+        """Render the bucket list, called on the app thread"""
+        async with self.bucket_list_lock:
+            await self.render_buckets(buckets)
+
+    async def render_buckets(self, buckets):
+        list_view = self.query_one(ListView)
+        await list_view.clear()  # Clear the list view first
+        self.bucket_labels = {}
+        items = []
+        for bucket in buckets:
+            bucket_name = bucket.get("Name", "")
+            bucket_date = bucket.get("CreationDate", "")
+            text = f"{bucket_name} ({bucket_date})"
+            previous = self.analyses.get(bucket_name)
+            if previous is not None:
+                text += f"\n{analysis.describe(previous)}"
+            label = Label(text)
+            self.bucket_labels[bucket_name] = (label, text)
+            list_item = ListItem(label, classes="bucket-item", name=bucket_name)
+            list_item.set_class(bucket_name in self.marked_buckets, "marked")
+            items.append(list_item)
+        await list_view.extend(items)
+        self.marked_buckets &= set(self.bucket_labels)
+
+    @work(thread=True, exclusive=True, group="enrich")
+    def enrich_buckets(self, bucket_names: list[str]):
+        """Fill in region, versioning, size and count as lookups complete"""
+        worker = get_current_worker()
+        BucketMetadataFetcher(self.client, self.profile).fetch_all(
+            bucket_names,
+            lambda name, metadata: self.call_from_thread(self.show_metadata, name, metadata),
+            cache=self.metadata_cache,
+            should_cancel=lambda: worker.is_cancelled,
+        )
+
+    def show_metadata(self, bucket_name: str, metadata):
+        """Append metadata to a bucket's row, called on the app thread"""
+        if bucket_name in self.bucket_labels:
+            label, text = self.bucket_labels[bucket_name]
+            label.update(f"{text}\n{describe(metadata)}")
+
+    def highlighted_bucket(self) -> Optional[str]:
+        list_view = self.query_one(ListView)
+        if list_view.index is None:
+            return None
+        return str(list_view.children[list_view.index].name)
 
-    def list_objects(self, bucket_name: str):
-        """List objects in a specific S3 bucket"""
+    def action_analyze_bucket(self) -> None:
+        """Summarise the highlighted bucket's versions per prefix"""
+        bucket_name = self.highlighted_bucket()
+        if bucket_name is None:
+            self.rich_logger.error("No bucket selected")
+            return
+        self.rich_logger.info(f"Analyzing {bucket_name}...")
+        self.analyze_bucket(bucket_name)
+
+    @work(group="analyze")
+    async def analyze_bucket(self, bucket_name: str):
+        """List every version of a bucket once and show the summary in its row"""
         try:
-            response: ListObjectsV2OutputTypeDef = client.list_objects_v2(Bucket=bucket_name)
-            return response
-        except client.exceptions.ClientError as err:
-            self.rich_logger.error(f"Error listing objects in bucket {bucket_name}: {err}")
-        return None
+            result = await self.s3.call(
+                analysis.analyze_bucket,
+                self.client,
+                bucket_name,
+                self.analyses.get(bucket_name),
+            )
+        except (BotoCoreError, ClientError) as err:
+            self.rich_logger.error(f"Error analyzing bucket {bucket_name}: {err}")
+            return
+        self.analyses.put(result)
+        await asyncio.to_thread(self.analyses.save)
+        summary = analysis.describe(result)
+        self.rich_logger.info(f"Analyzed {bucket_name} in {result.seconds:.1f}s: {summary}")
+        if bucket_name in self.bucket_labels:
+            label, text = self.bucket_labels[bucket_name]
+            first_line = text.partition("\n")[0]
+            text = f"{first_line}\n{summary}"
+            self.bucket_labels[bucket_name] = (label, text)
+            metadata = self.metadata_cache.get(bucket_name)
+            label.update(f"{text}\n{describe(metadata)}" if metadata else text)
 
-    def delete_bucket(self, bucket_name: str):
-        """Delete a specific S3 bucket"""
+    async def delete_bucket(self, bucket_name: str):
+        """Delete a specific S3 bucket, emptying it first if it holds versions"""
         try:
-            response = client.delete_bucket(Bucket=bucket_name)
-            return response
-        except client.exceptions.ClientError as err:
-            if err.response['Error']['Code'] == 'BucketNotEmpty':
-                self.rich_logger.info(f"Bucket {bucket_name} is not empty. Emptying it now...")
-                self.empty_bucket(bucket_name)
-                self.rich_logger.info(f"Finished emptying bucket {bucket_name}. Attempting to delete again...")
-                try:
-                    response = client.delete_bucket(Bucket=bucket_name)
-                    return response
-                except client.exceptions.ClientError as err:
-                    self.rich_logger.error(f"Error deleting bucket {bucket_name}: {err}")
-            else:
+            return await self.s3.delete_bucket(bucket_name)
+        except ClientError as err:
+            if err.response['Error']['Code'] != 'BucketNotEmpty':
                 self.rich_logger.error(f"Error deleting bucket {bucket_name}: {err}")
+                return None
+        except BotoCoreError as err:
+            self.rich_logger.error(f"Error deleting bucket {bucket_name}: {err}")
+            return None
+        self.rich_logger.info(f"Bucket {bucket_name} is not empty. Emptying it now...")
+        try:
+            if not await self.empty_bucket(bucket_name):
+                return None
+            self.rich_logger.info(f"Finished emptying bucket {bucket_name}. Attempting to delete again...")
+            return await self.s3.delete_bucket(bucket_name)
+        except (BotoCoreError, ClientError) as err:
+            self.rich_logger.error(f"Error deleting bucket {bucket_name}: {err}")
         return None
 
-    def empty_bucket(self, bucket_name: str):
-        """Empty a specific S3 bucket"""
-        paginator = client.get_paginator('list_object_versions')
-        for page in paginator.paginate(Bucket=bucket_name):
-            versions = page.get('Versions', []) + page.get('DeleteMarkers', [])
-            for version in versions:
-                client.delete_object(Bucket=bucket_name, Key=version['Key'], VersionId=version['VersionId'])
+    async def empty_bucket(self, bucket_name: str) -> bool:
+        """Empty a specific S3 bucket.
+
+        Returns False if versions are left behind. Cancelling the worker
+        raises CancelledError once in-flight batches are checkpointed.
+        """
+        last_report = 0.0
+        previously_deleted = self.checkpoints.deleted(bucket_name)
+        if previously_deleted:
+            self.rich_logger.info(
+                f"Resuming {bucket_name} ({previously_deleted} objects already deleted)"
+            )
+
+        def report(deleted: int, listed: int, elapsed: float):
+            nonlocal last_report
+            self.checkpoints.save(bucket_name, previously_deleted + deleted)
+            self.update_progress(bucket_name, deleted, listed)
+            if elapsed - last_report < 1.0:
+                return
+            last_report = elapsed
+            rate = deleted / elapsed if elapsed else 0.0
+            self.rich_logger.info(f"Deleted {deleted} objects from {bucket_name} ({rate:.0f} objects/s)")
+
+        try:
+            result = await self.s3.empty_bucket(bucket_name, on_progress=report)
+        except asyncio.CancelledError:
+            deleted = self.checkpoints.deleted(bucket_name)
+            self.rich_logger.warning(f"Stopped emptying {bucket_name} after {deleted} objects")
+            raise
+        finally:
+            await asyncio.to_thread(self.checkpoints.flush)
+        if result.failed:
+            self.rich_logger.error(f"{result.failed} objects in {bucket_name} could not be deleted")
+        if not result.empty:
+            self.rich_logger.error(f"{bucket_name} still holds versions, the teardown can be retried")
+            return False
+        # Only a listing that found nothing left ends the teardown.
+        self.checkpoints.clear(bucket_name)
+        self.rich_logger.info(
+            f"Emptied {bucket_name}: {result.deleted} objects in {result.seconds:.1f}s ({result.rate:.0f} objects/s)"
+        )
+        return True
+
+    def update_progress(self, bucket_name: str, deleted: int, listed: int):
+        """Advance a bucket's deletion progress bar, called on the app thread"""
+        if bucket_name in self.active_deletes:
+            _, progress = self.active_deletes[bucket_name]
+            progress.update(total=listed, progress=deleted)
+
+    @work(group="delete")
+    async def run_delete(self, bucket_name: str):
+        """Delete a bucket in the background once a teardown slot is free"""
+        response = None
+        try:
+            async with self.teardown_slots:
+                self.rich_logger.info(f"Starting teardown of {bucket_name}")
+                response = await self.delete_bucket(bucket_name)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.finish_delete(bucket_name, response)
+
+    async def finish_delete(self, bucket_name: str, response):
+        """Report the outcome of a background delete"""
+        if bucket_name in self.active_deletes:
+            row, _ = self.active_deletes.pop(bucket_name)
+            await row.remove()
+        if response is not None:
+            self.rich_logger.info(f"Deleted bucket: {bucket_name}")
+            self.checkpoints.clear(bucket_name)
+            self.metadata_cache.discard(bucket_name)
+            self.analyses.discard(bucket_name)
+            await asyncio.to_thread(self.analyses.save)
+            self.list_buckets()
+        else:
+            self.rich_logger.error(f"Failed to delete bucket: {bucket_name}")
+
+    def action_cancel_delete(self) -> None:
+        """Cancel a running bucket delete"""
+        if self.workers.cancel_group(self, "delete"):
+            self.rich_logger.info("Cancelling bucket deletions, progress is checkpointed...")
+        else:
+            self.rich_logger.info("No bucket deletion in progress")
 
     def action_select_cursor(self) -> None:
         """Event handler for selecting an item"""
         list_view = self.query_one(ListView)
         selected_item = list_view.index
         if selected_item is not None:
-            selected_bucket = list_view.children[selected_item].children[0].render().split(" ")[0]
+            selected_bucket = str(list_view.children[selected_item].name)
             self.rich_logger.info(f"Selected bucket: {selected_bucket}")
+            self.push_screen(ObjectBrowser(self.s3, selected_bucket))
         else:
             self.rich_logger.error("No bucket selected")
 
+    def on_list_view_selected(self, message: ListView.Selected) -> None:
+        """Open the object browser for the bucket chosen with enter"""
+        self.action_select_cursor()
+
+    def action_switch_profile(self) -> None:
+        """Ask for another profile to show the buckets of"""
+        if self.active_deletes:
+            self.rich_logger.error("Wait for running bucket deletions before switching profile")
+            return
+        if self.query("#terminal"):
+            return
+        profiles = load_profile_index().profile_names()
+        prompt = Input(
+            name="switch_profile",
+            id="terminal",
+            classes="box",
+            placeholder="Profile to switch to, right arrow completes",
+            suggester=SuggestFromList(profiles, case_sensitive=False),
+        )
+        self.mount(prompt)
+        self.set_focus(prompt)
+
+    def switch_profile(self, profile: str):
+        """Show the buckets of another profile, called on the app thread"""
+        if profile not in load_profile_index().profile_names():
+            self.rich_logger.error(f"Unknown profile: {profile}")
+            return
+        self.workers.cancel_group(self, "enrich")
+        self.profile = profile
+        self.marked_buckets.clear()
+        self.sub_title = profile
+        self.rich_logger.info(f"Switched to profile {profile}")
+        self.list_buckets()
+
+    def action_mark_bucket(self) -> None:
+        """Toggle the highlighted bucket in the multi-bucket selection"""
+        list_view = self.query_one(ListView)
+        selected_item = list_view.index
+        if selected_item is None:
+            return
+        item = list_view.children[selected_item]
+        bucket_name = str(item.name)
+        if bucket_name in self.marked_buckets:
+            self.marked_buckets.discard(bucket_name)
+        else:
+            self.marked_buckets.add(bucket_name)
+        item.set_class(bucket_name in self.marked_buckets, "marked")
+
     def action_delete_bucket(self) -> None:
-        """Delete the selected bucket"""
+        """Delete the marked buckets, or the highlighted one if none are marked"""
         list_view = self.query_one(ListView)
         selected_item = list_view.index
-        if selected_item is not None:
-            selected_text = str(list_view.children[selected_item].children[0].render())
-            # selected_bucket = selected_text.split("(")[0]
-            self.rich_logger.info(f"Selected text: {selected_text}")
-            self.selected_bucket: str = selected_text.split(" ")[0]
-            self.rich_logger.info(f"Attempting to delete bucket: {self.selected_bucket}")
-            self.mount(Input(name="confirm_delete", id="terminal", classes="box"))
-            self.set_focus(self.query_one(Input))
-            self.query_one(Input).value = ""
-            self.query_one(Input).placeholder = "Type 'y' to confirm deletion"
+        if self.marked_buckets:
+            buckets = [str(item.name) for item in list_view.children if item.name in self.marked_buckets]
+        elif selected_item is not None:
+            buckets = [str(list_view.children[selected_item].name)]
         else:
             self.rich_logger.error("No bucket selected")
+            return
+
+        running = [bucket for bucket in buckets if bucket in self.active_deletes]
+        if running:
+            self.rich_logger.error(f"Already deleting: {', '.join(running)}")
+        self.selected_buckets = [bucket for bucket in buckets if bucket not in self.active_deletes]
+        if not self.selected_buckets:
+            return
+        if self.query("#terminal"):
+            return
+        self.rich_logger.info(f"Attempting to delete buckets: {', '.join(self.selected_buckets)}")
+        for bucket_name in self.selected_buckets:
+            previous = self.analyses.get(bucket_name)
+            if previous is None:
+                self.rich_logger.warning(f"{bucket_name} was never analyzed, press A to check its last write")
+            else:
+                self.rich_logger.info(f"{bucket_name}: {analysis.describe(previous)}")
+        self.mount(Input(name="confirm_delete", id="terminal", classes="box"))
+        self.set_focus(self.query_one(Input))
+        self.query_one(Input).value = ""
+        self.query_one(Input).placeholder = f"Type 'y' to confirm deletion of {len(self.selected_buckets)} bucket(s)"
 
     async def on_input_submitted(self, message: Input.Submitted) -> None:
         """Handle the input confirmation for deletion"""
-        if message.input.name == "confirm_delete":
+        if message.input.name == "switch_profile":
+            await message.input.remove()
+            if message.value.strip():
+                self.switch_profile(message.value.strip())
+            self.set_focus(self.query_one(ListView))
+        elif message.input.name == "confirm_delete":
             confirm_input = self.query_one(Input)
             if confirm_input.value.lower() == "y":
-                response = self.delete_bucket(str(self.selected_bucket))
-                if response is not None:
-                    self.rich_logger.info(f"Deleted bucket: {self.selected_bucket}")
-                    self.list_buckets()
-                else:
-                    self.rich_logger.error(f"Failed to delete bucket: {self.selected_bucket}")
+                for bucket_name in self.selected_buckets:
+                    progress = ProgressBar(show_eta=False)
+                    row = Horizontal(Label(bucket_name, classes="progress-label"), progress, classes="progress")
+                    self.active_deletes[bucket_name] = (row, progress)
+                    await self.mount(row)
+                    self.run_delete(bucket_name)
+                self.marked_buckets.clear()
+                for item in self.query(".marked"):
+                    item.remove_class("marked")
             else:
                 self.rich_logger.info("Deletion canceled")
             await confirm_input.remove()
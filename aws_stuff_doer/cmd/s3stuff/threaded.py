@@ -0,0 +1,175 @@
+"""Blocking S3 calls the Textual app can await without freezing its UI.
+
+boto3 calls block, so ThreadedS3 runs each one on a process-wide worker pool
+and bounds how many are in flight with a semaphore. Every call goes through
+the same pooled client, whose connection pool is sized to that bound, so the
+app's screens share one set of connections.
+
+This is a TUI helper, not asynchronous I/O: at most MAX_POOL_CONNECTIONS (50)
+calls run at once, each holding a thread. Headless commands call the
+functions in operations directly.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TypeVar,
+)
+
+from ..clients import MAX_POOL_CONNECTIONS
+from . import operations
+from .inventory import list_all_buckets
+from .operations import (
+    DEFAULT_WORKERS,
+    BatchProgress,
+    EmptyResult,
+    ObjectPage,
+)
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import ObjectIdentifierTypeDef
+
+# Calls in flight per ThreadedS3; more would only queue for a pooled connection.
+DEFAULT_CONCURRENCY = MAX_POOL_CONNECTIONS
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_DONE = object()
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """Worker pool every ThreadedS3 runs its blocking calls on"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_POOL_CONNECTIONS, thread_name_prefix="asd-s3"
+            )
+        return _executor
+
+
+class ThreadedS3:
+    """S3 listing and deletion for one client, run on threads for the TUI"""
+
+    def __init__(self, client: "S3Client", max_concurrency: int = DEFAULT_CONCURRENCY):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def call(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call on the worker pool once a slot is free"""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                shared_executor(), functools.partial(function, *args, **kwargs)
+            )
+
+    async def _iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """Advance a paginating iterator one page per call"""
+        while True:
+            item = await self.call(next, iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item  # type: ignore
+
+    async def list_buckets(self) -> List[Dict[str, Any]]:
+        return await self.call(list_all_buckets, self.client)
+
+    async def list_object_page(
+        self,
+        bucket_name: str,
+        prefix: str = "",
+        delimiter: str = "/",
+        token: Optional[str] = None,
+        max_keys: int = 1000,
+        start_after: Optional[str] = None,
+    ) -> ObjectPage:
+        return await self.call(
+            operations.list_object_page,
+            self.client,
+            bucket_name,
+            prefix,
+            delimiter,
+            token,
+            max_keys,
+            start_after,
+        )
+
+    def iter_version_batches(
+        self, bucket_name: str
+    ) -> AsyncIterator[List["ObjectIdentifierTypeDef"]]:
+        """Versions and delete markers as DeleteObjects batches, as listed"""
+        return self._iterate(operations.iter_version_batches(self.client, bucket_name))
+
+    async def delete_batch(
+        self, bucket_name: str, objects: List["ObjectIdentifierTypeDef"]
+    ) -> tuple[int, int]:
+        """Delete one batch, returning the number of deleted and failed objects"""
+        return await self.call(
+            operations.delete_batch, self.client, bucket_name, objects
+        )
+
+    async def delete_bucket(self, bucket_name: str) -> Dict[str, Any]:
+        return await self.call(self.client.delete_bucket, Bucket=bucket_name)
+
+    async def empty_bucket(
+        self,
+        bucket_name: str,
+        max_batches: int = DEFAULT_WORKERS,
+        on_progress: Optional[Callable[[int, int, float], None]] = None,
+    ) -> EmptyResult:
+        """Delete every version and delete marker in a bucket.
+
+        Works like operations.empty_bucket, listing in passes from the top
+        with up to max_batches deletes running while a pass continues.
+        Cancelling the calling task stops the listing; batches already
+        submitted still finish and are reported before CancelledError is
+        raised again.
+        """
+        progress = BatchProgress(on_progress)
+        empty = False
+        in_flight: Set["asyncio.Task[tuple[int, int]]"] = set()
+
+        def collect(done: Set["asyncio.Task[tuple[int, int]]"]) -> None:
+            progress.finish(task.result() for task in done)
+
+        try:
+            while True:
+                listed, deleted = progress.listed, progress.deleted
+                async for batch in self.iter_version_batches(bucket_name):
+                    progress.submit(len(batch))
+                    if len(in_flight) >= max_batches:
+                        done, in_flight = await asyncio.wait(
+                            in_flight, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        collect(done)
+                    in_flight.add(
+                        asyncio.ensure_future(self.delete_batch(bucket_name, batch))
+                    )
+                if in_flight:
+                    done, in_flight = await asyncio.wait(in_flight)
+                    collect(done)
+                if progress.listed == listed:
+                    empty = True
+                    break
+                if progress.deleted == deleted:
+                    break
+        except asyncio.CancelledError:
+            if in_flight:
+                done, _ = await asyncio.wait(in_flight)
+                collect(done)
+            raise
+        return progress.result(empty=empty)
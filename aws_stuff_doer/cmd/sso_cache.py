@@ -0,0 +1,138 @@
+"""Local reads of the AWS CLI SSO token and role credential caches."""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .profiles import ProfileIndex
+
+# Treat anything expiring within this window as already expired.
+EXPIRY_SKEW = timedelta(minutes=1)
+
+
+def sso_token_cache_dir() -> Path:
+    return Path.home() / ".aws" / "sso" / "cache"
+
+
+def role_credentials_cache_dir() -> Path:
+    """Where the AWS CLI (and asd) cache role credentials fetched via SSO."""
+    return Path.home() / ".aws" / "cli" / "cache"
+
+
+def parse_expiry(value: Optional[str]) -> Optional[datetime]:
+    """Parse the timestamp formats the CLI writes ("...Z", "...UTC", ISO offsets)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith("UTC"):
+        value = value[:-3].strip() + "+00:00"
+    elif value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        expiry = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return expiry
+
+
+def is_expired(expiry: datetime, now: Optional[datetime] = None) -> bool:
+    now = now or datetime.now(timezone.utc)
+    return expiry - EXPIRY_SKEW <= now
+
+
+def token_cache_key(start_url: str, session_name: Optional[str]) -> str:
+    """Same key botocore's SSOTokenLoader uses for ~/.aws/sso/cache files."""
+    return hashlib.sha1((session_name or start_url).encode("utf-8")).hexdigest()
+
+
+def role_credentials_cache_key(
+    account_id: str,
+    role_name: str,
+    session_name: Optional[str],
+    start_url: Optional[str],
+) -> str:
+    """Same key botocore's SSOCredentialFetcher uses for cached role credentials."""
+    args: Dict[str, Any] = {"roleName": role_name, "accountId": account_id}
+    if session_name:
+        args["sessionName"] = session_name
+    else:
+        args["startUrl"] = start_url
+    payload = json.dumps(args, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def load_sso_token(index: ProfileIndex, profile: str) -> Optional[Dict[str, Any]]:
+    """Return the cached SSO token for a profile's session, if there is one."""
+    start_url = index.sso_start_url(profile)
+    if start_url is None:
+        return None
+    session_name = (index.profile(profile) or {}).get("sso_session")
+    key = token_cache_key(start_url, session_name)
+    return _read_json(sso_token_cache_dir() / f"{key}.json")
+
+
+def load_session_token(
+    index: ProfileIndex, session_name: str
+) -> Optional[Dict[str, Any]]:
+    """Return the cached SSO token of an sso-session, if there is one."""
+    start_url = (index.sessions.get(session_name) or {}).get("sso_start_url")
+    if start_url is None:
+        return None
+    key = token_cache_key(start_url, session_name)
+    return _read_json(sso_token_cache_dir() / f"{key}.json")
+
+
+def load_role_credentials(
+    index: ProfileIndex, profile: str
+) -> Optional[Dict[str, Any]]:
+    """Return the cached role credentials for a profile, if there are any."""
+    account_id = index.account_id(profile)
+    role_name = index.role_name(profile)
+    if account_id is None or role_name is None:
+        return None
+    session_name = (index.profile(profile) or {}).get("sso_session")
+    key = role_credentials_cache_key(
+        account_id, role_name, session_name, index.sso_start_url(profile)
+    )
+    return _read_json(role_credentials_cache_dir() / f"{key}.json")
+
+
+def sso_token_valid(index: ProfileIndex, profile: str) -> Optional[bool]:
+    """Whether the profile's cached SSO token is unexpired, None if unknown."""
+    if index.sso_start_url(profile) is None:
+        return None
+    token = load_sso_token(index, profile)
+    if token is None:
+        return False
+    token_expiry = parse_expiry(token.get("expiresAt"))
+    if token_expiry is None:
+        return None
+    return not is_expired(token_expiry)
+
+
+def cached_session_valid(index: ProfileIndex, profile: str) -> Optional[bool]:
+    """Decide from the local caches alone whether a profile's SSO session is usable.
+
+    Returns True if the SSO token or the cached role credentials are still
+    valid, False if the profile uses SSO but neither is, and None when the
+    profile is not an SSO profile and validity can't be determined locally.
+    """
+    if index.sso_start_url(profile) is None:
+        return None
+
+    credentials = load_role_credentials(index, profile) or {}
+    role_expiry = parse_expiry(credentials.get("Credentials", {}).get("Expiration"))
+    if role_expiry is not None and not is_expired(role_expiry):
+        return True
+
+    return sso_token_valid(index, profile)
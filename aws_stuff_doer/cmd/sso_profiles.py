@@ -0,0 +1,165 @@
+"""Generate profiles for every account and role an SSO session can access"""
+import logging
+import re
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from .clients import get_client
+from .config_file import ConfigEditor
+from .profiles import PROFILE_PREFIX, ProfileIndex
+from .sso_cache import is_expired, load_session_token, parse_expiry
+
+if TYPE_CHECKING:
+    from mypy_boto3_sso import SSOClient
+
+DEFAULT_TEMPLATE = "{account_name}-{role_name}"
+DEFAULT_WORKERS = 8
+
+
+class AccountRole(NamedTuple):
+    account_id: str
+    account_name: str
+    email: str
+    role_name: str
+
+
+def session_access_token(index: ProfileIndex, session_name: str) -> Optional[str]:
+    """The session's cached SSO access token, logging in first if it expired"""
+    token = load_session_token(index, session_name) or {}
+    expiry = parse_expiry(token.get("expiresAt"))
+    if expiry is None or is_expired(expiry) or not token.get("accessToken"):
+        try:
+            subprocess.run(
+                ["aws", "sso", "login", "--sso-session", session_name], check=True
+            )
+        except (subprocess.CalledProcessError, FileNotFoundError) as err:
+            logging.error(f"SSO login failed for session {session_name}: {err}")
+            return None
+        token = load_session_token(index, session_name) or {}
+    return token.get("accessToken")
+
+
+def list_account_roles(
+    client: "SSOClient", access_token: str, max_workers: int = DEFAULT_WORKERS
+) -> List[AccountRole]:
+    """Every account and role the token can use, in account listing order.
+
+    Accounts are paged through once, then each account's roles are listed
+    concurrently.
+    """
+    accounts = [
+        account
+        for page in client.get_paginator("list_accounts").paginate(
+            accessToken=access_token
+        )
+        for account in page["accountList"]
+    ]
+
+    def roles(account: Dict[str, str]) -> List[AccountRole]:
+        paginator = client.get_paginator("list_account_roles")
+        return [
+            AccountRole(
+                account["accountId"],
+                account.get("accountName", account["accountId"]),
+                account.get("emailAddress", ""),
+                role["roleName"],
+            )
+            for page in paginator.paginate(
+                accessToken=access_token, accountId=account["accountId"]
+            )
+            for role in page["roleList"]
+        ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return [role for account in pool.map(roles, accounts) for role in account]
+
+
+def profile_name(template: str, role: AccountRole, session_name: str) -> str:
+    """Render the naming template, replacing characters a profile name can't hold"""
+    name = template.format(**role._asdict(), session=session_name)
+    return re.sub(r"[^\w.@+-]+", "-", name).strip("-")
+
+
+def render_profiles(
+    roles: List[AccountRole],
+    session_name: str,
+    template: str,
+    region: Optional[str],
+    default_region: str,
+    index: ProfileIndex,
+) -> Dict[str, Dict[str, str]]:
+    """Profile sections for each role, keyed by section name.
+
+    A role that already has a profile for this session keeps that profile's
+    name. Names the template renders for more than one role, or that any
+    other profile in the config already has, get the account ID appended,
+    and a counter after that if the name is still taken. Existing profiles
+    only have their region changed when region is given.
+    """
+    existing: Dict[Tuple[str, str], str] = {}
+    for name, settings in index.profiles.items():
+        if settings.get("sso_session") == session_name:
+            key = (
+                settings.get("sso_account_id", ""),
+                settings.get("sso_role_name", ""),
+            )
+            existing.setdefault(key, name)
+
+    rendered = Counter(profile_name(template, role, session_name) for role in roles)
+    # Every profile in the file, whatever it is for, and every name handed
+    # out below. Only a role's own existing profile may be written to.
+    taken = set(index.profiles)
+    sections: Dict[str, Dict[str, str]] = {}
+    for role in roles:
+        key = (role.account_id, role.role_name)
+        name = existing.get(key)
+        if name is None:
+            name = profile_name(template, role, session_name)
+            if rendered[name] > 1 or name in taken:
+                name = f"{name}-{role.account_id}"
+            base, suffix = name, 2
+            while name in taken:
+                name = f"{base}-{suffix}"
+                suffix += 1
+            taken.add(name)
+        settings = {
+            "sso_session": session_name,
+            "sso_account_id": role.account_id,
+            "sso_role_name": role.role_name,
+        }
+        if region is not None or key not in existing:
+            settings["region"] = region or default_region
+        sections[f"{PROFILE_PREFIX}{name}"] = settings
+    return sections
+
+
+def generate_profiles(
+    index: ProfileIndex,
+    session_name: str,
+    template: str = DEFAULT_TEMPLATE,
+    region: Optional[str] = None,
+    max_workers: int = DEFAULT_WORKERS,
+    config_path: Optional[Path] = None,
+) -> List[str]:
+    """Add or update a profile per account and role of an sso-session.
+
+    Returns the names of the sections that changed.
+    """
+    session = index.sessions.get(session_name)
+    if session is None:
+        raise ValueError(f"No sso-session named {session_name}")
+    sso_region = session.get("sso_region")
+    access_token = session_access_token(index, session_name)
+    if access_token is None:
+        raise RuntimeError(f"No SSO token for session {session_name}")
+
+    client = get_client("sso", region=sso_region)
+    roles = list_account_roles(client, access_token, max_workers)
+    logging.info(f"Found {len(roles)} roles for session {session_name}")
+    sections = render_profiles(
+        roles, session_name, template, region, sso_region or "us-east-1", index
+    )
+    return ConfigEditor(config_path).upsert(sections)
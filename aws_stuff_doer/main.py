@@ -1,25 +1,31 @@
+import importlib
 import logging
-from typing import Optional
+from types import ModuleType
+from typing import List, Optional
 
 import typer
-import boto3
-from botocore.exceptions import ProfileNotFound
-import pkg_resources
-
-from .cmd.config import AWSConfigManager
-from .cmd.aws_auth import AWSAuthenticator
-from .cmd.s3stuff import s3stuff
 
 
 def get_version():
+    from importlib import metadata
+
     package_name = "aws-stuff-doer"
 
     try:
-        return pkg_resources.get_distribution(package_name).version
-    except pkg_resources.DistributionNotFound:
+        return metadata.version(package_name)
+    except metadata.PackageNotFoundError:
         return "unknown"
 
 
+def load_command(module: str) -> ModuleType:
+    """Import a subcommand module on first use.
+
+    Subcommand modules pull in boto3 and Textual, so they are only imported
+    by the command that needs them instead of at CLI startup.
+    """
+    return importlib.import_module(f"{__package__}.cmd.{module}")
+
+
 app = typer.Typer(
     help="ASD: An AWS Utility to help manage AWS SSO and AWS CLI profiles",
     invoke_without_command=True,
@@ -36,10 +42,53 @@ def setup_logging():
     logging.getLogger("botocore").setLevel(logging.ERROR)
 
 
+def setup_call_metrics(
+    ctx: typer.Context, summary: bool, output: Optional[str]
+) -> None:
+    """Instrument AWS API calls and report the metrics when the command exits"""
+    from pathlib import Path
+
+    metrics = load_command("instrumentation").enable_metrics()
+
+    def report() -> None:
+        if summary:
+            metrics.print_summary()
+        if output is not None:
+            metrics.dump(Path(output))
+
+    ctx.call_on_close(report)
+
+
+def complete_profile(incomplete: str) -> list[str]:
+    """Shell completion for --profile, served from the cached profile index"""
+    from .cmd.profiles import load_profile_index
+
+    return load_profile_index().search(incomplete)
+
+
+def complete_profile_list(incomplete: str) -> list[str]:
+    """Shell completion for the last entry of a comma-separated profile list"""
+    head, _, last = incomplete.rpartition(",")
+    prefix = f"{head}," if head else ""
+    return [prefix + name for name in complete_profile(last)]
+
+
 @app.command(name="list")
-def list_profiles():
+def list_profiles(
+    filter: str = typer.Option(
+        "", "-f", "--filter", help="Only show profiles starting with this prefix"
+    ),
+    account: str = typer.Option(
+        "", "--account", help="Only show profiles whose account ID starts with this"
+    ),
+):
     """List available AWS profiles"""
-    profiles = AWSAuthenticator.list_profiles()
+    if filter or account:
+        from .cmd.profiles import load_profile_index
+
+        profiles = load_profile_index().search(filter, account)
+    else:
+        profiles = load_command("aws_auth").AWSAuthenticator.list_profiles()
     print("Available AWS profiles:")
     for profile in profiles:
         print(profile)
@@ -49,49 +98,176 @@ def list_profiles():
 def configure(
     sso: bool = typer.Option(False, help="Configure AWS SSO profile"),
     session: bool = typer.Option(False, help="Initialize AWS SSO session"),
-    fmt: bool = typer.Option(False, help="Reformat AWS CLI configuration file"),
+    fmt: bool = typer.Option(
+        False,
+        help="Reformat AWS CLI configuration file. SSO keys in the wrong kind "
+        "of section are reported, not removed",
+    ),
+    check: bool = typer.Option(
+        False, help="Print the changes --fmt would make and exit 1 if there are any"
+    ),
+    generate: Optional[str] = typer.Option(
+        None,
+        help="Add a profile for every account and role of this SSO session",
+        metavar="SESSION",
+    ),
+    template: Optional[str] = typer.Option(
+        None,
+        help="Profile name template for --generate, default "
+        "'{account_name}-{role_name}'. Also takes {account_id}, {email} "
+        "and {session}",
+    ),
+    region: Optional[str] = typer.Option(
+        None, help="Region of generated profiles, default the session's SSO region"
+    ),
+    workers: Optional[int] = typer.Option(
+        None, help="Accounts whose roles are listed concurrently"
+    ),
+    from_json: Optional[str] = typer.Option(
+        None,
+        "--from-json",
+        help="Add or update the profiles and sessions in a JSON file, - for stdin",
+        metavar="FILE",
+    ),
+    replace: bool = typer.Option(
+        False, help="With --from-json, replace existing sections instead of merging"
+    ),
     editor: str = typer.Option("vim", help="Editor to open the config file"),
 ):
     """Manage AWS SSO and AWS CLI profiles"""
-    configurator = AWSConfigManager()
+    configurator = load_command("config").AWSConfigManager()
 
-    if sso:
+    if from_json:
+        if not configurator.apply_json(from_json, replace):
+            raise typer.Exit(1)
+    elif generate:
+        if not configurator.generate_profiles(generate, template, region, workers):
+            raise typer.Exit(1)
+    elif sso:
         configurator.configure_sso()
     elif session:
         configurator.configure_session()
-    elif fmt:
-        configurator.fmt()
-    if not any([sso, session, fmt]):
+    elif fmt or check:
+        if not configurator.fmt(check=check):
+            raise typer.Exit(1)
+    else:
         # open config witch vim by default if none provided or any other editor
         configurator.open_config_file(editor)
-    else:
-        typer.echo("Please provide a valid option")
-        typer.echo("Run 'asd config --help' for more information")
+
+
+def parse_profiles(profiles: Optional[str], all_profiles: bool) -> list[str]:
+    """Profiles named in a comma-separated --profiles value, or every profile"""
+    if all_profiles:
+        return load_command("profiles").load_profile_index().profile_names()
+    names = [name.strip() for name in str(profiles).split(",")]
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def open_consoles(
+    profiles: list[str], services: Optional[List[str]], federated: bool
+) -> None:
+    """Open one console tab per profile and service in a single batch"""
+    console = load_command("console")
+    authenticator = load_command("aws_auth").AWSAuthenticator
+    resolved: list[Optional[str]] = [None]
+    if services:
+        resolved = [
+            name
+            for name in (authenticator.get_valid_service_name(s) for s in services)
+            if name
+        ]
+        if not resolved:
+            raise typer.Exit(1)
+    urls = console.ConsoleLinks().urls(profiles, resolved, federated)
+    console.open_urls(urls)
+    if len(urls) < len(profiles) * len(resolved):
         raise typer.Exit(1)
 
 
 @app.command(name="auth")
 def authenticate(
-    profile: str = typer.Option(..., "-p", "--profile", help="AWS profile name"),
+    profile: Optional[str] = typer.Option(
+        None,
+        "-p",
+        "--profile",
+        help="AWS profile name",
+        autocompletion=complete_profile,
+    ),
+    profiles: Optional[str] = typer.Option(
+        None,
+        "--profiles",
+        help="Comma-separated profiles to authenticate in bulk",
+        autocompletion=complete_profile_list,
+    ),
+    all_profiles: bool = typer.Option(
+        False, "--all", help="Authenticate every profile in ~/.aws/config"
+    ),
+    export_to: Optional[str] = typer.Option(
+        None,
+        "--export-to",
+        help="Credentials file profile to write temporary credentials to, "
+        "default 'default'. With --profiles or --all, a template where "
+        "{profile} is each profile's name, default '{profile}'",
+    ),
+    workers: int = typer.Option(
+        8, "--workers", help="Concurrent credential fetches for bulk auth"
+    ),
     open_sso: bool = typer.Option(
         False, "--open-sso", help="Open AWS SSO user console"
     ),
     open: bool = typer.Option(False, "--open", help="Open AWS console"),
-    service: Optional[str] = typer.Argument(None, help="Service to open in console"),
+    federated: bool = typer.Option(
+        False,
+        "--federated",
+        help="Sign in to the console with the profile's role credentials",
+    ),
+    verify: bool = typer.Option(
+        False, "--verify", help="Always check the session with STS"
+    ),
+    services: Optional[List[str]] = typer.Argument(
+        None, help="Services to open in console"
+    ),
 ):
     """Authenticate with AWS SSO or open consoles"""
+    from botocore.exceptions import ProfileNotFound
+
+    if open and (profiles or all_profiles):
+        open_consoles(parse_profiles(profiles, all_profiles), services, federated)
+        return
+
+    if profiles or all_profiles:
+        bulk_auth = load_command("bulk_auth")
+        selected = parse_profiles(profiles, all_profiles)
+        target = export_to or bulk_auth.DEFAULT_TARGET
+        if len(selected) > 1 and "{profile}" not in target:
+            raise typer.BadParameter(
+                "must contain {profile} when authenticating several profiles",
+                param_hint="--export-to",
+            )
+        results = bulk_auth.authenticate_profiles(
+            selected, max_workers=workers, verify=verify, target=target
+        )
+        bulk_auth.print_results(results)
+        if not all(result.ok for result in results):
+            raise typer.Exit(1)
+        return
+
+    if profile is None:
+        typer.echo("Please provide --profile, --profiles or --all")
+        raise typer.Exit(1)
+
     try:
-        authenticator = AWSAuthenticator(profile)
+        authenticator = load_command("aws_auth").AWSAuthenticator(profile)
 
         if open_sso:
             authenticator.open_aws_sso_console()
         elif open:
-            if service:  # service name was provided
-                authenticator.open_aws_service_console(service)
+            if services:  # service names were provided
+                authenticator.open_aws_service_console(services, federated)
             else:  # no service name, just open main console
-                authenticator.open_aws_account_console()
+                authenticator.open_aws_account_console(federated)
         else:
-            authenticator.authenticate_sso()
+            authenticator.authenticate_sso(verify, export_to or "default")
 
     except ProfileNotFound as err:
         logging.error(f"Profile not found: {err}")
@@ -101,11 +277,204 @@ def authenticate(
         raise typer.Exit(1)
 
 
-@app.command(name="s3")
-def s3_operations():
-    """Perform S3 bucket operations"""
-    ui = s3stuff.S3App()
-    ui.run()
+@app.command(name="daemon")
+def credential_daemon(
+    profiles: Optional[str] = typer.Option(
+        None,
+        "--profiles",
+        help="Comma-separated profiles to keep warm",
+        autocompletion=complete_profile_list,
+    ),
+    all_profiles: bool = typer.Option(
+        False, "--all", help="Keep every profile in ~/.aws/config warm"
+    ),
+):
+    """Serve auto-refreshed credentials to credential_process over a local socket"""
+    if all_profiles:
+        selected = load_command("profiles").load_profile_index().profile_names()
+    else:
+        names = [name.strip() for name in (profiles or "").split(",")]
+        selected = [name for name in names if name]
+    daemon = load_command("daemon").CredentialDaemon(selected)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command(name="credential-process")
+def credential_process(
+    profile: str = typer.Option(
+        ...,
+        "-p",
+        "--profile",
+        help="AWS profile name",
+        autocompletion=complete_profile,
+    ),
+):
+    """Print credentials from the asd daemon in credential_process format"""
+    import json
+
+    try:
+        response = load_command("daemon").request_credentials(profile)
+    except OSError as err:
+        typer.echo(f"asd daemon is not reachable: {err}", err=True)
+        raise typer.Exit(1)
+    if "Error" in response:
+        typer.echo(response["Error"], err=True)
+        raise typer.Exit(1)
+    typer.echo(json.dumps(response))
+
+
+s3_app = typer.Typer(help="Perform S3 bucket operations")
+app.add_typer(s3_app, name="s3")
+
+
+@s3_app.callback(invoke_without_command=True)
+def s3_operations(
+    ctx: typer.Context,
+    profile: Optional[str] = typer.Option(
+        None, "-p", "--profile", help="AWS profile to use, default credentials if unset"
+    ),
+):
+    """Perform S3 bucket operations, interactively when no subcommand is given"""
+    ctx.obj = profile
+    if ctx.invoked_subcommand is None:
+        ui = load_command("s3stuff.s3stuff").S3App(profile)
+        ui.run()
+
+
+def run_s3_command(name: str, *args, **kwargs):
+    """Run a headless S3 command, exiting non-zero on AWS errors"""
+    import click
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    commands = load_command("s3stuff.commands")
+    profile = click.get_current_context().obj
+    try:
+        return getattr(commands, name)(commands.s3_client(profile), *args, **kwargs)
+    except (BotoCoreError, ClientError) as err:
+        logging.error(f"s3 {name} failed: {err}")
+        raise typer.Exit(1)
+
+
+@s3_app.command(name="ls")
+def s3_ls(
+    bucket: Optional[str] = typer.Argument(None, help="Bucket to list, or all buckets"),
+    prefix: str = typer.Option("", "--prefix", help="Only list keys under this prefix"),
+    recursive: bool = typer.Option(
+        False, "-r", "--recursive", help="List every key instead of one level"
+    ),
+    concurrency: int = typer.Option(
+        8, "--concurrency", help="Key ranges listed in parallel with --recursive"
+    ),
+):
+    """Stream buckets or objects as JSON lines"""
+    run_s3_command("ls", bucket, prefix, recursive, concurrency)
+
+
+@s3_app.command(name="du")
+def s3_du(
+    bucket: str = typer.Argument(..., help="Bucket to measure"),
+    prefix: str = typer.Option(
+        "", "--prefix", help="Only count keys under this prefix"
+    ),
+    concurrency: int = typer.Option(
+        8, "--concurrency", help="Key ranges listed in parallel"
+    ),
+):
+    """Report object counts and bytes per prefix as JSON lines"""
+    run_s3_command("du", bucket, prefix, concurrency)
+
+
+@s3_app.command(name="empty")
+def s3_empty(
+    bucket: str = typer.Argument(..., help="Bucket to empty"),
+    concurrency: int = typer.Option(
+        8, "--concurrency", help="DeleteObjects batches in flight"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Count versions without deleting anything"
+    ),
+):
+    """Delete every object version in a bucket, resuming interrupted runs"""
+    if not run_s3_command("empty", bucket, concurrency, dry_run):
+        raise typer.Exit(1)
+
+
+@s3_app.command(name="rm")
+def s3_rm(
+    buckets: list[str] = typer.Argument(..., help="Buckets to delete"),
+    concurrency: int = typer.Option(
+        8, "--concurrency", help="DeleteObjects batches in flight"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Report what would be deleted without deleting"
+    ),
+    yes: bool = typer.Option(False, "-y", "--yes", help="Do not ask for confirmation"),
+):
+    """Empty and delete buckets"""
+    if not (dry_run or yes):
+        typer.confirm(
+            f"Delete {', '.join(buckets)} and everything in them?", abort=True
+        )
+    if not run_s3_command("rm", buckets, concurrency, dry_run):
+        raise typer.Exit(1)
+
+
+@s3_app.command(name="analyze")
+def s3_analyze(
+    bucket: str = typer.Argument(..., help="Bucket to analyze"),
+    concurrency: int = typer.Option(
+        8, "--concurrency", help="Top-level prefixes listed in parallel"
+    ),
+    table: bool = typer.Option(
+        False, "--table", help="Print a table instead of JSON lines"
+    ),
+    refresh: bool = typer.Option(
+        True,
+        "--refresh/--no-refresh",
+        help="List the bucket again and count versions written since the last "
+        "analysis. This is always a full scan: S3 cannot list only the versions "
+        "changed since a given time. --no-refresh prints the stored analysis.",
+    ),
+):
+    """Report per-prefix version counts, sizes and write times of a bucket"""
+    if not run_s3_command("analyze", bucket, concurrency, table, refresh):
+        raise typer.Exit(1)
+
+
+@s3_app.command(name="inventory")
+def s3_inventory(
+    profiles: Optional[str] = typer.Option(
+        None, "--profiles", help="Comma-separated profiles whose accounts to list"
+    ),
+    all_profiles: bool = typer.Option(
+        False, "--all", help="List the accounts of every profile"
+    ),
+    concurrency: int = typer.Option(
+        16, "--concurrency", help="Accounts listed in parallel"
+    ),
+    table: bool = typer.Option(
+        False, "--table", help="Print a table at the end instead of JSON lines"
+    ),
+    output: Optional[str] = typer.Option(
+        None, "-o", "--output", help="Write the JSON lines or table to this file"
+    ),
+):
+    """List the buckets of many accounts at once, with per-account timing"""
+    if not (profiles or all_profiles):
+        typer.echo("Pass --profiles or --all")
+        raise typer.Exit(1)
+    commands = load_command("s3stuff.commands")
+    names = parse_profiles(profiles, all_profiles)
+    if output is None:
+        ok = commands.inventory(names, concurrency, table)
+    else:
+        with open(output, "w") as out:
+            ok = commands.inventory(names, concurrency, table, out)
+    if not ok:
+        raise typer.Exit(1)
 
 
 @app.command(name="services")
@@ -114,7 +483,7 @@ def list_services(
 ):
     """List AWS services. By default shows only configured services."""
     # Get our mappings
-    console_paths = AWSAuthenticator.CONSOLE_PATHS
+    console_paths = load_command("aws_auth").AWSAuthenticator.CONSOLE_PATHS
     
     print("Available AWS services:")
     print("\nConfigured Services (with console paths):")
@@ -125,12 +494,13 @@ def list_services(
             print(f"  {service} -> {path}")
     
     if all:
-        # Get list of valid services from boto3
-        valid_services = boto3.Session().get_available_services()
+        # Served from the precomputed service catalog, no botocore scan
+        catalog = load_command("catalog").load_catalog()
         print("\nAll Available Services:")
-        for service in sorted(valid_services):
+        for service in catalog.names():
             if service not in console_paths:
-                print(f"  {service} (console path not configured)")
+                path = catalog.console_path(service)
+                print(f"  {service} -> {path} ({catalog.full_name(service)})")
 
 
 @app.callback(invoke_without_command=True)
@@ -138,6 +508,17 @@ def main(
     version: bool = typer.Option(
         False, "-v", "--version", help="Show version and exit", is_eager=True
     ),
+    profile_calls: bool = typer.Option(
+        False,
+        "--profile-calls",
+        help="Print latency, retries and bytes per AWS API operation on exit",
+    ),
+    profile_calls_output: Optional[str] = typer.Option(
+        None,
+        "--profile-calls-output",
+        help="Write the call metrics to a file, JSON if it ends in .json and "
+        "OpenMetrics text otherwise",
+    ),
     ctx: typer.Context = typer.Option(None),
 ):
     """Main callback to handle logging setup"""
@@ -145,3 +526,5 @@ def main(
         typer.echo(f"aws-stuff-doer {get_version()}")
         raise typer.Exit()
     setup_logging()
+    if profile_calls or profile_calls_output:
+        setup_call_metrics(ctx, profile_calls, profile_calls_output)
@@ -0,0 +1,116 @@
+"""Fixtures for the benchmarks.
+
+Each benchmark asserts a time budget on its mean, several times what it
+takes today, so only a real regression fails the run. Finer-grained
+comparisons between runs go through pytest-benchmark itself:
+
+    pytest tests/benchmarks --benchmark-autosave
+    pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, List, Set, Tuple
+
+import pytest
+
+from aws_stuff_doer.cmd import profiles
+
+PROFILE_COUNTS = [10, 1000, 10000]
+
+
+@pytest.fixture
+def budget(benchmark):
+    """Assert the benchmark's mean time stayed within a budget in seconds"""
+
+    def check(seconds: float) -> None:
+        if benchmark.disabled:
+            return
+        mean = benchmark.stats.stats.mean
+        assert mean <= seconds, f"mean {mean:.4f}s is over the {seconds}s budget"
+
+    return check
+
+
+@pytest.fixture(params=PROFILE_COUNTS, ids=lambda n: f"{n}-profiles")
+def profile_count(request, aws_config):
+    """Parametrizes a benchmark over synthetic configs of each size"""
+    aws_config(request.param)
+    return request.param
+
+
+@pytest.fixture
+def forget_profile_index():
+    """Callable dropping the in-process and on-disk profile index caches"""
+
+    def forget() -> None:
+        profiles._cache.clear()
+        for cache_file in profiles.cache_dir().glob("profiles-*.json"):
+            cache_file.unlink()
+
+    return forget
+
+
+class FakeVersionedS3:
+    """In-memory stand-in for the two S3 calls a bucket teardown makes.
+
+    moto copies every version of a bucket on each ListObjectVersions page,
+    which makes a 1e5-version bucket take minutes to list. This keeps the
+    versions sorted by (key, version id) and pages through them with bisect.
+    """
+
+    def __init__(self, bucket_name: str, versions: int, keys: int = 1000):
+        self.bucket_name = bucket_name
+        self._versions: List[Tuple[str, str]] = sorted(
+            (f"key-{i % keys:05d}", f"v{i:08d}") for i in range(versions)
+        )
+        self._deleted: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {"ListObjectVersions": 0, "DeleteObjects": 0}
+
+    def __len__(self) -> int:
+        return len(self._versions) - len(self._deleted)
+
+    def list_object_versions(
+        self,
+        Bucket: str,
+        MaxKeys: int = 1000,
+        KeyMarker: str = "",
+        VersionIdMarker: str = "\uffff",
+    ) -> Dict[str, Any]:
+        page: List[Tuple[str, str]] = []
+        with self._lock:
+            self.calls["ListObjectVersions"] += 1
+            position = bisect.bisect_right(self._versions, (KeyMarker, VersionIdMarker))
+            if not KeyMarker:
+                position = 0
+            while position < len(self._versions) and len(page) < MaxKeys:
+                version = self._versions[position]
+                if version not in self._deleted:
+                    page.append(version)
+                position += 1
+            truncated = any(
+                version not in self._deleted for version in self._versions[position:]
+            )
+        response: Dict[str, Any] = {
+            "Versions": [{"Key": key, "VersionId": version} for key, version in page],
+            "IsTruncated": truncated,
+        }
+        if truncated:
+            response["NextKeyMarker"], response["NextVersionIdMarker"] = page[-1]
+        return response
+
+    def delete_objects(self, Bucket: str, Delete: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.calls["DeleteObjects"] += 1
+            self._deleted.update((o["Key"], o["VersionId"]) for o in Delete["Objects"])
+            if len(self._deleted) * 2 > len(self._versions):
+                self._versions = [v for v in self._versions if v not in self._deleted]
+                self._deleted.clear()
+        return {}
+
+
+@pytest.fixture
+def versioned_s3():
+    """Factory for a FakeVersionedS3 holding a number of versions"""
+    return FakeVersionedS3
@@ -0,0 +1,28 @@
+import time
+
+from aws_stuff_doer.cmd.s3stuff import listing, operations
+
+# Numbered keys under a handful of prefixes, as in our log buckets.
+KEYS = [f"logs/{day:02d}/{i:06d}.gz" for day in range(1, 5) for i in range(25_000)]
+# Round trip of one ListObjectsV2 page; real S3 pages take longer still.
+LATENCY = 0.03
+WORKERS = 16
+
+
+def list_sequentially(client) -> int:
+    return sum(1 for _ in operations.iter_objects(client, "bucket"))
+
+
+def list_sharded(client) -> int:
+    entries = listing.iter_objects_parallel(client, "bucket", max_workers=WORKERS)
+    return sum(1 for _ in entries)
+
+
+def test_sharded_listing_speedup(benchmark, budget, listing_s3):
+    client = listing_s3(KEYS, LATENCY)
+    started = time.perf_counter()
+    assert list_sequentially(client) == len(KEYS)
+    sequential = time.perf_counter() - started
+
+    assert benchmark.pedantic(list_sharded, args=(client,), rounds=3) == len(KEYS)
+    budget(sequential / 2)
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from aws_stuff_doer.cmd.aws_auth import AWSAuthenticator
+from aws_stuff_doer.cmd.config import AWSConfigManager
+
+ROOT = Path(__file__).parents[2]
+
+
+def run_cli(*args: str) -> None:
+    subprocess.run(
+        [sys.executable, "-c", "from aws_stuff_doer.main import app; app()", *args],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+
+
+def test_cold_start_help(benchmark, budget):
+    benchmark.pedantic(run_cli, args=("--help",), rounds=5, warmup_rounds=1)
+    budget(1.5)
+
+
+def test_cold_start_list(benchmark, budget, profile_count):
+    # The warmup round writes the on-disk profile index later runs reuse.
+    benchmark.pedantic(run_cli, args=("list",), rounds=5, warmup_rounds=1)
+    budget(2.0)
+
+
+def test_list_profiles_first_parse(
+    benchmark, budget, profile_count, forget_profile_index
+):
+    names = benchmark.pedantic(
+        AWSAuthenticator.list_profiles, setup=forget_profile_index, rounds=5
+    )
+    assert len(names) == profile_count
+    budget(0.0005 * profile_count + 0.05)
+
+
+def test_list_profiles_from_disk_cache(benchmark, budget, profile_count):
+    from aws_stuff_doer.cmd import profiles
+
+    AWSAuthenticator.list_profiles()
+    names = benchmark(
+        lambda: profiles._cache.clear() or AWSAuthenticator.list_profiles()
+    )
+    assert len(names) == profile_count
+    budget(0.00002 * profile_count + 0.01)
+
+
+def test_list_profiles_warm(benchmark, budget, profile_count):
+    AWSAuthenticator.list_profiles()
+    names = benchmark(AWSAuthenticator.list_profiles)
+    assert len(names) == profile_count
+    budget(0.002)
+
+
+def test_get_account_url_from_profile(benchmark, budget, profile_count):
+    authenticator = AWSAuthenticator(f"p{profile_count - 1}")
+    url = benchmark(authenticator.get_account_url_from_profile)
+    assert url is not None
+    budget(0.001)
+
+
+def test_fmt_check(benchmark, budget, profile_count, isolated_home, capsys):
+    config = isolated_home / ".aws" / "config"
+    # Double spaces around "=" give the formatter a change on every line.
+    config.write_text(config.read_text().replace(" = ", "  =  "))
+    manager = AWSConfigManager()
+    assert benchmark.pedantic(manager.fmt, kwargs={"check": True}, rounds=3) is False
+    capsys.readouterr()
+    budget(0.0002 * profile_count + 0.1)
+
+
+def test_export_temporary_aws_credentials(benchmark, budget, fake_sso, aws_config):
+    aws_config(10000)
+    authenticator = AWSAuthenticator("p9999")
+    assert benchmark.pedantic(authenticator.export_temporary_aws_credentials, rounds=5)
+    # Role credentials are fetched once and reused until they near expiry.
+    assert fake_sso.calls["GetRoleCredentials"] == 1
+    budget(0.1)
@@ -0,0 +1,19 @@
+from aws_stuff_doer.cmd.s3stuff import operations
+
+VERSIONS = 100_000
+
+
+def test_empty_bucket_1e5_versions(benchmark, budget, versioned_s3):
+    def setup():
+        return (versioned_s3("teardown-bench", VERSIONS),), {}
+
+    def empty(client):
+        result = operations.empty_bucket(client, client.bucket_name)
+        assert result.empty and result.deleted == VERSIONS
+        assert len(client) == 0
+        return client
+
+    client = benchmark.pedantic(empty, setup=setup, rounds=3)
+    # One pass deletes everything, the second listing confirms it.
+    assert client.calls["DeleteObjects"] == VERSIONS // operations.MAX_DELETE_BATCH
+    budget(3.0)
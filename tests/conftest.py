@@ -0,0 +1,297 @@
+import bisect
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from moto import mock_aws
+from moto.core import DEFAULT_ACCOUNT_ID
+from moto.s3.models import s3_backends
+
+from aws_stuff_doer.cmd import clients, profiles
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    """Keep every test away from the real ~/.aws and ~/.cache"""
+    home = tmp_path / "home"
+    (home / ".aws").mkdir(parents=True)
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(home / ".cache"))
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(home / ".aws" / "config"))
+    monkeypatch.setenv(
+        "AWS_SHARED_CREDENTIALS_FILE", str(home / ".aws" / "credentials")
+    )
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    monkeypatch.setattr(clients, "_pool", None)
+    profiles._cache.clear()
+    yield home
+    profiles._cache.clear()
+
+
+class SerializedClient:
+    """Runs one call at a time, since moto's backends are not thread-safe"""
+
+    def __init__(self, client) -> None:
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+
+        return call
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        yield SerializedClient(clients.get_client("s3", region="us-east-1"))
+
+
+@pytest.fixture
+def versioned_bucket(s3_client):
+    """Factory creating a versioned bucket with count versions over keys"""
+
+    def create(bucket_name: str, count: int, keys: int = 10) -> str:
+        put_versions(s3_client, bucket_name, count, keys)
+        return bucket_name
+
+    return create
+
+
+def put_versions(client, bucket_name: str, count: int, keys: int = 10) -> None:
+    client.create_bucket(Bucket=bucket_name)
+    client.put_bucket_versioning(
+        Bucket=bucket_name, VersioningConfiguration={"Status": "Enabled"}
+    )
+    # Straight into moto's backend; a PutObject round trip per version is
+    # most of the runtime otherwise.
+    backend = s3_backends[DEFAULT_ACCOUNT_ID]["aws"]
+    for i in range(count):
+        backend.put_object(bucket_name, f"key-{i % keys}", b"x")
+
+
+class FakeSSO:
+    """Local stand-in for the SSO portal API (role credentials and listings)"""
+
+    def __init__(self, accounts: Dict[str, List[str]], page_size: int = 2):
+        self.accounts = accounts
+        self.page_size = page_size
+        self.credential_lifetime = 3600.0
+        self.failing = False
+        self.calls: Counter = Counter()
+        self.issued = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeSSO":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _page(self, items: list, query: Dict[str, List[str]], key: str) -> dict:
+        start = int(query.get("next_token", ["0"])[0])
+        end = start + self.page_size
+        body = {key: items[start:end]}
+        if end < len(items):
+            body["nextToken"] = str(end)
+        return body
+
+    def respond(self, path: str, query: Dict[str, List[str]]) -> tuple:
+        if self.failing:
+            return 401, {"message": "Session token not found or invalid"}
+        if path == "/federation/credentials":
+            self.calls["GetRoleCredentials"] += 1
+            self.issued += 1
+            expiration = int((time.time() + self.credential_lifetime) * 1000)
+            return 200, {
+                "roleCredentials": {
+                    "accessKeyId": f"ASIA{self.issued:016d}",
+                    "secretAccessKey": "secret",
+                    "sessionToken": f"token-{self.issued}",
+                    "expiration": expiration,
+                }
+            }
+        if path == "/assignment/accounts":
+            self.calls["ListAccounts"] += 1
+            accounts = [
+                {
+                    "accountId": account_id,
+                    "accountName": f"account-{account_id}",
+                    "emailAddress": f"{account_id}@example.com",
+                }
+                for account_id in self.accounts
+            ]
+            return 200, self._page(accounts, query, "accountList")
+        if path == "/assignment/roles":
+            self.calls["ListAccountRoles"] += 1
+            account_id = query["account_id"][0]
+            roles = [
+                {"roleName": role, "accountId": account_id}
+                for role in self.accounts[account_id]
+            ]
+            return 200, self._page(roles, query, "roleList")
+        return 404, {"message": f"unknown path {path}"}
+
+    def _handler(self) -> type:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                status, body = fake.respond(url.path, parse_qs(url.query))
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if status == 401:
+                    self.send_header("x-amzn-ErrorType", "UnauthorizedException")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+
+def _write_config(home, profiles: int, session: str = "corp") -> None:
+    """An ~/.aws/config with one sso-session and that many profiles using it"""
+    lines = [
+        f"[sso-session {session}]",
+        "sso_start_url = https://corp.awsapps.com/start",
+        "sso_region = us-east-1",
+        "sso_registration_scopes = sso:account:access",
+        "",
+    ]
+    for i in range(profiles):
+        lines += [
+            f"[profile p{i}]",
+            f"sso_session = {session}",
+            f"sso_account_id = {100000000000 + i}",
+            "sso_role_name = Admin",
+            "region = us-east-1",
+            "",
+        ]
+    (home / ".aws" / "config").write_text("\n".join(lines))
+
+
+def _write_sso_token(home, session: str = "corp", lifetime: float = 8 * 3600) -> None:
+    """Cache an SSO access token for the session where botocore looks for it"""
+    from aws_stuff_doer.cmd.sso_cache import token_cache_key
+
+    expires = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + lifetime))
+    cache = home / ".aws" / "sso" / "cache"
+    cache.mkdir(parents=True, exist_ok=True)
+    token = {
+        "startUrl": "https://corp.awsapps.com/start",
+        "region": "us-east-1",
+        "accessToken": "access-token",
+        "expiresAt": expires,
+    }
+    key = token_cache_key(token["startUrl"], session)
+    (cache / f"{key}.json").write_text(json.dumps(token))
+
+
+@pytest.fixture
+def aws_config(isolated_home):
+    """Factory writing an ~/.aws/config with that many SSO profiles"""
+
+    def write(profiles: int) -> None:
+        _write_config(isolated_home, profiles)
+
+    return write
+
+
+@pytest.fixture
+def fake_sso(isolated_home, monkeypatch):
+    """A running FakeSSO that every SSO client in the test talks to"""
+    accounts = {f"{100000000000 + i}": ["Admin", "ReadOnly"] for i in range(3)}
+    from botocore.credentials import SSOProvider
+    from botocore.tokens import SSOTokenProvider
+
+    # botocore resolves its token cache directory from HOME at import time.
+    token_cache = str(isolated_home / ".aws" / "sso" / "cache")
+    monkeypatch.setattr(SSOProvider, "_SSO_TOKEN_CACHE_DIR", token_cache)
+    monkeypatch.setattr(SSOTokenProvider, "_SSO_TOKEN_CACHE_DIR", token_cache)
+    with FakeSSO(accounts) as fake:
+        monkeypatch.setenv("AWS_ENDPOINT_URL_SSO", fake.url)
+        monkeypatch.delenv("AWS_ACCESS_KEY_ID")
+        monkeypatch.delenv("AWS_SECRET_ACCESS_KEY")
+        _write_config(isolated_home, 3)
+        _write_sso_token(isolated_home)
+        yield fake
+
+
+class FakeListingS3:
+    """In-memory list_objects_v2 with a fixed round-trip latency per call"""
+
+    def __init__(self, keys: List[str], latency: float = 0.01):
+        self.keys = sorted(keys)
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def list_objects_v2(
+        self,
+        Bucket: str,
+        Prefix: str = "",
+        Delimiter: str = "",
+        MaxKeys: int = 1000,
+        ContinuationToken: str = "",
+        StartAfter: str = "",
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        after = ContinuationToken or StartAfter
+        position = bisect.bisect_right(self.keys, after) if after else 0
+        position = max(position, bisect.bisect_left(self.keys, Prefix))
+        contents: List[Dict[str, Any]] = []
+        prefixes: List[Dict[str, str]] = []
+        last = ""
+        while position < len(self.keys) and len(contents) + len(prefixes) < MaxKeys:
+            key = self.keys[position]
+            if not key.startswith(Prefix):
+                break
+            cut = key.find(Delimiter, len(Prefix)) if Delimiter else -1
+            if cut >= 0:
+                last = key[: cut + 1]
+                prefixes.append({"Prefix": last})
+                position = bisect.bisect_left(self.keys, last + "\uffff")
+            else:
+                last = key
+                contents.append({"Key": key, "Size": 1})
+                position += 1
+        truncated = position < len(self.keys) and self.keys[position].startswith(Prefix)
+        response: Dict[str, Any] = {
+            "Contents": contents,
+            "CommonPrefixes": prefixes,
+            "IsTruncated": truncated,
+        }
+        if truncated:
+            response["NextContinuationToken"] = last
+        return response
+
+
+@pytest.fixture
+def listing_s3():
+    """Factory for a FakeListingS3 over a list of keys"""
+    return FakeListingS3
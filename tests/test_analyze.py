@@ -0,0 +1,60 @@
+import json
+from datetime import timedelta
+
+from moto.core import DEFAULT_ACCOUNT_ID
+from moto.s3.models import s3_backends
+
+from aws_stuff_doer.cmd.s3stuff import commands
+
+
+def records(capsys) -> list:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def put(client, bucket_name: str, keys: list) -> None:
+    for key in keys:
+        client.put_object(Bucket=bucket_name, Key=key, Body=b"x")
+
+
+def age(bucket_name: str, by: timedelta) -> None:
+    """Move every stored version back in time; S3 dates are to the second"""
+    bucket = s3_backends[DEFAULT_ACCOUNT_ID]["aws"].get_bucket(bucket_name)
+    for _, versions in bucket.keys.lists():
+        for version in versions:
+            version.last_modified -= by
+
+
+def test_refresh_counts_versions_written_since_the_last_analysis(s3_client, capsys):
+    s3_client.create_bucket(Bucket="analyzed")
+    s3_client.put_bucket_versioning(
+        Bucket="analyzed", VersioningConfiguration={"Status": "Enabled"}
+    )
+    put(s3_client, "analyzed", ["root", "logs/a", "logs/b", "data/c"])
+    age("analyzed", timedelta(hours=1))
+    assert commands.analyze(s3_client, "analyzed")
+    first = records(capsys)
+    assert first[-1]["objects"] == 4
+    assert first[-1]["previous_analysis"] is None
+
+    put(s3_client, "analyzed", ["logs/a", "data/d"])
+    assert commands.analyze(s3_client, "analyzed")
+    second = records(capsys)
+    by_prefix = {record["prefix"]: record for record in second[:-1]}
+    assert by_prefix["logs/"]["new_versions"] == 1
+    assert by_prefix["data/"]["new_versions"] == 1
+    assert by_prefix[""]["new_versions"] == 0
+    assert second[-1]["objects"] == 5
+    assert second[-1]["previous_analysis"] is not None
+
+
+def test_no_refresh_prints_the_stored_analysis_without_listing(s3_client, capsys):
+    s3_client.create_bucket(Bucket="stored")
+    put(s3_client, "stored", ["logs/a"])
+    assert commands.analyze(s3_client, "stored")
+    refreshed = records(capsys)
+
+    # No client: nothing may be listed.
+    assert commands.analyze(None, "stored", refresh=False)
+    assert records(capsys) == refreshed
+
+    assert not commands.analyze(None, "never-analyzed", refresh=False)
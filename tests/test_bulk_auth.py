@@ -0,0 +1,65 @@
+import configparser
+
+from typer.testing import CliRunner
+
+from aws_stuff_doer.cmd import bulk_auth
+from aws_stuff_doer.main import app
+
+
+def auth(*options: str):
+    return CliRunner().invoke(app, ["auth", *options])
+
+
+def read_credentials(home) -> configparser.ConfigParser:
+    credentials = configparser.ConfigParser(interpolation=None)
+    credentials.read(home / ".aws" / "credentials")
+    return credentials
+
+
+def test_each_profile_is_exported_to_its_own_section(fake_sso, isolated_home):
+    result = auth("--profiles", "p0,p1,p2")
+    assert result.exit_code == 0, result.output
+
+    credentials = read_credentials(isolated_home)
+    assert credentials.sections() == ["p0", "p1", "p2"]
+    assert fake_sso.calls["GetRoleCredentials"] == 3
+
+
+def test_export_to_template_names_the_sections(fake_sso, isolated_home):
+    result = auth("--all", "--export-to", "{profile}-static")
+    assert result.exit_code == 0, result.output
+
+    credentials = read_credentials(isolated_home)
+    assert credentials.sections() == ["p0-static", "p1-static", "p2-static"]
+    assert credentials["p1-static"]["aws_access_key_id"].startswith("ASIA")
+
+
+def test_export_to_a_single_section_is_rejected_for_several_profiles(fake_sso):
+    result = auth("--profiles", "p0,p1", "--export-to", "default")
+    assert result.exit_code == 2
+    assert "{profile}" in result.output
+    assert fake_sso.calls["GetRoleCredentials"] == 0
+
+
+def test_export_to_a_single_section_for_one_profile(fake_sso, isolated_home):
+    result = auth("--profiles", "p2", "--export-to", "default")
+    assert result.exit_code == 0, result.output
+    assert read_credentials(isolated_home).sections() == ["default"]
+
+
+def test_verify_checks_each_session_with_sts(fake_sso, monkeypatch):
+    checked = []
+
+    def sso_credentials_exist(self, verify=False):
+        checked.append((self.profile, verify))
+        return True
+
+    monkeypatch.setattr(
+        bulk_auth.AWSAuthenticator, "sso_credentials_exist", sso_credentials_exist
+    )
+    assert auth("--all").exit_code == 0
+    assert checked == []
+
+    assert auth("--all", "--verify").exit_code == 0
+    # One check for the whole corp session, not one per profile.
+    assert checked == [("p0", True)]
@@ -0,0 +1,79 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+
+from aws_stuff_doer.cmd import clients
+from aws_stuff_doer.cmd.aws_auth import AWSAuthenticator
+
+
+@pytest.fixture
+def constructions(monkeypatch, aws_config):
+    """Counts real boto3 session and client constructions"""
+    aws_config(3)
+    counts: Counter = Counter()
+    session_init = boto3.Session.__init__
+    session_client = boto3.Session.client
+
+    def init(self, *args, **kwargs):
+        counts["sessions"] += 1
+        session_init(self, *args, **kwargs)
+
+    def client(self, *args, **kwargs):
+        counts["clients"] += 1
+        return session_client(self, *args, **kwargs)
+
+    monkeypatch.setattr(boto3.Session, "__init__", init)
+    monkeypatch.setattr(boto3.Session, "client", client)
+    return counts
+
+
+def test_concurrent_lookups_construct_one_client(constructions):
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        found = list(pool.map(lambda _: clients.get_client("s3", "p0"), range(200)))
+
+    assert len({id(client) for client in found}) == 1
+    assert constructions == {"sessions": 1, "clients": 1}
+    stats = clients.get_pool().stats
+    assert stats["clients_created"] == 1 and stats["clients_reused"] == 199
+
+
+def test_clients_are_keyed_by_profile_region_and_service(constructions):
+    for _ in range(10):
+        for profile in ("p0", "p1"):
+            clients.get_client("s3", profile)
+            clients.get_client("s3", profile, "eu-west-1")
+            clients.get_client("sts", profile)
+
+    assert constructions == {"sessions": 2, "clients": 6}
+    assert clients.get_pool().stats["clients_reused"] == 54
+
+
+def test_authenticator_shares_the_pool(constructions):
+    for _ in range(5):
+        authenticator = AWSAuthenticator("p2")
+        authenticator.client
+        authenticator.session
+
+    assert constructions == {"sessions": 1, "clients": 1}
+
+
+def test_discard_rebuilds_a_profile(constructions):
+    clients.get_client("s3", "p0")
+    clients.get_pool().discard("p0")
+    clients.get_client("s3", "p0")
+    assert constructions == {"sessions": 2, "clients": 2}
+
+
+def test_sessions_share_one_data_loader(constructions):
+    loaders = {
+        id(clients.get_session(profile)._session.get_component("data_loader"))
+        for profile in ("p0", "p1", "p2")
+    }
+    assert len(loaders) == 1
+
+
+def test_clients_use_the_pool_connection_limit(constructions):
+    client = clients.get_client("s3", "p0")
+    assert client.meta.config.max_pool_connections == clients.MAX_POOL_CONNECTIONS
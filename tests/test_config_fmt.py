@@ -0,0 +1,153 @@
+import logging
+
+import pytest
+from typer.testing import CliRunner
+
+from aws_stuff_doer.cmd.config import AWSConfigManager
+from aws_stuff_doer.cmd.config_file import format_config
+from aws_stuff_doer.main import app
+
+CONFIG = """\
+[sso-session corp]
+sso_start_url = https://corp.awsapps.com/start
+sso_region = us-east-1
+region = eu-west-1
+
+[profile dev]
+sso_session = corp
+sso_account_id = 100000000000
+sso_role_name   =   Admin
+sso_start_url = https://old.awsapps.com/start
+"""
+
+MESSY = """\
+# Managed by hand
+[plugins]
+cli_legacy_plugin_path = /opt/plugins
+
+[profile zeta]
+; zeta is the staging account
+region = eu-west-1
+output=json
+
+[sso-session corp]
+sso_region = us-east-1
+
+[default]
+region = us-east-1
+
+[profile  alpha ]
+# overrides for alpha
+region = us-west-2
+s3 =
+  max_concurrent_requests = 20
+
+[profile zeta]
+region = eu-central-1
+"""
+
+FORMATTED = """\
+[default]
+region = us-east-1
+
+[profile alpha]
+# overrides for alpha
+region = us-west-2
+s3 =
+  max_concurrent_requests = 20
+
+[profile zeta]
+; zeta is the staging account
+region = eu-central-1
+output = json
+
+[sso-session corp]
+sso_region = us-east-1
+
+# Managed by hand
+[plugins]
+cli_legacy_plugin_path = /opt/plugins
+"""
+
+MISPLACED_WARNINGS = [
+    "[sso-session corp] sets region, misplaced in this section; "
+    "remove it by hand if it is stale",
+    "[profile dev] sets sso_start_url, misplaced in this section; "
+    "remove it by hand if it is stale",
+]
+
+
+def write_config(home, text: str = CONFIG) -> None:
+    (home / ".aws" / "config").write_text(text)
+
+
+def read_config(home) -> str:
+    return (home / ".aws" / "config").read_text()
+
+
+def warnings(caplog) -> list:
+    return [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+
+
+def test_format_merges_sorts_and_keeps_comments():
+    assert format_config(MESSY) == FORMATTED
+
+
+@pytest.mark.parametrize("text", [MESSY, CONFIG, FORMATTED])
+def test_format_is_idempotent(text):
+    once = format_config(text)
+    assert format_config(once) == once
+
+
+def test_later_duplicate_keys_win_within_a_section():
+    text = "[profile a]\nregion = us-east-1\nregion = eu-west-1\n"
+    assert format_config(text) == "[profile a]\nregion = eu-west-1\n"
+
+
+def test_section_order_does_not_depend_on_input_order():
+    sections = FORMATTED.split("\n\n")
+    assert format_config("\n\n".join(reversed(sections))) == FORMATTED
+
+
+def test_fmt_twice_changes_nothing_the_second_time(isolated_home):
+    write_config(isolated_home, MESSY)
+    assert AWSConfigManager().fmt()
+    assert read_config(isolated_home) == FORMATTED
+
+    assert AWSConfigManager().fmt()
+    assert read_config(isolated_home) == FORMATTED
+
+
+def test_check_exit_status(isolated_home):
+    write_config(isolated_home, MESSY)
+    result = CliRunner().invoke(app, ["config", "--check"])
+    assert result.exit_code == 1
+    assert "+output = json" in result.output
+    assert read_config(isolated_home) == MESSY
+
+    assert CliRunner().invoke(app, ["config", "--fmt"]).exit_code == 0
+    assert CliRunner().invoke(app, ["config", "--check"]).exit_code == 0
+
+
+def test_fmt_keeps_and_reports_misplaced_keys(isolated_home, caplog):
+    write_config(isolated_home)
+
+    with caplog.at_level(logging.WARNING):
+        assert AWSConfigManager().fmt()
+
+    assert warnings(caplog) == MISPLACED_WARNINGS
+    text = read_config(isolated_home)
+    assert "sso_role_name = Admin" in text
+    assert "sso_start_url = https://old.awsapps.com/start" in text
+    assert "region = eu-west-1" in text
+
+
+def test_fmt_check_reports_misplaced_keys(isolated_home, caplog, capsys):
+    write_config(isolated_home)
+
+    with caplog.at_level(logging.WARNING):
+        assert not AWSConfigManager().fmt(check=True)
+
+    assert warnings(caplog) == MISPLACED_WARNINGS
+    assert "+sso_role_name = Admin" in capsys.readouterr().out
+    assert read_config(isolated_home) == CONFIG
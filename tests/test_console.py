@@ -0,0 +1,35 @@
+import platform
+import subprocess
+import webbrowser
+
+import pytest
+
+from aws_stuff_doer.cmd.aws_auth import AWSAuthenticator
+
+START_URL = "https://corp.awsapps.com/start"
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """URLs opened in the browser, with the platform pinned to Linux"""
+    urls = []
+    monkeypatch.setattr(platform, "system", lambda: "Linux")
+    monkeypatch.setattr(webbrowser, "open_new_tab", urls.append)
+
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError(f"ran {args}")
+
+    monkeypatch.setattr(subprocess, "run", no_subprocess)
+    return urls
+
+
+def test_account_console_opens_in_the_browser(aws_config, opened):
+    aws_config(3)
+    AWSAuthenticator("p1").open_aws_account_console()
+    assert opened == [f"{START_URL}/#/console?account_id=100000000001&role_name=Admin"]
+
+
+def test_sso_console_opens_in_the_browser(aws_config, opened):
+    aws_config(3)
+    AWSAuthenticator("p0").open_aws_sso_console()
+    assert opened == [START_URL]
@@ -0,0 +1,99 @@
+import configparser
+import multiprocessing
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.credentials import ReadOnlyCredentials
+
+from aws_stuff_doer.cmd.credentials import CredentialsStore
+
+WRITERS = 8
+ROUNDS = 25
+
+
+def credentials(writer: int, round: int) -> ReadOnlyCredentials:
+    return ReadOnlyCredentials(f"AKIA{writer}-{round}", f"secret-{writer}", "token")
+
+
+def write_rounds(path, writer: int) -> None:
+    store = CredentialsStore(path)
+    for round in range(ROUNDS):
+        store.update(
+            {
+                f"writer-{writer}": credentials(writer, round),
+                "shared": credentials(writer, round),
+            }
+        )
+
+
+def read(path) -> configparser.ConfigParser:
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_string(path.read_text())
+    return config
+
+
+def assert_final_state(path) -> None:
+    config = read(path)
+    for writer in range(WRITERS):
+        section = config[f"writer-{writer}"]
+        assert section["aws_access_key_id"] == f"AKIA{writer}-{ROUNDS - 1}"
+    assert config["shared"]["aws_access_key_id"].endswith(f"-{ROUNDS - 1}")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def test_concurrent_threads_keep_every_profile(tmp_path):
+    path = tmp_path / "credentials"
+    stop = threading.Event()
+    torn_reads = []
+
+    def reader() -> None:
+        # Writes are renamed into place, so a reader only ever sees whole files.
+        while not stop.is_set():
+            if path.exists():
+                try:
+                    read(path)
+                except configparser.Error as err:
+                    torn_reads.append(err)
+
+    watcher = threading.Thread(target=reader)
+    watcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+            list(pool.map(lambda writer: write_rounds(path, writer), range(WRITERS)))
+    finally:
+        stop.set()
+        watcher.join()
+
+    assert torn_reads == []
+    assert_final_state(path)
+
+
+def test_concurrent_processes_keep_every_profile(tmp_path):
+    path = tmp_path / "credentials"
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=write_rounds, args=(path, writer))
+        for writer in range(WRITERS)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    assert_final_state(path)
+    assert not list(tmp_path.glob(".credentials.*"))
+
+
+def test_update_keeps_other_sections_and_drops_stale_tokens(tmp_path):
+    path = tmp_path / "credentials"
+    path.write_text("[static]\naws_access_key_id = AKIASTATIC\n")
+    store = CredentialsStore(path)
+    store.update({"default": credentials(0, 0)})
+    store.update({"default": ReadOnlyCredentials("AKIANEW", "secret", None)})
+
+    config = read(path)
+    assert config["static"]["aws_access_key_id"] == "AKIASTATIC"
+    assert config["default"]["aws_access_key_id"] == "AKIANEW"
+    assert "aws_session_token" not in config["default"]
@@ -0,0 +1,96 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from aws_stuff_doer.cmd import daemon
+from aws_stuff_doer.cmd.daemon import CredentialDaemon, request_credentials
+
+
+def response(credential_daemon: CredentialDaemon, profile: str) -> dict:
+    return json.loads(credential_daemon.handle_request(profile))
+
+
+def test_serves_sso_credentials_with_their_expiration(fake_sso):
+    started = datetime.now(timezone.utc)
+    credential_daemon = CredentialDaemon(["p1"])
+
+    first = response(credential_daemon, "p1")
+    assert first["AccessKeyId"] == "ASIA0000000000000001"
+    assert first["SessionToken"] == "token-1"
+    expiration = datetime.fromisoformat(first["Expiration"])
+    assert started + timedelta(minutes=59) < expiration
+    assert expiration < started + timedelta(minutes=61)
+
+    assert response(credential_daemon, "p1") == first
+    assert fake_sso.calls["GetRoleCredentials"] == 1
+
+
+def test_loads_profiles_on_first_request(fake_sso):
+    credential_daemon = CredentialDaemon()
+    assert response(credential_daemon, "p2")["AccessKeyId"].startswith("ASIA")
+    assert "Error" in response(credential_daemon, "missing")
+
+
+def test_refreshes_credentials_inside_the_window(fake_sso):
+    fake_sso.credential_lifetime = 5 * 60
+    credential_daemon = CredentialDaemon(["p1"])
+    assert response(credential_daemon, "p1")["AccessKeyId"].endswith("1")
+
+    fake_sso.credential_lifetime = 3600
+    credential_daemon.refresh_due()
+    refreshed = response(credential_daemon, "p1")
+    assert refreshed["AccessKeyId"] == "ASIA0000000000000002"
+    assert fake_sso.calls["GetRoleCredentials"] == 2
+
+
+def test_errors_once_credentials_expire_after_failed_refreshes(fake_sso, monkeypatch):
+    fake_sso.credential_lifetime = 5 * 60
+    credential_daemon = CredentialDaemon(["p1"])
+    served = response(credential_daemon, "p1")
+
+    fake_sso.failing = True
+    credential_daemon.refresh_due()
+    # Still valid, so the last good response keeps being served.
+    assert response(credential_daemon, "p1") == served
+
+    with monkeypatch.context() as later:
+        later.setattr(daemon, "is_expired", lambda expiry: True)
+        assert "Error" in response(credential_daemon, "p1")
+
+    fake_sso.failing = False
+    fake_sso.credential_lifetime = 3600
+    credential_daemon.refresh_due()
+    assert response(credential_daemon, "p1")["AccessKeyId"].endswith("2")
+
+
+def test_static_credentials_are_served_without_expiration(isolated_home):
+    (isolated_home / ".aws" / "credentials").write_text(
+        "[static]\naws_access_key_id = AKIASTATIC\naws_secret_access_key = secret\n"
+    )
+    (isolated_home / ".aws" / "config").write_text(
+        "[profile static]\nregion = us-east-1\n"
+    )
+    served = response(CredentialDaemon(["static"]), "static")
+    assert served["AccessKeyId"] == "AKIASTATIC"
+    assert "Expiration" not in served
+
+
+def test_socket_round_trip(fake_sso, tmp_path):
+    socket_path = tmp_path / "daemon.sock"
+    credential_daemon = CredentialDaemon(["p1"], socket_path=socket_path)
+    server = threading.Thread(target=credential_daemon.serve_forever, daemon=True)
+    server.start()
+    try:
+        for _ in range(100):
+            if socket_path.exists():
+                break
+            threading.Event().wait(0.05)
+        served = request_credentials("p1", socket_path)
+        assert served["AccessKeyId"] == "ASIA0000000000000001"
+        assert served["Version"] == 1
+    finally:
+        credential_daemon.shutdown()
+        server.join(timeout=5)
+    assert not socket_path.exists()
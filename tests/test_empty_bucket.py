@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError
+
+from aws_stuff_doer.cmd.s3stuff import operations
+from aws_stuff_doer.cmd.s3stuff.threaded import ThreadedS3
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(operations, "_backoff", lambda attempt: None)
+
+
+def remaining(client, bucket_name):
+    page = client.list_object_versions(Bucket=bucket_name)
+    return page.get("Versions", []) + page.get("DeleteMarkers", [])
+
+
+def test_deletes_versions_and_delete_markers(s3_client, versioned_bucket):
+    bucket = versioned_bucket("app-logs", 2300, keys=50)
+    for i in range(20):
+        s3_client.delete_object(Bucket=bucket, Key=f"key-{i}")
+    progress = []
+
+    result = operations.empty_bucket(
+        s3_client,
+        bucket,
+        max_workers=4,
+        on_progress=lambda deleted, listed, elapsed: progress.append(deleted),
+    )
+
+    assert result.empty and not result.cancelled
+    assert result.deleted == 2320 and result.failed == 0
+    assert remaining(s3_client, bucket) == []
+    assert progress == sorted(progress) and progress[-1] == 2320
+    s3_client.delete_bucket(Bucket=bucket)
+
+
+def test_empty_bucket_is_a_no_op(s3_client):
+    s3_client.create_bucket(Bucket="already-empty")
+    result = operations.empty_bucket(s3_client, "already-empty")
+    assert result.empty and result.deleted == 0
+
+
+def test_threaded_s3_empties_the_bucket(s3_client, versioned_bucket):
+    bucket = versioned_bucket("async-logs", 1500)
+    result = asyncio.run(ThreadedS3(s3_client).empty_bucket(bucket))
+    assert result.empty and result.deleted == 1500
+    assert remaining(s3_client, bucket) == []
+
+
+class ThrottlingClient:
+    """Delegates to a real client, throttling the first attempts of each key"""
+
+    def __init__(self, client, throttled_attempts: int, whole_request: bool = False):
+        self.client = client
+        self.throttled_attempts = throttled_attempts
+        self.whole_request = whole_request
+        self.attempts = 0
+
+    def delete_objects(self, Bucket, Delete):
+        self.attempts += 1
+        if self.attempts > self.throttled_attempts:
+            return self.client.delete_objects(Bucket=Bucket, Delete=Delete)
+        if self.whole_request:
+            raise ClientError(
+                {"Error": {"Code": "SlowDown", "Message": "Reduce your request rate"}},
+                "DeleteObjects",
+            )
+        objects = Delete["Objects"]
+        half = len(objects) // 2
+        self.client.delete_objects(
+            Bucket=Bucket, Delete={"Objects": objects[:half], "Quiet": True}
+        )
+        return {
+            "Errors": [
+                {"Key": o["Key"], "VersionId": o["VersionId"], "Code": "SlowDown"}
+                for o in objects[half:]
+            ]
+        }
+
+
+def batch(client, bucket_name):
+    return next(operations.iter_version_batches(client, bucket_name))
+
+
+def test_retries_throttled_keys(s3_client, versioned_bucket):
+    bucket = versioned_bucket("throttled", 40)
+    client = ThrottlingClient(s3_client, throttled_attempts=2)
+    assert operations.delete_batch(client, bucket, batch(s3_client, bucket)) == (40, 0)
+    assert client.attempts == 3
+    assert remaining(s3_client, bucket) == []
+
+
+def test_retries_throttled_requests(s3_client, versioned_bucket):
+    bucket = versioned_bucket("slowdown", 40)
+    client = ThrottlingClient(s3_client, throttled_attempts=2, whole_request=True)
+    assert operations.delete_batch(client, bucket, batch(s3_client, bucket)) == (40, 0)
+    assert remaining(s3_client, bucket) == []
+
+
+def test_gives_up_after_max_attempts(s3_client, versioned_bucket):
+    bucket = versioned_bucket("stuck-throttled", 10)
+    client = ThrottlingClient(s3_client, throttled_attempts=100, whole_request=True)
+    objects = batch(s3_client, bucket)
+    assert operations.delete_batch(client, bucket, objects, max_attempts=3) == (0, 10)
+    assert client.attempts == 3
+
+
+def test_other_errors_count_as_failed(s3_client, versioned_bucket):
+    bucket = versioned_bucket("denied", 10)
+
+    class DenyingClient:
+        def delete_objects(self, Bucket, Delete):
+            return {
+                "Errors": [
+                    {
+                        "Key": o["Key"],
+                        "VersionId": o["VersionId"],
+                        "Code": "AccessDenied",
+                    }
+                    for o in Delete["Objects"]
+                ]
+            }
+
+    objects = batch(s3_client, bucket)
+    assert operations.delete_batch(DenyingClient(), bucket, objects) == (0, 10)
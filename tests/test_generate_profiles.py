@@ -0,0 +1,107 @@
+import configparser
+
+from typer.testing import CliRunner
+
+from aws_stuff_doer.cmd import sso_profiles
+from aws_stuff_doer.cmd.profiles import load_profile_index
+from aws_stuff_doer.main import app
+
+ACCOUNTS = ["100000000000", "100000000001", "100000000002"]
+
+
+def read_config(home) -> configparser.ConfigParser:
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(home / ".aws" / "config")
+    return config
+
+
+def generate(*options: str):
+    return CliRunner().invoke(app, ["config", "--generate", "corp", *options])
+
+
+def test_generates_a_profile_per_account_and_role(fake_sso, isolated_home):
+    result = generate()
+    assert result.exit_code == 0, result.output
+
+    config = read_config(isolated_home)
+    for i, account in enumerate(ACCOUNTS):
+        existing = config[f"profile p{i}"]
+        assert existing["sso_role_name"] == "Admin"
+        generated = config[f"profile account-{account}-ReadOnly"]
+        assert generated["sso_session"] == "corp"
+        assert generated["sso_account_id"] == account
+        assert generated["region"] == "us-east-1"
+    assert not config.has_section(f"profile account-{ACCOUNTS[0]}-Admin")
+
+    # Accounts come two per page; each account's roles fit one page.
+    assert fake_sso.calls["ListAccounts"] == 2
+    assert fake_sso.calls["ListAccountRoles"] == len(ACCOUNTS)
+
+
+def test_regenerating_changes_nothing(fake_sso, isolated_home):
+    assert generate().exit_code == 0
+    config_path = isolated_home / ".aws" / "config"
+    before = config_path.read_text()
+
+    changed = sso_profiles.generate_profiles(load_profile_index(config_path), "corp")
+    assert changed == []
+    assert config_path.read_text() == before
+
+
+def test_template_and_region(fake_sso, isolated_home):
+    result = generate("--template", "{session}-{role_name}", "--region", "eu-west-1")
+    assert result.exit_code == 0, result.output
+
+    config = read_config(isolated_home)
+    # The template renders one name for three accounts, so each gets its ID.
+    for i, account in enumerate(ACCOUNTS):
+        generated = config[f"profile corp-ReadOnly-{account}"]
+        assert generated["region"] == "eu-west-1"
+        assert config[f"profile p{i}"]["region"] == "eu-west-1"
+
+
+def test_unknown_session_fails(fake_sso):
+    result = CliRunner().invoke(app, ["config", "--generate", "missing"])
+    assert result.exit_code == 1
+    assert fake_sso.calls["ListAccounts"] == 0
+
+
+def test_api_errors_fail_without_writing(fake_sso, isolated_home):
+    config_path = isolated_home / ".aws" / "config"
+    before = config_path.read_text()
+    fake_sso.failing = True
+    assert generate().exit_code == 1
+    assert config_path.read_text() == before
+
+
+def test_names_of_unrelated_profiles_are_not_taken_over(fake_sso, isolated_home):
+    config_path = isolated_home / ".aws" / "config"
+    with config_path.open("a") as config_file:
+        config_file.write(f"""
+[profile account-{ACCOUNTS[0]}-ReadOnly]
+credential_process = /usr/local/bin/creds
+
+[profile account-{ACCOUNTS[1]}-ReadOnly]
+sso_session = other
+sso_account_id = 200000000000
+sso_role_name = ReadOnly
+
+[profile account-{ACCOUNTS[1]}-ReadOnly-{ACCOUNTS[1]}]
+region = eu-west-1
+""")
+    result = generate()
+    assert result.exit_code == 0, result.output
+
+    config = read_config(isolated_home)
+    assert dict(config[f"profile account-{ACCOUNTS[0]}-ReadOnly"]) == {
+        "credential_process": "/usr/local/bin/creds"
+    }
+    assert config[f"profile account-{ACCOUNTS[1]}-ReadOnly"]["sso_session"] == "other"
+    assert dict(config[f"profile account-{ACCOUNTS[1]}-ReadOnly-{ACCOUNTS[1]}"]) == {
+        "region": "eu-west-1"
+    }
+    first = config[f"profile account-{ACCOUNTS[0]}-ReadOnly-{ACCOUNTS[0]}"]
+    assert first["sso_account_id"] == ACCOUNTS[0]
+    second = config[f"profile account-{ACCOUNTS[1]}-ReadOnly-{ACCOUNTS[1]}-2"]
+    assert second["sso_account_id"] == ACCOUNTS[1]
+    assert config[f"profile account-{ACCOUNTS[2]}-ReadOnly"]["sso_session"] == "corp"
@@ -0,0 +1,61 @@
+import json
+
+from typer.testing import CliRunner
+
+from aws_stuff_doer.cmd.s3stuff import commands
+from aws_stuff_doer.cmd.s3stuff import inventory as account_inventory
+from aws_stuff_doer.main import app
+
+RESULTS = [
+    account_inventory.AccountInventory(
+        "prod", "100000000001", [{"Name": "app-prod"}], 0.2
+    ),
+    account_inventory.AccountInventory(
+        "dev", "100000000000", [{"Name": "app-dev"}], 0.1
+    ),
+]
+
+
+class PagedBuckets:
+    """A client whose ListBuckets answer is split over several pages"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def can_paginate(self, operation_name):
+        return operation_name == "list_buckets"
+
+    def get_paginator(self, operation_name):
+        return self
+
+    def paginate(self):
+        return iter(self.pages)
+
+
+def test_table_is_written_to_the_output_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        account_inventory, "iter_inventory", lambda *args: iter(RESULTS)
+    )
+    output = tmp_path / "inventory.txt"
+    result = CliRunner().invoke(
+        app, ["s3", "inventory", "--profiles", "dev,prod", "--table", "-o", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "app-prod" not in result.output
+
+    lines = output.read_text().splitlines()
+    assert lines[0].split() == ["PROFILE", "ACCOUNT", "BUCKET"]
+    assert lines[1].split() == ["dev", "100000000000", "app-dev"]
+    assert lines[2].split() == ["prod", "100000000001", "app-prod"]
+
+
+def test_ls_follows_every_page_of_buckets(capsys):
+    client = PagedBuckets(
+        [
+            {"Buckets": [{"Name": "app-a"}, {"Name": "app-b"}]},
+            {"Buckets": [{"Name": "app-c"}]},
+        ]
+    )
+    commands.ls(client)
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["bucket"] for record in records] == ["app-a", "app-b", "app-c"]
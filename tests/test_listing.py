@@ -0,0 +1,104 @@
+import time
+
+import pytest
+from moto.core import DEFAULT_ACCOUNT_ID
+from moto.s3.models import s3_backends
+
+from aws_stuff_doer.cmd.s3stuff import listing, operations
+
+KEYS = sorted(
+    ["README", "index.html", "img/cat.png", "img/dog.png", "deep/a/b/c/d/e.txt"]
+    + [f"logs/2024/01/{i:05d}.gz" for i in range(1200)]
+    + [f"logs/2024/02/{i:04d}.gz" for i in range(100)]
+    + [f"users/{name}/profile.json" for name in ("ann", "Bob", "carl", "_x", "9z")]
+)
+
+
+@pytest.fixture
+def bucket(s3_client):
+    s3_client.create_bucket(Bucket="sharded")
+    backend = s3_backends[DEFAULT_ACCOUNT_ID]["aws"]
+    for key in KEYS:
+        backend.put_object("sharded", key, key.encode())
+    return "sharded"
+
+
+def sequential(client, bucket_name, prefix=""):
+    return [e.key for e in operations.iter_objects(client, bucket_name, prefix)]
+
+
+@pytest.mark.parametrize("max_workers", [4, 16])
+def test_ordered_listing_matches_a_sequential_one(s3_client, bucket, max_workers):
+    keys = [
+        e.key
+        for e in listing.iter_objects_parallel(
+            s3_client, bucket, max_workers=max_workers
+        )
+    ]
+    assert keys == KEYS == sequential(s3_client, bucket)
+
+
+def test_unordered_listing_yields_every_key_once(s3_client, bucket):
+    entries = list(
+        listing.iter_objects_parallel(s3_client, bucket, max_workers=8, ordered=False)
+    )
+    assert sorted(e.key for e in entries) == KEYS
+    assert all(e.size == len(e.key) for e in entries)
+
+
+@pytest.mark.parametrize(
+    "prefix", ["logs/", "logs/2024/01/", "users/", "img/c", "none/"]
+)
+def test_listing_under_a_prefix(s3_client, bucket, prefix):
+    keys = [e.key for e in listing.iter_objects_parallel(s3_client, bucket, prefix)]
+    assert keys == [key for key in KEYS if key.startswith(prefix)]
+
+
+def test_large_shards_split(s3_client, bucket, monkeypatch):
+    lister = listing.ShardedLister(s3_client, bucket, "logs/2024/01/", max_workers=4)
+    splits = []
+    split = lister._split
+
+    def record(shard, sample):
+        children = split(shard, sample)
+        splits.extend(children)
+        return children
+
+    monkeypatch.setattr(lister, "_split", record)
+    assert [e.key for e in lister.iter_objects()] == [
+        key for key in KEYS if key.startswith("logs/2024/01/")
+    ]
+    assert splits
+
+
+def test_prefix_usage(s3_client, bucket):
+    usage = {u.prefix: u for u in listing.prefix_usage(s3_client, bucket)}
+    assert usage["logs/"].objects == 1300
+    assert usage["img/"].bytes == len("img/cat.png") + len("img/dog.png")
+    assert usage[""].objects == 2
+
+
+def test_key_range_boundaries_cover_keys_after_the_sample():
+    sample = [f"logs/{i:05d}" for i in range(1000)]
+    bounds = listing.key_range_boundaries("logs/", sample)
+    assert bounds == sorted(bounds)
+    assert all(bound > sample[-1] and bound.startswith("logs/") for bound in bounds)
+    # The numbered keys are split on their trailing digits, not just "logs/".
+    assert "logs/01" in bounds and "logs/1" in bounds
+
+
+def test_ordered_listing_buffers_a_few_pages_per_shard(listing_s3, monkeypatch):
+    keys = [f"big/{i:06d}" for i in range(20000)]
+    client = listing_s3(keys, latency=0)
+    lister = listing.ShardedLister(client, "bucket", "big/", max_workers=4)
+    # One shard that never splits, so only its buffer limits the listing.
+    monkeypatch.setattr(lister, "_split", lambda shard, sample: [])
+
+    entries = lister.iter_objects()
+    assert next(entries).key == keys[0]
+    time.sleep(0.2)
+    # Discovery, the page being read and the pages buffered behind it.
+    assert client.calls <= 2 + listing.MAX_SHARD_PAGES
+
+    assert [keys[0]] + [e.key for e in entries] == keys
+    assert client.calls == 1 + len(keys) // 1000
@@ -0,0 +1,62 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from aws_stuff_doer.cmd import clients
+from aws_stuff_doer.cmd.s3stuff.metadata import BucketMetadataFetcher
+
+
+def put_storage_metric(name: str, bucket_name: str, storage_type: str, value: float):
+    clients.get_client("cloudwatch", region="us-east-1").put_metric_data(
+        Namespace="AWS/S3",
+        MetricData=[
+            {
+                "MetricName": name,
+                "Dimensions": [
+                    {"Name": "BucketName", "Value": bucket_name},
+                    {"Name": "StorageType", "Value": storage_type},
+                ],
+                "Timestamp": datetime.now(timezone.utc) - timedelta(hours=6),
+                "Value": value,
+            }
+        ],
+    )
+
+
+def test_size_is_summed_over_storage_classes(s3_client):
+    s3_client.create_bucket(Bucket="archive")
+    put_storage_metric("NumberOfObjects", "archive", "AllStorageTypes", 30)
+    put_storage_metric("BucketSizeBytes", "archive", "StandardStorage", 1000)
+    put_storage_metric("BucketSizeBytes", "archive", "GlacierStorage", 50000)
+    put_storage_metric("BucketSizeBytes", "archive", "IntelligentTieringIAStorage", 7)
+    put_storage_metric("BucketSizeBytes", "other", "StandardStorage", 123)
+
+    metadata = BucketMetadataFetcher(s3_client).fetch("archive")
+    assert metadata["objects"] == 30
+    assert metadata["bytes"] == 51007
+
+
+def test_bucket_without_metrics_has_unknown_size(s3_client):
+    s3_client.create_bucket(Bucket="fresh")
+    metadata = BucketMetadataFetcher(s3_client).fetch("fresh")
+    assert metadata["objects"] is None
+    assert metadata["bytes"] is None
+
+
+def test_missing_cloudwatch_access_warns_once(s3_client, monkeypatch, caplog):
+    for name in ("app-a", "app-b", "app-c"):
+        s3_client.create_bucket(Bucket=name)
+    fetcher = BucketMetadataFetcher(s3_client)
+
+    def denied(region):
+        raise RuntimeError("AccessDenied")
+
+    monkeypatch.setattr(fetcher, "_cloudwatch_client", denied)
+    results = {}
+    with caplog.at_level(logging.DEBUG):
+        fetcher.fetch_all(["app-a", "app-b", "app-c"], results.__setitem__)
+
+    assert sorted(results) == ["app-a", "app-b", "app-c"]
+    assert all(metadata["bytes"] is None for metadata in results.values())
+    warnings = [r for r in caplog.records if r.levelno == logging.WARNING]
+    assert len(warnings) == 1
+    assert "AccessDenied" in warnings[0].getMessage()
@@ -0,0 +1,38 @@
+from aws_stuff_doer.cmd import profiles
+from aws_stuff_doer.cmd.profiles import ProfileIndex, load_profile_index
+
+OLD = "[profile old]\nregion = us-east-1\n"
+NEW = "[profile newer]\nregion = eu-west-1\n"
+
+
+def forget_parsed_indexes(monkeypatch):
+    monkeypatch.setattr(profiles, "_cache", {})
+
+
+def test_persisted_index_is_reused_across_processes(isolated_home, monkeypatch):
+    config = isolated_home / ".aws" / "config"
+    config.write_text(OLD)
+    assert load_profile_index(config).profile_names() == ["old"]
+
+    forget_parsed_indexes(monkeypatch)
+    monkeypatch.setattr(ProfileIndex, "from_text", None)
+    assert load_profile_index(config).profile_names() == ["old"]
+
+
+def test_config_rewritten_while_parsing_is_not_cached_as_current(
+    isolated_home, monkeypatch
+):
+    config = isolated_home / ".aws" / "config"
+    config.write_text(OLD)
+    from_text = ProfileIndex.from_text
+
+    def rewrite_then_parse(text):
+        config.write_text(NEW)
+        return from_text(text)
+
+    monkeypatch.setattr(ProfileIndex, "from_text", staticmethod(rewrite_then_parse))
+    assert load_profile_index(config).profile_names() == ["old"]
+
+    monkeypatch.setattr(ProfileIndex, "from_text", from_text)
+    forget_parsed_indexes(monkeypatch)
+    assert load_profile_index(config).profile_names() == ["newer"]
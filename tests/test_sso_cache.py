@@ -0,0 +1,135 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.credentials import SSOCredentialFetcher
+from botocore.utils import SSOTokenLoader
+
+from aws_stuff_doer.cmd import sso_cache
+from aws_stuff_doer.cmd.aws_auth import AWSAuthenticator
+from aws_stuff_doer.cmd.profiles import ProfileIndex, load_profile_index
+
+START_URL = "https://corp.awsapps.com/start"
+
+
+def index() -> ProfileIndex:
+    return ProfileIndex(
+        {
+            "session-profile": {
+                "sso_session": "corp",
+                "sso_account_id": "111111111111",
+                "sso_role_name": "Admin",
+            },
+            "legacy-profile": {
+                "sso_start_url": START_URL,
+                "sso_region": "us-east-1",
+                "sso_account_id": "222222222222",
+                "sso_role_name": "ReadOnly",
+            },
+            "static-profile": {"region": "us-east-1"},
+        },
+        {"corp": {"sso_start_url": START_URL, "sso_region": "us-east-1"}},
+    )
+
+
+def timestamp(delta: timedelta) -> str:
+    moment = datetime.now(timezone.utc) + delta
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def write_token(key: str, expires_in: timedelta) -> None:
+    cache = sso_cache.sso_token_cache_dir()
+    cache.mkdir(parents=True, exist_ok=True)
+    token = {"accessToken": "token", "expiresAt": timestamp(expires_in)}
+    (cache / f"{key}.json").write_text(json.dumps(token))
+
+
+def write_role_credentials(key: str, expires_in: timedelta) -> None:
+    cache = sso_cache.role_credentials_cache_dir()
+    cache.mkdir(parents=True, exist_ok=True)
+    credentials = {
+        "ProviderType": "sso",
+        "Credentials": {
+            "AccessKeyId": "ASIA",
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": timestamp(expires_in),
+        },
+    }
+    (cache / f"{key}.json").write_text(json.dumps(credentials))
+
+
+def botocore_role_key(session_name):
+    fetcher = SSOCredentialFetcher(
+        START_URL,
+        "us-east-1",
+        "Admin",
+        "111111111111",
+        client_creator=None,
+        sso_session_name=session_name,
+    )
+    return fetcher._create_cache_key()
+
+
+@pytest.mark.parametrize("session_name", [None, "corp"])
+def test_token_cache_key_matches_botocore(session_name):
+    expected = SSOTokenLoader(cache={})._generate_cache_key(START_URL, session_name)
+    assert sso_cache.token_cache_key(START_URL, session_name) == expected
+
+
+@pytest.mark.parametrize("session_name", [None, "corp"])
+def test_role_credentials_cache_key_matches_botocore(session_name):
+    key = sso_cache.role_credentials_cache_key(
+        "111111111111", "Admin", session_name, START_URL
+    )
+    assert key == botocore_role_key(session_name)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2030-01-02T03:04:05Z", "2030-01-02T03:04:05UTC", "2030-01-02T03:04:05+00:00"],
+)
+def test_parse_expiry_formats(value):
+    assert sso_cache.parse_expiry(value) == datetime(
+        2030, 1, 2, 3, 4, 5, tzinfo=timezone.utc
+    )
+
+
+def test_parse_expiry_rejects_garbage():
+    assert sso_cache.parse_expiry("tomorrow") is None
+    assert sso_cache.parse_expiry(None) is None
+
+
+def test_valid_role_credentials_make_the_session_valid():
+    write_role_credentials(botocore_role_key("corp"), timedelta(hours=1))
+    assert sso_cache.cached_session_valid(index(), "session-profile") is True
+
+
+def test_falls_back_to_the_sso_token():
+    write_role_credentials(botocore_role_key("corp"), -timedelta(hours=1))
+    assert sso_cache.cached_session_valid(index(), "session-profile") is False
+    write_token(sso_cache.token_cache_key(START_URL, "corp"), timedelta(hours=1))
+    assert sso_cache.cached_session_valid(index(), "session-profile") is True
+
+
+def test_legacy_profile_token_keyed_by_start_url():
+    write_token(sso_cache.token_cache_key(START_URL, None), timedelta(hours=1))
+    assert sso_cache.cached_session_valid(index(), "legacy-profile") is True
+
+
+def test_tokens_inside_the_skew_count_as_expired():
+    write_token(sso_cache.token_cache_key(START_URL, "corp"), timedelta(seconds=30))
+    assert sso_cache.cached_session_valid(index(), "session-profile") is False
+
+
+def test_non_sso_profiles_are_undecided():
+    assert sso_cache.cached_session_valid(index(), "static-profile") is None
+
+
+def test_reads_the_role_credentials_botocore_caches(fake_sso, isolated_home):
+    assert AWSAuthenticator("p1").export_temporary_aws_credentials()
+    config = load_profile_index(isolated_home / ".aws" / "config")
+    cached = sso_cache.load_role_credentials(config, "p1")
+    assert cached is not None
+    assert cached["Credentials"]["AccessKeyId"] == "ASIA0000000000000001"
+    assert sso_cache.cached_session_valid(config, "p1") is True
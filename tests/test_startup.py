@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parents[1]
+HEAVY_MODULES = ["boto3", "botocore", "textual"]
+# A fresh interpreter plus Typer takes around 0.3s; an eager import of
+# boto3 and Textual roughly doubles that.
+STARTUP_BUDGET = 1.0
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from aws_stuff_doer.main import app
+try:
+    app(sys.argv[1:])
+except SystemExit:
+    pass
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "imported": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+SUBCOMMANDS = [
+    ["list"],
+    ["config"],
+    ["auth"],
+    ["daemon"],
+    ["credential-process"],
+    ["services"],
+    ["s3", "ls"],
+    ["s3", "du"],
+    ["s3", "empty"],
+    ["s3", "rm"],
+    ["s3", "analyze"],
+    ["s3", "inventory"],
+]
+
+
+def probe(*args: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("command", SUBCOMMANDS, ids=" ".join)
+def test_subcommand_help_starts_without_heavy_imports(command):
+    report = probe(*command, "--help")
+    assert report["imported"] == []
+    assert report["seconds"] < STARTUP_BUDGET
+
+
+def test_version_starts_without_heavy_imports():
+    report = probe("--version")
+    assert report["imported"] == []
+    assert report["seconds"] < STARTUP_BUDGET
+
+
+def test_list_reads_profiles_without_boto3(aws_config):
+    aws_config(100)
+    report = probe("list")
+    assert report["imported"] == []
+    assert report["seconds"] < STARTUP_BUDGET
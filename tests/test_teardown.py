@@ -0,0 +1,61 @@
+from aws_stuff_doer.cmd.s3stuff import commands, operations
+from aws_stuff_doer.cmd.s3stuff.checkpoints import TeardownCheckpoints
+
+
+def count_versions(client, bucket_name):
+    return sum(
+        len(batch) for batch in operations.iter_version_batches(client, bucket_name)
+    )
+
+
+def test_cancelled_teardown_resumes_until_empty(s3_client, versioned_bucket, tmp_path):
+    bucket = versioned_bucket("teardown", 2500)
+    checkpoints = TeardownCheckpoints(tmp_path / "teardown.json")
+    batches = 0
+
+    def cancel_after_first_batch():
+        nonlocal batches
+        batches += 1
+        return batches > 1
+
+    first = operations.empty_bucket(
+        s3_client,
+        bucket,
+        max_workers=1,
+        on_progress=lambda deleted, listed, elapsed: checkpoints.save(bucket, deleted),
+        should_cancel=cancel_after_first_batch,
+    )
+    assert first.cancelled and not first.empty
+    assert first.deleted == operations.MAX_DELETE_BATCH
+    assert count_versions(s3_client, bucket) == 2500 - first.deleted
+    assert TeardownCheckpoints(checkpoints.path).deleted(bucket) == first.deleted
+
+    resumed = TeardownCheckpoints(checkpoints.path)
+    assert commands.empty(s3_client, bucket, checkpoints=resumed) is True
+    assert count_versions(s3_client, bucket) == 0
+    assert TeardownCheckpoints(checkpoints.path).deleted(bucket) == 0
+
+
+def test_teardown_keeps_checkpoint_while_versions_remain(
+    s3_client, versioned_bucket, tmp_path, monkeypatch
+):
+    bucket = versioned_bucket("stuck", 20)
+    checkpoints = TeardownCheckpoints(tmp_path / "teardown.json")
+    checkpoints.save(bucket, 100)
+    monkeypatch.setattr(
+        operations, "delete_batch", lambda client, bucket_name, batch: (0, len(batch))
+    )
+
+    assert commands.empty(s3_client, bucket, checkpoints=checkpoints) is False
+    assert count_versions(s3_client, bucket) == 20
+    assert TeardownCheckpoints(checkpoints.path).deleted(bucket) == 100
+
+
+def test_checkpoints_are_written_at_most_once_per_interval(tmp_path):
+    checkpoints = TeardownCheckpoints(tmp_path / "teardown.json", interval=3600)
+    for deleted in range(1000, 11000, 1000):
+        checkpoints.save("busy", deleted)
+    assert TeardownCheckpoints(checkpoints.path).deleted("busy") == 1000
+
+    checkpoints.flush()
+    assert TeardownCheckpoints(checkpoints.path).deleted("busy") == 10000
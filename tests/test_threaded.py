@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from aws_stuff_doer.cmd.s3stuff import operations
+from aws_stuff_doer.cmd.s3stuff.threaded import ThreadedS3
+
+
+def remaining(client, bucket_name):
+    return sum(
+        len(batch) for batch in operations.iter_version_batches(client, bucket_name)
+    )
+
+
+def test_cancel_drains_in_flight_batches_then_raises(s3_client, versioned_bucket):
+    bucket = versioned_bucket("cancelled", 4000)
+    reported = []
+
+    async def teardown():
+        def on_progress(deleted, listed, elapsed):
+            # Cancel as soon as the first batch is done, while the last
+            # listing page is still to come.
+            reported.append(deleted)
+            task.cancel()
+
+        task = asyncio.ensure_future(
+            ThreadedS3(s3_client).empty_bucket(
+                bucket, max_batches=2, on_progress=on_progress
+            )
+        )
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(teardown())
+    # Every batch that was submitted finished and got reported.
+    assert 0 < reported[-1] < 4000
+    assert remaining(s3_client, bucket) == 4000 - reported[-1]
+
+
+def test_list_object_page(s3_client, versioned_bucket):
+    bucket = versioned_bucket("paged", 5, keys=5)
+    page = asyncio.run(ThreadedS3(s3_client).list_object_page(bucket, max_keys=3))
+    assert [entry.key for entry in page.entries] == ["key-0", "key-1", "key-2"]
+    assert page.next_token is not None